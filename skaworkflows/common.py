@@ -22,8 +22,15 @@ Included in this modules are the following class definitions:
 """
 
 import numpy as np
+import pandas as pd
 
+import contextlib
+import hashlib
 import json
+import logging
+import os
+import shutil
+import tempfile
 from pathlib import Path
 from enum import Enum, IntEnum, auto
 
@@ -34,6 +41,8 @@ except:
 
 from skaworkflows import __version__
 
+LOGGER = logging.getLogger(__name__)
+
 
 class SI(IntEnum):
     """
@@ -191,6 +200,210 @@ LOW_COMPONENT_SIZING = DATA_PANDAS_SIZING / "component_compute_SKA1_Low_2025-02-
 MID_TOTAL_SIZING = DATA_PANDAS_SIZING / "total_compute_SKA1_Mid_2025-02-25.csv"
 MID_COMPONENT_SIZING = DATA_PANDAS_SIZING / "component_compute_SKA1_Mid_2025-02-25.csv"
 
+
+def _read_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# The process umask, read once as it can only be read by replacing it
+_UMASK = _read_umask()
+
+
+def default_mode(directory=False) -> int:
+    """
+    Permissions `open(path, "w")` (or `os.mkdir`) gives a new file (or
+    directory), rather than the 0600 (0700) of `tempfile.mkstemp`
+    (`mkdtemp`).
+    """
+    return (0o777 if directory else 0o666) & ~_UMASK
+
+
+@contextlib.contextmanager
+def atomic_write(path, dir=None):
+    """
+    Write `path` atomically: yield a temporary path to write to, which
+    replaces `path` once the block completes, and is removed if it fails.
+
+    Other processes therefore never see a partially written file. The file
+    ends up with `default_mode`, as if it had been written in place.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+    dir : str or pathlib.Path, optional
+        Directory of the temporary file, on the same file system as `path`;
+        defaults to the directory of `path`.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(
+        dir=path.parent if dir is None else dir, prefix=".", suffix=".tmp"
+    )
+    os.close(fd)
+    try:
+        yield Path(tmp)
+        os.chmod(tmp, default_mode())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+# Columnar cache of the sizing CSVs; overridden by SKAWORKFLOWS_SIZING_CACHE
+SIZING_CACHE_ENV = "SKAWORKFLOWS_SIZING_CACHE"
+SIZING_CACHE_DIR = Path.home() / ".cache" / "skaworkflows" / "sizing"
+SIZING_CACHE_VERSION = 1
+
+# In-process cache: resolved path -> (signature, DataFrame)
+_SIZING_FRAMES = {}
+
+
+def _sizing_signature(path: Path):
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _sizing_digest(path: Path):
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+
+def _sizing_cache_entry(path: Path, cache_dir: Path):
+    digest = hashlib.blake2b(str(path).encode(), digest_size=8).hexdigest()
+    return cache_dir / f"{path.stem}-{digest}"
+
+
+def _read_sizing_cache(entry: Path, path: Path):
+    """
+    Load the cached columns for `path`, or return None if the cache is
+    missing or out of date.
+    """
+    try:
+        with open(entry / "meta.json") as fp:
+            meta = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != SIZING_CACHE_VERSION:
+        return None
+    if tuple(meta["signature"]) != _sizing_signature(path):
+        # The file may have been touched or copied; only rebuild if the
+        # content has changed.
+        if meta["digest"] != _sizing_digest(path):
+            return None
+    columns = {}
+    for i, (name, dtype) in enumerate(meta["columns"]):
+        values = np.load(entry / f"{i}.npy", mmap_mode="r").view(np.ndarray)
+        if dtype == str(values.dtype):
+            columns[name] = values
+            continue
+        column = pd.Series(values, copy=False).astype(dtype)
+        missing = entry / f"{i}.na.npy"
+        if missing.exists():
+            column[np.load(missing)] = None
+        columns[name] = column
+    return pd.DataFrame(columns, copy=False)
+
+
+def _write_sizing_cache(entry: Path, path: Path, frame: pd.DataFrame):
+    tmp = None
+    try:
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".tmp"))
+        os.chmod(tmp, default_mode(directory=True))
+        meta = {
+            "version": SIZING_CACHE_VERSION,
+            "source": str(path),
+            "signature": _sizing_signature(path),
+            "digest": _sizing_digest(path),
+            "columns": [],
+        }
+        for i, name in enumerate(frame.columns):
+            column = frame[name]
+            if column.dtype.kind in "biuf":
+                values = column.to_numpy()
+            else:
+                values = column.to_numpy(dtype=str)
+                if column.isna().any():
+                    np.save(tmp / f"{i}.na.npy", column.isna().to_numpy())
+            np.save(tmp / f"{i}.npy", values)
+            meta["columns"].append((name, str(column.dtype)))
+        with open(tmp / "meta.json", "w") as fp:
+            json.dump(meta, fp)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+    except OSError as e:
+        # Another process may have written the entry first, or the cache
+        # directory is not writable; either way the CSV has been read.
+        LOGGER.debug("Unable to write sizing cache %s: %s", entry, e)
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _copy_on_write() -> bool:
+    """
+    True if pandas copies shared data before it is modified, which it always
+    does from pandas 3 and optionally from pandas 2.
+    """
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except (KeyError, AttributeError):  # pandas.errors.OptionError
+        return False
+
+
+def _sizing_copy(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    A copy of the shared `frame` that callers may modify. Under
+    copy-on-write it shares the (read-only) columns; otherwise the data is
+    copied, so that edits neither fail on the read-only memory maps nor
+    change the shared frame.
+    """
+    return frame.copy(deep=not _copy_on_write())
+
+
+def load_sizing(path, cache_dir=None) -> pd.DataFrame:
+    """
+    Read a pandas system sizing CSV (e.g. `LOW_COMPONENT_SIZING`).
+
+    The CSV is parsed once and stored as memory-mapped NumPy columns in
+    `cache_dir`, which later calls (and other processes) load instead. The
+    cache is invalidated when the CSV's mtime/size changes and its content
+    hash no longer matches.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Sizing CSV
+    cache_dir : pathlib.Path, optional
+        Where to store the columnar cache. Defaults to
+        `$SKAWORKFLOWS_SIZING_CACHE`, or `~/.cache/skaworkflows/sizing`.
+
+    Returns
+    -------
+    pd.DataFrame
+        A frame that may be modified without affecting other callers. With
+        copy-on-write it shares its (read-only) data with every other caller
+        until it is modified; otherwise each call returns a deep copy.
+    """
+    path = Path(path).resolve()
+    signature = _sizing_signature(path)
+    if path in _SIZING_FRAMES and _SIZING_FRAMES[path][0] == signature:
+        return _sizing_copy(_SIZING_FRAMES[path][1])
+
+    if cache_dir is None:
+        cache_dir = Path(os.environ.get(SIZING_CACHE_ENV, SIZING_CACHE_DIR))
+    entry = _sizing_cache_entry(path, Path(cache_dir))
+    frame = _read_sizing_cache(entry, path)
+    if frame is None:
+        LOGGER.debug("Building sizing cache for %s", path)
+        frame = pd.read_csv(path)
+        _write_sizing_cache(entry, path, frame)
+    _SIZING_FRAMES[path] = (signature, frame)
+    return _sizing_copy(frame)
+
+
 # Bytes per obseved visibility
 BYTES_PER_VIS = 12.0
 
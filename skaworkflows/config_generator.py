@@ -15,13 +15,15 @@
 import json
 import logging
 import datetime
-import pandas as pd
+import functools
 
 from pathlib import Path
 
 import skaworkflows.common as common
 import skaworkflows.workflow.hpso_to_observation as hto
 from skaworkflows.common import SKALow
+from skaworkflows.workflow.scheduler import plan_utilisation
+from skaworkflows.workflow.workflow_store import default_workflow_store
 
 from skaworkflows.hpconfig.specs.sdp import (
     SDP_LOW_CDR, SDP_MID_CDR, SDP_PAR_MODEL_LOW, SDP_PAR_MODEL_MID
@@ -30,6 +32,37 @@ LOGGER = logging.getLogger(__name__)
 
 LOGGER.setLevel('DEBUG')
 
+# Config name used by `create_config(..., incremental=True)`
+INCREMENTAL_CONFIG = "skaworkflows"
+
+
+@functools.lru_cache(maxsize=None)
+def create_cluster(
+        telescope: str, infrastructure: str, nodes: int, data_rate_multiplier=1
+):
+    """
+    Create the HPC cluster specification and its TopSim dictionary.
+
+    Results are cached, as the cluster only depends on these parameters and
+    is re-used for every config generated with them (e.g. in a sweep). The
+    returned objects are shared and must not be modified.
+
+    Returns
+    -------
+    cluster, cluster_dict
+    """
+    if telescope == SKALow().name:
+        specs = {"parametric": SDP_PAR_MODEL_LOW, "cdr": SDP_LOW_CDR}
+    else:
+        specs = {"parametric": SDP_PAR_MODEL_MID, "cdr": SDP_MID_CDR}
+    if infrastructure not in specs:
+        raise RuntimeError(f"{infrastructure} not supported")
+    cluster = specs[infrastructure]()
+    cluster.data_rate_multiplier = data_rate_multiplier
+    cluster.set_nodes(nodes)
+    return cluster, cluster.to_topsim_dictionary()
+
+
 def create_config(
         # TODO define what parameters means!
         parameters: dict,
@@ -41,6 +74,15 @@ def create_config(
         data_distribution='standard',
         multiple_plans=False,
         max_num_plans=5,
+        workers=1,
+        pgt_cache=None,
+        compact_workflows=False,
+        workflow_compression=None,
+        workflow_file_format="json",
+        incremental=False,
+        plan_packing=None,
+        workflow_store=None,
+        workflow_handoff="chain",
         **kwargs
 ):
     """
@@ -53,13 +95,44 @@ def create_config(
     **data_distribution:
         Intended to be for non-standard system sizing directories - not
         currently implemented.
+    workers : int
+        Number of processes used to generate observation workflows.
+    pgt_cache : :py:obj:`PGTCache`, optional
+        Cache of unrolled graphs, e.g. shared between the points of a sweep.
+        Defaults to one in the config directory.
+    compact_workflows : bool
+        Write workflow JSON without indentation.
+    workflow_compression : str, optional
+        Compress workflow files with "gzip" or "zstd".
+    workflow_file_format : str
+        "json" for node-link JSON workflows, or "npz" for the binary
+        columnar format.
+    incremental : bool
+        Write the config to a fixed name (`skaworkflows_0.json`) and, if it
+        already exists, update it: only the observations whose workflow
+        fingerprint has changed are regenerated (see
+        `hpso_to_observation.workflow_fingerprint`).
+    plan_packing : str, optional
+        By default observations are planned one after the other. "epoch" or
+        "event" plans them concurrently, packed as described in
+        `hpso_to_observation.create_basic_plan`.
+    workflow_store : :py:obj:`WorkflowStore`, optional
+        Store of workflows shared with other configs; workflows in it are
+        linked into this config rather than generated again. Defaults to the
+        store in `$SKAWORKFLOWS_WORKFLOW_STORE`, if set.
+    workflow_handoff : str
+        How the workflows of an observation are linked: "chain", "barrier"
+        or "fan" (see `hpso_to_observation.generate_workflow_from_observation`).
 
     Returns
     -------
     Path where observation config is stored
     """
-    dt = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    cfg_name = Path(f"skaworkflows_{dt}")
+    if incremental:
+        cfg_name = Path(INCREMENTAL_CONFIG)
+    else:
+        dt = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        cfg_name = Path(f"skaworkflows_{dt}")
     LOGGER.info("Generating %s...", cfg_name)
 
     telescope = None
@@ -76,7 +149,7 @@ def create_config(
         data_distribution = True
 
     file_path = output_dir / cfg_name
-    if file_path.exists() and not overwrite:
+    if file_path.exists() and not overwrite and not incremental:
         LOGGER.info("Config %s exists, skipping instruction...", file_path)
         return file_path
 
@@ -85,25 +158,13 @@ def create_config(
     if telescope.name == SKALow().name:
         component = common.LOW_COMPONENT_SIZING
         system = common.LOW_TOTAL_SIZING
-        if hpc_infrastructure_model == "parametric":
-            cluster = SDP_PAR_MODEL_LOW()
-        elif hpc_infrastructure_model == "cdr":
-            cluster = SDP_LOW_CDR()
-        else:
-            raise RuntimeError(f"{hpc_infrastructure_model} not supported")
-        cluster.data_rate_multiplier = data_rate_multiplier
-        cluster.set_nodes(compute_nodes)
     else:
         component = common.MID_COMPONENT_SIZING
         system = common.MID_TOTAL_SIZING
-        if hpc_infrastructure_model == "parametric":
-            cluster = SDP_PAR_MODEL_MID()
-        elif hpc_infrastructure_model == "cdr":
-            cluster = SDP_MID_CDR()
-        else:
-            raise RuntimeError(f"{hpc_infrastructure_model} not supported")
-        cluster.data_rate_multiplier = data_rate_multiplier
-        cluster.set_nodes(compute_nodes)
+    cluster, cluster_dict = create_cluster(
+        telescope.name, hpc_infrastructure_model, compute_nodes,
+        data_rate_multiplier
+    )
 
     LOGGER.info(
         f"\tTelescope: \n"
@@ -115,18 +176,23 @@ def create_config(
     )
 
     LOGGER.info("Reading system sizing...")
-    component_sizing = pd.read_csv(component)
-    system_sizing = pd.read_csv(system)
-    cluster_dict = cluster.to_topsim_dictionary()
+    component_sizing = common.load_sizing(component)
+    system_sizing = common.load_sizing(system)
     observations = hto.process_hpso_from_spec(parameters)
 
     if not observations:
         RuntimeError('Observations do not exist!')
     LOGGER.debug(f"Creating an observation plan with {observations}")
     all_plans = hto.create_basic_plan(
-        observations, telescope.max_stations, with_concurrent=False
+        observations, telescope.max_stations,
+        with_concurrent=plan_packing is not None,
+        packing=plan_packing or "epoch",
     )
     LOGGER.debug(f"Observation plan: {all_plans}")
+    LOGGER.info(
+        "Plan utilisation: %s",
+        plan_utilisation(all_plans, telescope.max_stations)
+    )
 
     # all_plans = hto.alternate_plan_composition(all_plans.pop(), telescope_max)
     import random
@@ -140,9 +206,16 @@ def create_config(
     LOGGER.debug("Plans: %s", all_plans)
     LOGGER.info("Final number of plan permutations is: %d", len(all_plans))
     LOGGER.info("Producing the instrument config")
+    if workflow_store is None:
+        workflow_store = default_workflow_store()
     final_instrument_config = []
     all_plans = [all_plans]
-    for observation_plan in all_plans:
+    for i, observation_plan in enumerate(all_plans):
+        previous_config = None
+        if incremental:
+            previous_config = _read_previous_instrument(
+                _config_file_path(file_path, i)
+            )
         final_instrument_config.append(hto.generate_instrument_config(
             telescope.name,
             telescope.max_stations,
@@ -152,6 +225,14 @@ def create_config(
             system_sizing,
             cluster_dict,
             base_graph_paths,
+            pgt_cache=pgt_cache,
+            workers=workers,
+            compact_workflows=compact_workflows,
+            workflow_compression=workflow_compression,
+            workflow_file_format=workflow_file_format,
+            previous_config=previous_config,
+            workflow_store=workflow_store,
+            workflow_handoff=workflow_handoff,
         ))
 
     LOGGER.info(f"Producing buffer config")
@@ -172,11 +253,12 @@ def create_config(
 
         if not file_path.parent.exists():
             file_path.parent.mkdir(parents=True)
-        file_path_cfg = file_path.parent / (file_path.name + f"_{i}" + ".json")
-        with file_path_cfg.open('w') as fp:
-            LOGGER.info(f'Writing final config to {file_path}')
-            json.dump(final_config, fp, indent=2)
-            file_paths.append(file_path_cfg)
+        file_path_cfg = _config_file_path(file_path, i)
+        LOGGER.info(f'Writing final config to {file_path}')
+        with common.atomic_write(file_path_cfg) as tmp:
+            with open(tmp, 'w') as fp:
+                json.dump(final_config, fp, indent=2)
+        file_paths.append(file_path_cfg)
 
 
     LOGGER.info(f'Configuration generation complete!')
@@ -184,6 +266,24 @@ def create_config(
     return file_paths
 
 
+def _config_file_path(file_path: Path, i: int) -> Path:
+    return file_path.parent / (file_path.name + f"_{i}" + ".json")
+
+
+def _read_previous_instrument(path: Path):
+    """
+    The "instrument" of an existing config, or None if there is none.
+    """
+    try:
+        with path.open() as fp:
+            return json.load(fp)["instrument"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        LOGGER.warning("Regenerating unreadable config %s: %s", path, e)
+        return None
+
+
 def config_to_shadow(cfg_path: Path) -> dict:
     """
     Convert the SDP system configuration to SHADOW format
@@ -24,12 +24,21 @@ out his system sizing analysis into csv file (for ease of repeatability).
 
 import os
 import sys
+import json
+import hashlib
 import logging
 import datetime
+import itertools
+
+import numpy as np
 import pandas as pd
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from skaworkflows import common
+from skaworkflows.common import atomic_write
+
 # logging.basicConfig(level="INFO")
 LOGGER = logging.getLogger()
 
@@ -133,6 +142,33 @@ HPSO_DATA = [
     "Ingest Rate [TB/s]"
 ]
 
+# Report rows read for the total sizing, in the order they are unpacked
+TOTAL_ROWS = [
+    'Stations/antennas',
+    'Max Baseline [km]',
+    'Max # of channels',
+    'Observation Time [s]',
+    'Total Time [s]',
+    'Total Compute Requirement [PetaFLOP/s]',
+    'Total buffer ingest rate [TeraBytes/s]',
+]
+# Report rows (and their column names) common to each component sizing row
+COMPONENT_ROWS = [
+    'Max Baseline [km]',
+    'Stations/antennas',
+    'Max # of channels',
+    'Buffer Read Rate [TeraBytes/s]',
+]
+COMPONENT_COLUMNS = [
+    'Baseline', 'Antenna stations', 'Channels', 'Visibility read rate'
+] + PRODUCTS
+
+# Per-report results cached by `compile_sizing`; kept next to the columnar
+# sizing cache, out of the packaged data
+SIZING_CACHE_DIR = common.SIZING_CACHE_DIR.parent / 'sizing_reports'
+SIZING_CACHE_MANIFEST = 'manifest.json'
+SIZING_CACHE_VERSION = 1
+
 
 def csv_to_pandas_total_compute(csv_path):
     """
@@ -159,34 +195,109 @@ def csv_to_pandas_total_compute(csv_path):
     final_dicts : dictionary
         A collation of HPSOs, split between Both SKA_LOW and SKA_Mid telescope
     """
-    df_csv = pd.read_csv(
-        csv_path,
-        index_col=0,
-        na_values=['(undefined)']
-    )
-    # Undefined values are okay to be treated as 0, as we want to add these
-    # up for totals.
-    df_csv = df_csv.fillna(0)
-    # hpso_dict = {header: [] for header in hpso_data}
-    # df_hpso = pd.DataFrame(data=hpso_dict)
+    telescope, df_tel = _read_parametric_csv(csv_path)
+    return {telescope: _total_compute_frame(df_tel, telescope)}
+
+
+def _read_parametric_csv(csv_path):
+    """
+    Parse an sdp-par-model report once, keeping only the columns of the
+    telescope it was generated for.
+
+    Values are left as strings, so that the total and component sizing can
+    each interpret blank and undefined entries as they always have (see
+    `_numeric_rows`). Duplicate row labels keep their first occurrence.
+
+    Returns
+    -------
+    telescope, df_tel : str, pd.DataFrame
+    """
+    csv_path = Path(csv_path)
     if "Low" in csv_path.name:
         telescope = TELESCOPE_IDS[0]
-    else: 
+    else:
         telescope = TELESCOPE_IDS[1]
-    final_dict = {}
-    df_tel = df_csv.T[df_csv.T['Telescope'] == telescope].T
-    hpso_dict = {header: [] for header in HPSO_DATA}
-    df_from_hpso_dict = pd.DataFrame(data=hpso_dict)
-    for i, hpso in enumerate(SKA_HPSOS[telescope]):
+    df_csv = pd.read_csv(
+        csv_path, index_col=0, dtype=str, na_values=['(undefined)']
+    )
+    df_csv = df_csv[~df_csv.index.duplicated()]
+    try:
+        df_tel = df_csv.loc[:, df_csv.loc['Telescope'] == telescope]
+    except KeyError as e:
+        raise ValueError(f"Issue with {csv_path}!") from e
+    return telescope, df_tel
+
+
+def _numeric_rows(df_tel, rows, blank=0.0, missing=0.0):
+    """
+    Select `rows` of `df_tel` as a float array of shape (rows, columns).
+
+    Undefined (NaN) entries are 0, as in the rest of this module; `blank`
+    replaces entries that are just whitespace and `missing` fills rows that
+    are not in the report.
+    """
+    present = [row in df_tel.index for row in rows]
+    values = df_tel.reindex(rows).to_numpy(dtype=object)
+    values[np.isin(values, ['', ' '])] = blank
+    values = values.astype(float)
+    values[np.isnan(values)] = 0.0
+    values[~np.array(present, dtype=bool)] = missing
+    return values
+
+
+def _column_pipeline(col):
+    """
+    Pipeline name from a report column, e.g. "hpso13 (FastImg) [] [Bmax=35000]"
+    """
+    splt = col.split()
+    if '[]' in splt:
+        splt.remove('[]')
+    return splt[1].strip('()')
+
+
+def _hpso_columns(columns, hpso):
+    return [i for i, col in enumerate(columns) if hpso in col]
+
+
+def _total_compute_frame(df_tel, telescope):
+    """
+    Vectorised equivalent of `_isolate_total_sizing` for every HPSO.
+
+    The handful of rows we need are converted to floats in one go, and the
+    per-HPSO records are collected in a list and turned into a DataFrame
+    once.
+    """
+    values = _numeric_rows(df_tel, TOTAL_ROWS)
+    columns = list(df_tel.columns)
+    records = []
+    for hpso in SKA_HPSOS[telescope]:
         LOGGER.info(f'Processing total sizing for {hpso}')
-        tmp_dict = {header: 0 for header in HPSO_DATA}
-        rflop_total, rt_flop_total, tmp_dict = (
-            _isolate_total_sizing(df_tel, tmp_dict, hpso)
-        )
-        df_from_hpso_dict = df_from_hpso_dict._append(
-            tmp_dict, ignore_index=True)
-    final_dict[telescope] = df_from_hpso_dict
-    return final_dict
+        record = {header: 0 for header in HPSO_DATA}
+        record['HPSO'] = hpso
+        rt_flop_total = 0
+        rflop_total = 0
+        for i in _hpso_columns(columns, hpso):
+            (stations, baseline, channels, t_obs, t_exp, compute,
+             ingest_rate) = values[:, i]
+            record['Stations'] = int(stations)
+            record['Baseline'] = baseline * 1000
+            record['Channels'] = channels
+            record['Tobs [h]'] = t_obs / 3600
+            record['Total Time [s]'] = t_exp
+            pipeline_name = _column_pipeline(columns[i])
+            if pipeline_name in REALTIME:
+                rt_flop_total += compute
+            record["Ingest Rate [TB/s]"] = max(
+                ingest_rate, float(record["Ingest Rate [TB/s]"])
+            )
+            rflop_total += compute
+            record[f"{pipeline_name} [Pflop/s]"] = compute
+            record["Total RT [Pflop/s]"] = rt_flop_total
+            record["Total Batch [Pflop/s]"] = rflop_total - rt_flop_total
+            record["Total [Pflop/s]"] = rflop_total
+        records.append(record)
+    df = pd.DataFrame(records)
+    return df.astype({col: float for col in df.columns if col != 'HPSO'})
 
 
 def _isolate_total_sizing(df_tel, hpso_dict, hpso):
@@ -293,37 +404,52 @@ def csv_to_pandas_pipeline_components(csv_path):
         dictionary with Pandas data frames for each telescope
     -------
     """
+    telescope, df_tel = _read_parametric_csv(csv_path)
+    return {telescope: _pipeline_components_frame(df_tel, telescope)}
 
-    df_csv = pd.read_csv(
-        csv_path,
-        index_col=0
+
+def _pipeline_components_frame(df_tel, telescope):
+    """
+    Vectorised equivalent of `_isolate_products` for every HPSO.
+
+    The compute and data rate rows of all `PRODUCTS` are selected in bulk,
+    and the frame is built once from the collected rows. Blank products
+    are -1 and undefined products are 0, as before; products missing from
+    the report are -1.
+    """
+    overview = _numeric_rows(df_tel, COMPONENT_ROWS)
+    overview[0] *= 1000
+    compute = _numeric_rows(
+        df_tel, [f'-> {product} [PetaFLOP/s]' for product in PRODUCTS],
+        blank=-1, missing=-1,
     )
+    data = _numeric_rows(
+        df_tel, [f'-> {product} [Mvis/s]' for product in PRODUCTS],
+        blank=-1, missing=-1,
+    )
+    compute = np.vstack([overview, compute])
+    data = np.vstack([overview, data])
 
-    final_dict = {}
-    # for telescope in TELESCOPE_IDS:
-    if "Low" in csv_path.name:
-        telescope = TELESCOPE_IDS[0]
-    else: 
-        telescope = TELESCOPE_IDS[1]
-    try:
-        df_ska = df_csv.T[df_csv.T['Telescope'] == telescope].T.fillna(0)
-    except Exception as e:
-        print(f"Issue with {csv_path}!")
-        raise(e)
-    pipeline_df = pd.DataFrame()
-    max_baseline = max((df_ska.loc['Max Baseline [km]']).astype(float))
+    columns = list(df_tel.columns)
+    index, hpsos, rows = [], [], []
     for hpso in sorted(SKA_HPSOS[telescope]):
         LOGGER.info(f'Processing component sizing for {hpso}')
-        pipeline_products = _isolate_products(df_ska, hpso)
-        df = pd.DataFrame(pipeline_products).T
-        df.index.name = 'Pipeline'
-        newcol = [hpso for x in range(0, len(df))]
-        df.insert(0, 'hpso', newcol)
-        # basecol = [max_baseline for x in range(0, len(df))]
-        # df.insert(1, 'Baseline', basecol)
-        pipeline_df = pipeline_df._append(df, sort=False)
-    final_dict[telescope] = pipeline_df
-    return final_dict
+        pipeline_products = {}
+        for i in _hpso_columns(columns, hpso):
+            pipeline = _column_pipeline(columns[i])
+            pipeline_products[pipeline] = compute[:, i]
+            pipeline_products[f'{pipeline}_data'] = data[:, i]
+        index.extend(pipeline_products)
+        hpsos.extend(hpso for _ in pipeline_products)
+        rows.extend(pipeline_products.values())
+
+    pipeline_df = pd.DataFrame(
+        np.array(rows).reshape(len(rows), len(COMPONENT_COLUMNS)),
+        index=pd.Index(index, name='Pipeline'),
+        columns=COMPONENT_COLUMNS,
+    )
+    pipeline_df.insert(0, 'hpso', hpsos)
+    return pipeline_df
 
 
 def _isolate_products(df_tel, hpso):
@@ -445,7 +571,78 @@ def generate_pandas_system_sizing(
             pipe_dict[telescope].to_csv(fn)
 
 
-def compile_sizing(data_paths: list, total=True, component=True):
+def _process_sizing_file(path, total=True, component=True):
+    """
+    Total and component sizing of one report, parsing it only once.
+    """
+    LOGGER.info(f'Processing {path} generated by sdp-par-model:')
+    telescope, df_tel = _read_parametric_csv(path)
+    total_df, component_df = None, None
+    if total:
+        total_df = _total_compute_frame(df_tel, telescope)
+    if component:
+        component_df = _pipeline_components_frame(df_tel, telescope)
+    return telescope, total_df, component_df
+
+
+def _report_digest(path):
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+
+def _report_signature(path):
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read_cache_manifest(cache_dir):
+    """
+    Manifest of the sizing cache, mapping each report (by resolved path) to
+    its signature (mtime, size) and content digest. A manifest written by a
+    different cache or pandas version is discarded.
+    """
+    empty = {
+        "version": SIZING_CACHE_VERSION,
+        "pandas": pd.__version__,
+        "reports": {},
+    }
+    try:
+        with open(cache_dir / SIZING_CACHE_MANIFEST) as fp:
+            manifest = json.load(fp)
+    except (OSError, ValueError):
+        return empty
+    if (manifest.get("version") != SIZING_CACHE_VERSION
+            or manifest.get("pandas") != pd.__version__):
+        LOGGER.info(f'Discarding out of date sizing cache in {cache_dir}')
+        return empty
+    return manifest
+
+
+def _cached_report_digest(manifest, path):
+    """
+    Content digest of `path`, only re-hashing it if its mtime or size has
+    changed since it was recorded in the manifest.
+    """
+    entry = manifest["reports"].get(str(path.resolve()))
+    signature = _report_signature(path)
+    if entry is not None and entry["signature"] == signature:
+        return entry["digest"]
+    return _report_digest(path)
+
+
+def _load_cached_report(cache_dir, digest):
+    try:
+        return pd.read_pickle(cache_dir / f'{digest}.pkl')
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # Corrupt entry; parse the report again
+        LOGGER.warning(f'Ignoring unreadable sizing cache entry {digest}: {e}')
+        return None
+
+
+def compile_sizing(
+        data_paths: list, total=True, component=True, workers=1,
+        cache_dir=None
+):
     """
     Given a directory, produce pandas system sizing for each baseline and
     produce a dataframe that contains all baselines
@@ -454,11 +651,24 @@ def compile_sizing(data_paths: list, total=True, component=True):
     ----------
     data_paths: list
         List of paths that contain output from the parametric model 
-        system sizing
+        system sizing; anything that is not a .csv file is skipped
     total : bool
         If False, do not generate total system sizing data frame
     component : bool
         If False, do not generate component system sizingi data frame
+    workers : int
+        Number of processes used to parse the reports
+    cache_dir : pathlib.Path, optional
+        Directory in which to cache the sizing of each report, keyed on a
+        hash of its contents. Only reports that are new or have changed
+        since the last call are parsed; the rest are loaded from the cache.
+
+    Notes
+    -----
+    The cache holds one pickled (telescope, total, component) result per
+    report, and a manifest recording the digest of each report path along
+    with its mtime and size, so unchanged reports are not re-hashed. The
+    combined tables are the same as those compiled without a cache.
 
     Returns
     -------
@@ -467,45 +677,89 @@ def compile_sizing(data_paths: list, total=True, component=True):
     """
     # files = os.listdir(data_dir)
     LOGGER.info(f'Searching {data_paths} for sdp-par-model reports...')
-    total_sizing = {}
-    component_sizing = {}
-    # Modify this from baseline to channels/antennas? Need to add this to CSV Processing
+    paths = [
+        Path(p) for p in data_paths
+        if 'archive' not in Path(p).name and Path(p).suffix == '.csv'
+    ]
+
+    results = {}
+    manifest = None
+    digests = {}
+    parse_total, parse_component = total, component
+    if cache_dir is not None:
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        manifest = _read_cache_manifest(cache_dir)
+        for path in paths:
+            digests[path] = _cached_report_digest(manifest, path)
+            cached = _load_cached_report(cache_dir, digests[path])
+            if cached is not None:
+                results[path] = cached
+        # Cached entries hold both sizings, whichever were asked for
+        parse_total = parse_component = True
+
+    pending = [path for path in paths if path not in results]
+    LOGGER.info(
+        f'Parsing {len(pending)} of {len(paths)} reports '
+        f'({len(paths) - len(pending)} cached)'
+    )
+    args = (
+        pending,
+        itertools.repeat(parse_total),
+        itertools.repeat(parse_component),
+    )
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = list(executor.map(_process_sizing_file, *args))
+    else:
+        parsed = list(map(_process_sizing_file, *args))
+    results.update(zip(pending, parsed))
 
-    for path in data_paths:
-        print(path)
-        if 'archive' in path.name:
-            continue
-        LOGGER.info(f'Processing {path} generated by sdp-par-model:')
-        # length = path.split("_")[1]
-        total_dict = csv_to_pandas_total_compute(
-            path
-        )
-        pipe_dict = csv_to_pandas_pipeline_components(
-            path
-        )
-        for tel in total_dict:
-            if tel in total_sizing:
-                total_sizing[tel] = total_sizing[tel]._append(
-                    total_dict[tel]
-                )
-            else:
-                total_sizing[tel] = pd.DataFrame()
-                total_sizing[tel] = total_sizing[tel]._append(
-                    total_dict[tel]
-                )
-            if tel in component_sizing:
-                component_sizing[tel] = component_sizing[tel]._append(
-                    pipe_dict[tel]
-                )
-            else:
-                component_sizing[tel] = pd.DataFrame()
-                component_sizing[tel] = component_sizing[tel]._append(
-                    pipe_dict[tel]
-                )
-                # LOGGER.info(")
+    if cache_dir is not None:
+        _update_sizing_cache(cache_dir, manifest, pending, digests, results)
+
+    # Collect the frames in file order and concatenate each telescope once
+    total_frames = {}
+    component_frames = {}
+    for path in paths:
+        tel, total_df, component_df = results[path]
+        if total:
+            total_frames.setdefault(tel, []).append(total_df)
+        if component:
+            component_frames.setdefault(tel, []).append(component_df)
+    total_sizing = {
+        tel: pd.concat(frames) for tel, frames in total_frames.items()
+    }
+    component_sizing = {
+        tel: pd.concat(frames) for tel, frames in component_frames.items()
+    }
     return total_sizing, component_sizing
 
 
+def _update_sizing_cache(cache_dir, manifest, parsed, digests, results):
+    """
+    Store the results of newly parsed reports and record every report in
+    the manifest. Entries no longer referenced by the manifest are removed.
+    """
+    for path in parsed:
+        entry = cache_dir / f'{digests[path]}.pkl'
+        with atomic_write(entry) as tmp:
+            pd.to_pickle(results[path], tmp)
+    reports = manifest["reports"]
+    for path, digest in digests.items():
+        reports[str(path.resolve())] = {
+            "digest": digest, "signature": _report_signature(path)
+        }
+    for name in [name for name in reports if not Path(name).exists()]:
+        del reports[name]
+    with atomic_write(cache_dir / SIZING_CACHE_MANIFEST) as tmp:
+        tmp.write_text(json.dumps(manifest, indent=2))
+    referenced = {entry["digest"] for entry in reports.values()}
+    for entry in cache_dir.glob('*.pkl'):
+        if entry.stem not in referenced:
+            entry.unlink()
+
+
 if __name__ == '__main__':
 
     if len(sys.argv) > 1:
@@ -535,7 +789,10 @@ if __name__ == '__main__':
         for c in SKA_channels: 
             channels = c*128
             paths.append(f"{IN_DIR}/ParametricOutput_Mid_antenna-{a}_channels-{channels}.csv")
-    total_sizing, component_sizing = compile_sizing(IN_DIR.iterdir())
+    total_sizing, component_sizing = compile_sizing(
+        IN_DIR.iterdir(), workers=os.cpu_count(),
+        cache_dir=SIZING_CACHE_DIR
+    )
 
     for tel in total_sizing:
         fn_total = f'{OUTPUT_DIR}/total_compute_{tel}_{curr_date}.csv'
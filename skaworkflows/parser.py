@@ -31,18 +31,13 @@ b. Users use an 'experiment' create that provides defaults as well as support fo
 
 """
 
-from skaworkflows.observation import parameters
+from pathlib import Path
 
-parameters = parameters.load_observation_defaults("skalow")
+from skaworkflows.common import Telescope, Workflows
+from skaworkflows.observation.parameters import load_observation_defaults
+from skaworkflows.sweep import run_sweep
 
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--create-base",
-                    help="Create a base config file from the default")
-
-
-import argparse
-
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Tool to create plans using either a custom config or an experiment configuration."
@@ -96,22 +91,97 @@ def parse_args():
         "--max_baselines", type=int, nargs="+",
         help="List of baseline configurations to use in the experiment."
     )
+    experiment_group.add_argument(
+        "--workflow_parallelism", type=int, nargs="+",
+        help="List of workflow parallelism values (defaults to the telescope's)."
+    )
+    experiment_group.add_argument(
+        "--nodes", type=int, nargs="+",
+        help="List of compute node counts (defaults to the telescope's)."
+    )
+    experiment_group.add_argument(
+        "--infrastructure", type=str, nargs="+", choices=["parametric", "cdr"],
+        help="HPC infrastructure model(s) to use."
+    )
+    experiment_group.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of processes used to generate the experiment configs."
+    )
 
     args = parser.parse_args()
 
     # if not parser
     # Validations
-    if args.custom_config and (args.demand or args.channels or args.baselines):
+    experiment_args = (args.max_demand or args.max_channels or args.max_baselines)
+    if args.custom_config and experiment_args:
         parser.error("Cannot use experiment parameters with --custom-config.")
 
-    if args.experiment and (not args.demand or not args.channels or not args.baselines):
-        # parser.error("--experiment mode requires --demand, --channels, and --baselines.")
-        parser.print_help()
+    if args.experiment and not (
+            args.max_demand and args.max_channels and args.max_baselines
+    ):
+        parser.error(
+            "--experiment mode requires --max_demand, --max_channels, and "
+            "--max_baselines."
+        )
 
-    parser.print_help()
     return args
 
+
+def create_experiment(args):
+    """
+    Build the base parameters and parameter grid for an experiment from the
+    telescope's observation defaults and the experiment arguments.
+
+    Returns
+    -------
+    base_parameters, grid, base_graph_paths
+    """
+    telescope = Telescope(args.telescope)
+    defaults = load_observation_defaults(args.telescope)
+    hpsos = []
+    for hpso, spec in defaults["hpsos"].items():
+        hpsos.append({
+            "count": spec.get("observing_ratio", 1),
+            "hpso": hpso,
+            "workflows": spec["workflows"],
+            "duration": spec["duration"],
+            "telescope": telescope.name,
+        })
+    base_parameters = {
+        "telescope": telescope.name,
+        "nodes": defaults["nodes"],
+        "infrastructure": defaults["infrastructure"],
+        "hpsos": hpsos,
+    }
+    grid = {
+        "demand": [s for s in telescope.stations if s <= args.max_demand],
+        "channels": args.max_channels,
+        "baseline": [float(b) for b in args.max_baselines],
+        "workflow_parallelism": (
+            args.workflow_parallelism or telescope.workflow_parallelism
+        ),
+    }
+    if args.nodes:
+        grid["nodes"] = args.nodes
+    if args.infrastructure:
+        grid["infrastructure"] = args.infrastructure
+    base_graph_paths = {
+        w: ("pulsar" if w == Workflows.pulsar else "prototype")
+        for h in hpsos for w in h["workflows"]
+    }
+    return base_parameters, grid, base_graph_paths
+
+
 if __name__ == "__main__":
     args = parse_args()
     # print("Parsed arguments:", vars(args))
-
+    if args.experiment:
+        base_parameters, grid, base_graph_paths = create_experiment(args)
+        manifest = run_sweep(
+            base_parameters,
+            grid,
+            Path(args.output_dir),
+            base_graph_paths,
+            workers=args.workers,
+        )
+        print(f"Experiment manifest written to {manifest}")
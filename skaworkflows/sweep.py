@@ -0,0 +1,269 @@
+# Copyright (C) 2026 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Generate simulation configs over a grid of parameters.
+
+A sweep takes the `parameters` dictionary used by
+`config_generator.create_config` and a grid of values for some of its
+entries, and produces one config per grid point. Work that grid points have
+in common is done once:
+
+    - Identical grid points (after applying the grid) share a config.
+    - Each unique (graph, parallelism, demand) LGT is unrolled once into a
+      PGT cache shared by every point; graphs expanded from a scatter
+      template only have their small template PGTs unrolled.
+    - Sizing data and cluster specifications are cached in each worker
+      process (see `common.load_sizing` and `config_generator.create_cluster`).
+    - Each workflow is generated once into a shared `WorkflowStore`, and
+      linked into every config that uses it.
+
+The results are recorded in a manifest in the output directory, mapping each
+grid point to its config files. Points already in the manifest are skipped
+when a sweep is re-run.
+"""
+
+import copy
+import hashlib
+import itertools
+import json
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import skaworkflows.workflow.eagle_daliuge_translation as edt
+import skaworkflows.workflow.hpso_to_observation as hto
+
+from skaworkflows.common import atomic_write
+from skaworkflows.config_generator import create_config
+from skaworkflows.workflow.pgt_cache import PGTCache, PGT_CACHE_DIR
+from skaworkflows.workflow.workflow_store import (
+    WorkflowStore, WORKFLOW_STORE_DIR
+)
+
+LOGGER = logging.getLogger(__name__)
+
+# Grid parameters applied to the top level of `parameters`
+GLOBAL_PARAMETERS = ("telescope", "nodes", "infrastructure")
+# Grid parameters applied to every HPSO in `parameters["hpsos"]`
+HPSO_PARAMETERS = (
+    "telescope", "demand", "channels", "baseline", "workflow_parallelism"
+)
+
+MANIFEST = "manifest.json"
+
+
+def expand_grid(parameters: dict, grid: dict) -> list:
+    """
+    Produce the `create_config` parameters for every point in `grid`.
+
+    Parameters
+    ----------
+    parameters : dict
+        Base parameters, as passed to `config_generator.create_config`
+    grid : dict
+        Parameter name -> list of values (or a single value). Names must be
+        in `GLOBAL_PARAMETERS` or `HPSO_PARAMETERS`.
+
+    Returns
+    -------
+    list
+        (point, parameters) pairs, where `point` maps each grid parameter to
+        its value, in the order of `itertools.product` over `grid`.
+    """
+    unknown = set(grid) - set(GLOBAL_PARAMETERS) - set(HPSO_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unsupported sweep parameters: {sorted(unknown)}")
+
+    names = list(grid)
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+    points = []
+    for combination in itertools.product(*values):
+        point = dict(zip(names, combination))
+        point_parameters = copy.deepcopy(parameters)
+        for name, value in point.items():
+            if name in GLOBAL_PARAMETERS:
+                point_parameters[name] = value
+            if name in HPSO_PARAMETERS:
+                for hpso in point_parameters["hpsos"]:
+                    hpso[name] = value
+        points.append((point, point_parameters))
+    return points
+
+
+def parameters_key(parameters: dict) -> str:
+    """
+    Canonical hash of a set of `create_config` parameters.
+    """
+    return hashlib.blake2b(
+        json.dumps(parameters, sort_keys=True, separators=(",", ":")).encode(),
+        digest_size=8,
+    ).hexdigest()
+
+
+def _unroll_jobs(parameters: dict, base_graph_paths: dict) -> set:
+    """
+    The (graph type, parallelism, demand) LGTs unrolled for `parameters`.
+    """
+    jobs = set()
+    for hpso in parameters["hpsos"]:
+        for workflow in hpso["workflows"]:
+            if workflow in base_graph_paths:
+                jobs.add((
+                    base_graph_paths[workflow],
+                    hpso["workflow_parallelism"],
+                    hpso["demand"],
+                ))
+    return jobs
+
+
+def _unroll_into_cache(graph_type, parallelism, demand, cache_dir):
+    """
+    Unroll an LGT into the shared PGT cache, unless it is already there.
+
+    Graphs that can be expanded from a scatter template only have the
+    template PGTs unrolled, which are much smaller.
+    """
+    pgt_cache = PGTCache(cache_dir)
+    base_graph = hto._match_graph_options(graph_type)
+    if hto.get_scatter_template(base_graph, demand, pgt_cache) is not None:
+        return None
+    lgt = edt.update_graph_parallelism(base_graph, parallelism, demand)
+    hto.get_unrolled_pgt(lgt, pgt_cache)
+    return pgt_cache.key(lgt)
+
+
+def _run_point(
+        parameters, output_dir, base_graph_paths, cache_dir, workflow_store,
+        kwargs
+):
+    paths = create_config(
+        parameters,
+        output_dir,
+        base_graph_paths,
+        pgt_cache=PGTCache(cache_dir),
+        workflow_store=workflow_store,
+        **kwargs,
+    )
+    return [str(p) for p in paths]
+
+
+def _write_manifest(path: Path, manifest: dict):
+    with atomic_write(path) as tmp:
+        with open(tmp, "w") as fp:
+            json.dump(manifest, fp, indent=2)
+
+
+def _read_manifest(path: Path) -> dict:
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return {"configs": {}, "points": []}
+
+
+def run_sweep(
+        parameters: dict,
+        grid: dict,
+        output_dir,
+        base_graph_paths: dict,
+        workers=1,
+        **kwargs,
+) -> Path:
+    """
+    Generate a config for every point of `grid`.
+
+    Parameters
+    ----------
+    parameters : dict
+        Base `create_config` parameters
+    grid : dict
+        See `expand_grid`
+    output_dir : pathlib.Path
+        Directory for the manifest, the shared PGT cache and workflow store,
+        and a sub-directory per unique grid point
+    base_graph_paths : dict
+        As for `create_config`
+    workers : int
+        Number of processes used for unrolling and generating configs
+    **kwargs
+        Passed to `create_config`. A `workflow_store` replaces the store in
+        `output_dir`.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the manifest, which stores "points" (each grid point with
+        the key of its parameters) and "configs" (key -> config paths,
+        relative to `output_dir`).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir = output_dir / PGT_CACHE_DIR
+    workflow_store = kwargs.pop("workflow_store", None) or WorkflowStore(
+        output_dir / WORKFLOW_STORE_DIR
+    )
+    manifest_path = output_dir / MANIFEST
+    manifest = _read_manifest(manifest_path)
+
+    points = expand_grid(parameters, grid)
+    unique = {}
+    for point, point_parameters in points:
+        unique.setdefault(parameters_key(point_parameters), point_parameters)
+    pending = {
+        key: p for key, p in unique.items()
+        if key not in manifest["configs"]
+        or not all((output_dir / c).exists() for c in manifest["configs"][key])
+    }
+    LOGGER.info(
+        "Sweep of %d points (%d unique, %d to generate)",
+        len(points), len(unique), len(pending)
+    )
+
+    jobs = set()
+    for point_parameters in pending.values():
+        jobs |= _unroll_jobs(point_parameters, base_graph_paths)
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        # Unroll each graph once, before any config needs it
+        unrolls = [
+            executor.submit(_unroll_into_cache, *job, cache_dir)
+            for job in sorted(jobs, key=str)
+        ]
+        for future in unrolls:
+            future.result()
+
+        futures = {
+            key: executor.submit(
+                _run_point, point_parameters, output_dir / key,
+                base_graph_paths, cache_dir, workflow_store, kwargs
+            )
+            for key, point_parameters in pending.items()
+        }
+        for key, future in futures.items():
+            manifest["configs"][key] = [
+                Path(p).relative_to(output_dir).as_posix()
+                for p in future.result()
+            ]
+            _write_manifest(manifest_path, manifest)
+
+    manifest["grid"] = grid
+    manifest["points"] = [
+        {"point": point, "key": parameters_key(point_parameters)}
+        for point, point_parameters in points
+    ]
+    _write_manifest(manifest_path, manifest)
+    return manifest_path
@@ -0,0 +1,732 @@
+# Copyright (C) 2026 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Array-backed representation of a costed workflow graph.
+
+A networkx DiGraph stores a dictionary per node, per edge and per adjacency
+entry, which for a workflow of tens of thousands of tasks is far more memory
+than the handful of numbers we actually keep. `CompactGraph` stores the same
+information as integer node IDs, interned node-name prefixes (e.g.
+"DPrepA_Grid"), CSR adjacency and numeric attribute arrays, and converts to/from networkx and
+node-link JSON without losing information.
+"""
+
+from collections.abc import MutableMapping
+
+import numpy as np
+import networkx as nx
+
+NODE_ATTRIBUTES = ("comp", "task_data")
+EDGE_ATTRIBUTES = ("transfer_data",)
+EDGE_OID_ATTRIBUTES = ("u", "v", "data_drop_oid")
+
+
+def _split_name(name):
+    """
+    Split "{workflow}_{component}_{index}" into ("{workflow}_{component}",
+    index). Names without a trailing integer are kept whole, with index -1.
+    """
+    if not isinstance(name, str):
+        raise TypeError(f"CompactGraph nodes must be str, not {type(name)}")
+    prefix, sep, index = name.rpartition("_")
+    if sep and index.isdigit() and str(int(index)) == index:
+        return prefix, int(index)
+    return name, -1
+
+
+def _is_int(value):
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def _empty_attribute(size):
+    return np.zeros(size), np.zeros(size, dtype=bool), np.zeros(size, dtype=bool)
+
+
+def _attribute_arrays(attrs_list, supported, kind):
+    """
+    Attribute name -> (values, mask, ints) for the numeric attributes in
+    `attrs_list`, one dictionary per node or edge.
+    """
+    attrs_list = list(attrs_list)
+    arrays = {}
+    for attr in set(supported).union(*map(set, attrs_list)):
+        if attr not in supported:
+            raise ValueError(f"Unsupported {kind} attribute '{attr}'")
+        values, mask, ints = _empty_attribute(len(attrs_list))
+        for i, attrs in enumerate(attrs_list):
+            if attr in attrs:
+                values[i] = attrs[attr]
+                mask[i] = True
+                ints[i] = _is_int(attrs[attr])
+        arrays[attr] = (values, mask, ints)
+    return arrays
+
+
+def _attribute_columns(arrays, attr):
+    """
+    (values, mask, ints) of `attr` from the columns of `to_arrays`. Columns
+    written without the `<attr>_int` mask hold floats only.
+    """
+    mask = np.asarray(arrays[f"{attr}_mask"], dtype=bool)
+    ints = arrays.get(f"{attr}_int")
+    if ints is None:
+        ints = np.zeros_like(mask)
+    return (
+        np.asarray(arrays[attr], dtype=float),
+        mask,
+        np.asarray(ints, dtype=bool),
+    )
+
+
+def _split_oids(attrs_list):
+    """
+    Copies of the edge attribute dictionaries in `attrs_list` without the
+    DALiuGE oids, and attribute name -> list of oids (or None) per edge.
+    """
+    numeric = [dict(attrs) for attrs in attrs_list]
+    oids = {
+        attr: [attrs.pop(attr, None) for attrs in numeric]
+        for attr in EDGE_OID_ATTRIBUTES
+        if any(attr in attrs for attrs in numeric)
+    }
+    return numeric, oids
+
+
+def _csr(sources, num_nodes):
+    """
+    The stable order that sorts edges by `sources`, and the CSR `indptr`.
+    """
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=indptr[1:])
+    return order, indptr
+
+
+class _AttributeView(MutableMapping):
+    """
+    Attributes of one node or edge, mimicking the attribute dictionary of a
+    networkx graph. Changes are written to the graph's arrays.
+    """
+
+    def __init__(self, data, index, oids=None):
+        self._data = data
+        self._index = index
+        self._oids = oids
+
+    def __getitem__(self, attr):
+        if attr in self._data:
+            values, mask, ints = self._data[attr]
+            if mask[self._index]:
+                if ints[self._index]:
+                    return int(values[self._index])
+                return float(values[self._index])
+        elif self._oids is not None and attr in self._oids:
+            value = self._oids[attr][self._index]
+            if value is not None:
+                return value
+        raise KeyError(attr)
+
+    def __setitem__(self, attr, value):
+        if attr in self._data:
+            values, mask, ints = self._data[attr]
+            values[self._index] = value
+            mask[self._index] = True
+            ints[self._index] = _is_int(value)
+        elif self._oids is not None and attr in EDGE_OID_ATTRIBUTES:
+            if attr not in self._oids:
+                size = len(next(iter(self._data.values()))[1])
+                self._oids[attr] = [None] * size
+            self._oids[attr][self._index] = value
+        else:
+            raise ValueError(f"Unsupported attribute '{attr}'")
+
+    def __delitem__(self, attr):
+        self[attr]
+        if attr in self._data:
+            self._data[attr][1][self._index] = False
+        else:
+            self._oids[attr][self._index] = None
+
+    def __iter__(self):
+        for attr, (_, mask, _) in self._data.items():
+            if mask[self._index]:
+                yield attr
+        if self._oids is not None:
+            for attr in EDGE_OID_ATTRIBUTES:
+                if (attr in self._oids
+                        and self._oids[attr][self._index] is not None):
+                    yield attr
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _DegreeView:
+    """
+    Degrees of the nodes, mimicking `networkx.DiGraph.in_degree` and
+    `out_degree`: iterate (node, degree) pairs, or call/index with a node.
+    """
+
+    def __init__(self, graph, indptr):
+        self._graph = graph
+        self._degree = np.diff(indptr)
+
+    def __iter__(self):
+        return zip(self._graph.names(), self._degree.tolist())
+
+    def __len__(self):
+        return len(self._degree)
+
+    def __getitem__(self, node):
+        return int(self._degree[self._graph.node_id(node)])
+
+    def __call__(self, nbunch=None):
+        if nbunch is None:
+            return self
+        if nbunch in self._graph:
+            return self[nbunch]
+        return [(node, self[node]) for node in nbunch]
+
+
+class _NodeView:
+    """
+    View of the nodes, mimicking `networkx.DiGraph.nodes`.
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __iter__(self):
+        return iter(self._graph.names())
+
+    def __len__(self):
+        return len(self._graph)
+
+    def __contains__(self, node):
+        return node in self._graph
+
+    def __getitem__(self, node):
+        return self._graph.node_view(self._graph.node_id(node))
+
+    def __call__(self, data=False):
+        if data:
+            return [
+                (name, self._graph.node_view(i))
+                for i, name in enumerate(self._graph.names())
+            ]
+        return self._graph.names()
+
+
+class _EdgeView:
+    """
+    View of the edges, mimicking `networkx.DiGraph.edges`.
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __iter__(self):
+        return iter(self(data=False))
+
+    def __len__(self):
+        return self._graph.number_of_edges()
+
+    def __call__(self, data=False):
+        graph = self._graph
+        names = graph.names()
+        sources = graph.edge_sources()
+        edges = []
+        for e, (s, t) in enumerate(zip(sources, graph.indices)):
+            if data:
+                edges.append((names[s], names[t], graph.edge_view(e)))
+            else:
+                edges.append((names[s], names[t]))
+        return edges
+
+
+class CompactGraph:
+    """
+    Directed workflow graph backed by NumPy arrays.
+
+    Parameters
+    ----------
+    prefixes : list
+        Interned node-name prefixes; node `i` is named
+        "{prefixes[node_prefix[i]]}_{node_index[i]}" (or just the prefix if
+        `node_index[i]` is -1).
+    node_prefix, node_index : np.ndarray
+        Per-node position in `prefixes`, and the trailing index of the name
+    indptr, indices : np.ndarray
+        CSR adjacency; the successors of node `i` are
+        `indices[indptr[i]:indptr[i+1]]`, and edge attributes share the same
+        order.
+    node_data : dict
+        Attribute name -> (float64 values, bool mask of nodes that have it,
+        bool mask of values that are integers)
+    edge_data : dict
+        Attribute name -> (float64 values, bool mask of edges that have it,
+        bool mask of values that are integers)
+    edge_oids : dict, optional
+        Attribute name -> list of DALiuGE oid strings (or None) per edge, for
+        the "u", "v" and "data_drop_oid" attributes of translated graphs.
+    graph : dict, optional
+        Graph attributes, as `networkx.DiGraph.graph`
+
+    Notes
+    -----
+    The public contract mirrors what downstream code uses of the networkx
+    graph: `nodes` (iterable, `nodes[n]` attributes), `edges`, `graph`,
+    `graph[u][v]`, `successors`/`neighbors`, `predecessors`, `in_degree`,
+    `out_degree`, `is_directed`, `is_multigraph` and `len`, so that
+    networkx algorithms such as `nx.topological_sort` run on it. The
+    structure is fixed once built (see `compose` to add nodes and edges);
+    attributes of existing nodes and edges can be changed through
+    `nodes[n]` and `graph[u][v]`, or through the attribute arrays (e.g.
+    `graph.comp[ids] = ...`).
+
+    Numeric attributes are stored as float64, with a mask of the values that
+    were integers (such as `comp` set to the observation duration) so that
+    they come back as integers.
+
+    The DALiuGE oids are kept as Python strings, which dominate the memory
+    of a graph that has them; translate with `edge_oids=False` (see
+    `eagle_daliuge_translation.daliuge_to_nx`) to leave them out.
+    """
+
+    def __init__(
+            self,
+            prefixes,
+            node_prefix,
+            node_index,
+            indptr,
+            indices,
+            node_data=None,
+            edge_data=None,
+            edge_oids=None,
+            graph=None,
+    ):
+        self.prefixes = list(prefixes)
+        self.node_prefix = np.asarray(node_prefix, dtype=np.int32)
+        self.node_index = np.asarray(node_index, dtype=np.int32)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        n, m = len(self.node_prefix), len(self.indices)
+        self.node_data = {a: _empty_attribute(n) for a in NODE_ATTRIBUTES}
+        self.node_data.update(node_data or {})
+        self.edge_data = {a: _empty_attribute(m) for a in EDGE_ATTRIBUTES}
+        self.edge_data.update(edge_data or {})
+        self.edge_oids = edge_oids or {}
+        self.graph = dict(graph or {})
+        self._names = None
+        self._ids = None
+        self._reverse = None
+
+    # Attribute arrays
+    @property
+    def comp(self):
+        return self.node_data["comp"][0]
+
+    @property
+    def task_data(self):
+        return self.node_data["task_data"][0]
+
+    @property
+    def transfer_data(self):
+        return self.edge_data["transfer_data"][0]
+
+    # Construction
+    @classmethod
+    def _build(cls, names, edges, node_attrs, edge_attrs, graph=None):
+        """
+        Build from a list of node names, a list of (source, target) name
+        pairs and matching per-node/per-edge attribute dictionaries.
+        """
+        prefix_ids = {}
+        node_prefix = np.empty(len(names), dtype=np.int32)
+        node_index = np.empty(len(names), dtype=np.int32)
+        for i, name in enumerate(names):
+            prefix, index = _split_name(name)
+            node_prefix[i] = prefix_ids.setdefault(prefix, len(prefix_ids))
+            node_index[i] = index
+        ids = {name: i for i, name in enumerate(names)}
+        if len(ids) != len(names):
+            raise ValueError("Duplicate node names")
+
+        node_data = _attribute_arrays(node_attrs, NODE_ATTRIBUTES, "node")
+
+        sources = np.fromiter(
+            (ids[u] for u, _ in edges), dtype=np.int64, count=len(edges)
+        )
+        targets = np.fromiter(
+            (ids[v] for _, v in edges), dtype=np.int64, count=len(edges)
+        )
+        order, indptr = _csr(sources, len(names))
+        indices = targets[order]
+
+        numeric_attrs, edge_oids = _split_oids(edge_attrs[e] for e in order)
+        edge_data = _attribute_arrays(numeric_attrs, EDGE_ATTRIBUTES, "edge")
+
+        return cls(
+            list(prefix_ids), node_prefix, node_index, indptr, indices,
+            node_data, edge_data, edge_oids, graph
+        )
+
+    @classmethod
+    def from_networkx(cls, nx_graph: nx.DiGraph):
+        """
+        Build a CompactGraph from a networkx workflow graph.
+
+        Node order, and the order of each node's successors, are preserved.
+        """
+        if not nx_graph.is_directed() or nx_graph.is_multigraph():
+            raise TypeError("CompactGraph only represents DiGraphs")
+        names = list(nx_graph.nodes)
+        node_attrs = [nx_graph.nodes[n] for n in names]
+        edges = []
+        edge_attrs = []
+        for u, v, attrs in nx_graph.edges(data=True):
+            edges.append((u, v))
+            edge_attrs.append(attrs)
+        return cls._build(names, edges, node_attrs, edge_attrs, nx_graph.graph)
+
+    @classmethod
+    def from_node_link(cls, data: dict):
+        """
+        Build a CompactGraph from node-link JSON (as written to the "graph"
+        entry of a workflow file).
+        """
+        if not data.get("directed", True) or data.get("multigraph", False):
+            raise TypeError("CompactGraph only represents DiGraphs")
+        names = []
+        node_attrs = []
+        for node in data["nodes"]:
+            attrs = dict(node)
+            names.append(attrs.pop("id"))
+            node_attrs.append(attrs)
+        edges = []
+        edge_attrs = []
+        for link in data["links"]:
+            attrs = dict(link)
+            edges.append((attrs.pop("source"), attrs.pop("target")))
+            edge_attrs.append(attrs)
+        return cls._build(
+            names, edges, node_attrs, edge_attrs, data.get("graph")
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays: dict):
+        """
+        Build a CompactGraph from the columns produced by `to_arrays`.
+        """
+        num_nodes = len(arrays["node_prefix"])
+        sources = np.asarray(arrays["edge_source"], dtype=np.int64)
+        _, indptr = _csr(sources, num_nodes)
+        node_data = {a: _attribute_columns(arrays, a) for a in NODE_ATTRIBUTES}
+        edge_data = {a: _attribute_columns(arrays, a) for a in EDGE_ATTRIBUTES}
+        return cls(
+            [str(p) for p in arrays["prefixes"]],
+            arrays["node_prefix"],
+            arrays["node_index"],
+            indptr,
+            arrays["edge_target"],
+            node_data,
+            edge_data,
+        )
+
+    @classmethod
+    def compose(cls, graphs, nodes=(), edges=()):
+        """
+        Combine `graphs`, which share no node names, then add `nodes`
+        ((name, attributes) pairs) and `edges` ((source, target, attributes)
+        triples) between them.
+
+        Nodes, and the successors of each node, are in the order
+        `networkx.DiGraph.add_nodes_from`/`add_edges_from` would leave them
+        in; graph attributes are merged in order.
+        """
+        nodes = list(nodes)
+        edges = list(edges)
+        parts = list(graphs)
+        if nodes:
+            parts.append(
+                cls._build([n for n, _ in nodes], [], [a for _, a in nodes], [])
+            )
+
+        prefix_ids = {}
+        node_prefix = []
+        names = []
+        sources = []
+        targets = []
+        for part in parts:
+            remap = np.array(
+                [prefix_ids.setdefault(p, len(prefix_ids))
+                 for p in part.prefixes],
+                dtype=np.int32,
+            )
+            node_prefix.append(remap[part.node_prefix])
+            sources.append(part.edge_sources().astype(np.int64) + len(names))
+            targets.append(part.indices.astype(np.int64) + len(names))
+            names.extend(part.names())
+        ids = {name: i for i, name in enumerate(names)}
+        if len(ids) != len(names):
+            raise ValueError("Duplicate node names")
+
+        sources.append(np.array([ids[u] for u, _, _ in edges], dtype=np.int64))
+        targets.append(np.array([ids[v] for _, v, _ in edges], dtype=np.int64))
+        extra_numeric, extra_oids = _split_oids(a for _, _, a in edges)
+        extra_data = _attribute_arrays(extra_numeric, EDGE_ATTRIBUTES, "edge")
+
+        sources = np.concatenate(sources)
+        targets = np.concatenate(targets)
+        order, indptr = _csr(sources, len(names))
+
+        node_data = {
+            attr: tuple(
+                np.concatenate([p.node_data[attr][k] for p in parts])
+                for k in range(3)
+            )
+            for attr in NODE_ATTRIBUTES
+        }
+        edge_data = {}
+        for attr in EDGE_ATTRIBUTES:
+            columns = [p.edge_data[attr] for p in parts] + [extra_data[attr]]
+            edge_data[attr] = tuple(
+                np.concatenate([c[k] for c in columns])[order]
+                for k in range(3)
+            )
+        edge_oids = {}
+        for attr in EDGE_OID_ATTRIBUTES:
+            if not any(attr in p.edge_oids for p in parts) and (
+                    attr not in extra_oids):
+                continue
+            oids = []
+            for part in parts:
+                oids.extend(
+                    part.edge_oids.get(attr, [None] * part.number_of_edges())
+                )
+            oids.extend(extra_oids.get(attr, [None] * len(edges)))
+            edge_oids[attr] = [oids[e] for e in order.tolist()]
+
+        graph_attrs = {}
+        for part in graphs:
+            graph_attrs.update(part.graph)
+        compact = cls(
+            list(prefix_ids),
+            np.concatenate(node_prefix),
+            np.concatenate([part.node_index for part in parts]),
+            indptr,
+            targets[order],
+            node_data,
+            edge_data,
+            edge_oids,
+            graph_attrs,
+        )
+        compact._names = names
+        compact._ids = ids
+        return compact
+
+    def to_arrays(self) -> dict:
+        """
+        Columns describing the graph, for the columnar workflow format.
+
+        Node columns are indexed by node ID and edge columns are in CSR
+        order. Each node's workflow and component are available through
+        `prefix_workflow`/`prefix_component` indexed by `node_prefix`. The
+        DALiuGE oids stored on edges, and the graph attributes, are not
+        included.
+        """
+        workflows = [p.partition("_")[0] for p in self.prefixes]
+        components = [p.partition("_")[2] for p in self.prefixes]
+        arrays = {
+            "prefixes": np.array(self.prefixes, dtype=str),
+            "prefix_workflow": np.array(workflows, dtype=str),
+            "prefix_component": np.array(components, dtype=str),
+            "node_prefix": self.node_prefix,
+            "node_index": self.node_index,
+            "edge_source": self.edge_sources(),
+            "edge_target": self.indices,
+        }
+        for data in (self.node_data, self.edge_data):
+            for attr, (values, mask, ints) in data.items():
+                arrays[attr] = values
+                arrays[f"{attr}_mask"] = mask
+                arrays[f"{attr}_int"] = ints
+        return arrays
+
+    # Conversion
+    def node_view(self, i) -> _AttributeView:
+        """
+        Attributes of node `i`, written through to the attribute arrays.
+        """
+        return _AttributeView(self.node_data, i)
+
+    def edge_view(self, e) -> _AttributeView:
+        """
+        Attributes of edge `e` (in CSR order), written through to the
+        attribute arrays.
+        """
+        return _AttributeView(self.edge_data, e, self.edge_oids)
+
+    def node_attributes(self, i) -> dict:
+        return dict(self.node_view(i))
+
+    def edge_attributes(self, e) -> dict:
+        return dict(self.edge_view(e))
+
+    def to_networkx(self) -> nx.DiGraph:
+        nx_graph = nx.DiGraph(**self.graph)
+        nx_graph.add_nodes_from(
+            (name, self.node_attributes(i))
+            for i, name in enumerate(self.names())
+        )
+        names = self.names()
+        nx_graph.add_edges_from(
+            (names[s], names[t], self.edge_attributes(e))
+            for e, (s, t) in enumerate(zip(self.edge_sources(), self.indices))
+        )
+        return nx_graph
+
+    def to_node_link(self) -> dict:
+        """
+        Node-link dictionary matching `networkx.node_link_data(graph,
+        edges="links")`.
+        """
+        nodes = [
+            {**self.node_attributes(i), "id": name}
+            for i, name in enumerate(self.names())
+        ]
+        names = self.names()
+        links = [
+            {**self.edge_attributes(e), "source": names[s], "target": names[t]}
+            for e, (s, t) in enumerate(zip(self.edge_sources(), self.indices))
+        ]
+        return {
+            "directed": True,
+            "multigraph": False,
+            "graph": dict(self.graph),
+            "nodes": nodes,
+            "links": links,
+        }
+
+    # Graph interface
+    def names(self) -> list:
+        if self._names is None:
+            self._names = [
+                p if i < 0 else f"{p}_{i}"
+                for p, i in zip(
+                    (self.prefixes[j] for j in self.node_prefix.tolist()),
+                    self.node_index.tolist(),
+                )
+            ]
+        return self._names
+
+    def node_id(self, node) -> int:
+        if self._ids is None:
+            self._ids = {name: i for i, name in enumerate(self.names())}
+        try:
+            return self._ids[node]
+        except KeyError:
+            raise KeyError(f"Node {node} not in graph") from None
+
+    def edge_sources(self) -> np.ndarray:
+        return np.repeat(
+            np.arange(len(self), dtype=np.int32), np.diff(self.indptr)
+        )
+
+    def _reverse_csr(self):
+        if self._reverse is None:
+            order, indptr = _csr(self.indices, len(self))
+            self._reverse = (indptr, self.edge_sources()[order])
+        return self._reverse
+
+    @property
+    def nodes(self):
+        return _NodeView(self)
+
+    @property
+    def edges(self):
+        return _EdgeView(self)
+
+    @property
+    def in_degree(self):
+        return _DegreeView(self, self._reverse_csr()[0])
+
+    @property
+    def out_degree(self):
+        return _DegreeView(self, self.indptr)
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return False
+
+    def __len__(self):
+        return len(self.node_prefix)
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __contains__(self, node):
+        try:
+            self.node_id(node)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __getitem__(self, node):
+        i = self.node_id(node)
+        names = self.names()
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return {
+            names[self.indices[e]]: self.edge_view(e)
+            for e in range(start, end)
+        }
+
+    def number_of_nodes(self):
+        return len(self)
+
+    def number_of_edges(self):
+        return len(self.indices)
+
+    def successors(self, node):
+        i = self.node_id(node)
+        names = self.names()
+        return iter(
+            [names[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+        )
+
+    neighbors = successors
+
+    def predecessors(self, node):
+        i = self.node_id(node)
+        indptr, indices = self._reverse_csr()
+        names = self.names()
+        return iter([names[j] for j in indices[indptr[i]:indptr[i + 1]]])
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes held in the NumPy arrays (excluding interned strings and oids).
+        """
+        arrays = [self.node_prefix, self.node_index, self.indptr, self.indices]
+        for data in (self.node_data, self.edge_data):
+            for columns in data.values():
+                arrays.extend(columns)
+        return sum(a.nbytes for a in arrays)
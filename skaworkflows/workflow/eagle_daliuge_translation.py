@@ -13,6 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import array
+import collections
+import copy
+import functools
 import subprocess
 import pydot
 import os
@@ -20,11 +24,55 @@ import json
 import random
 import logging
 import math
+import re
+import tempfile
+import threading
 
 import networkx as nx
 
+from skaworkflows.workflow.compact_graph import CompactGraph
+
 LOGGER = logging.getLogger(__name__)
 
+# Prefix used by `dlg unroll` when generating drop OIDs
+DLG_OID_PREFIX = "1"
+
+# Characters read from `dlg unroll` at a time when streaming its output
+STREAM_CHUNK_SIZE = 1 << 16
+
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Characters that can follow an element of a JSON array
+_JSON_DELIMITERS = frozenset(",] \t\n\r")
+
+# How `concatenate_workflows` links one workflow to the next
+HANDOFF_MODES = ("chain", "barrier", "fan")
+# Component name of the node added between workflows by the "barrier" mode
+BARRIER_COMPONENT = "Handoff"
+
+
+@functools.lru_cache(maxsize=None)
+def _load_dlg_translator():
+    """
+    Import the DALiuGE translator functions used by `dlg unroll`.
+
+    The import is deferred until the first translation, as importing the
+    translator is slow and not every user of this module needs it.
+
+    Returns
+    -------
+    (unroll, init_pgt_unroll_repro_data), or None if daliuge-translator is
+    not installed
+    """
+    try:
+        from dlg.dropmake.pg_generator import unroll
+        from dlg.common.reproducibility.reproducibility import (
+            init_pgt_unroll_repro_data
+        )
+    except ImportError:
+        return None
+    return unroll, init_pgt_unroll_repro_data
+
+
 # TODO change "channels" to "parallelism"
 def update_graph_parallelism(lgt_path, channels, telescope_demand=512):
     """
@@ -137,6 +185,210 @@ def unroll_logical_graph(input_lgt, output_pgt_path=None, file_in=True):
         return result.stdout
 
 
+def unroll_logical_graph_in_process(input_lgt, file_in=True):
+    """
+    Take an EAGLE LGT and produce a PGT by calling the DALiuGE translator
+    directly, rather than through `dlg unroll`.
+
+    Parameters
+    ----------
+    input_lgt: str or dict
+        Either the path to a LGT file, or the LGT dictionary (e.g. the
+        output of `update_graph_parallelism`)
+    file_in : bool
+        True if `input_lgt` is a path
+
+    Notes
+    -----
+    This produces the same drop list as `unroll_logical_graph` (including
+    the trailing reproducibility entry), but as Python objects; there is no
+    interpreter start-up or JSON round trip through stdout.
+
+    The translator modifies the LGT it is given, so we pass it a copy.
+
+    Returns
+    -------
+    pgt : list
+        List of drop dictionaries
+
+    Raises
+    ------
+    ImportError
+        If daliuge-translator is not installed
+    """
+    translator = _load_dlg_translator()
+    if translator is None:
+        raise ImportError("daliuge-translator is required for in-process "
+                          "unrolling")
+    unroll, init_pgt_unroll_repro_data = translator
+    if file_in:
+        with open(input_lgt) as fp:
+            lgt = json.load(fp)
+    else:
+        lgt = copy.deepcopy(input_lgt)
+    LOGGER.info("Translating EAGLE graph in-process...")
+    return init_pgt_unroll_repro_data(unroll(lgt, oid_prefix=DLG_OID_PREFIX))
+
+
+def iter_json_array(fp, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the elements of the JSON array in the text file `fp` one at a
+    time, without reading the whole file.
+
+    Parameters
+    ----------
+    fp : file-like
+        Text stream, e.g. the stdout of a subprocess
+    chunk_size : int
+        Number of characters read at a time. Elements larger than this are
+        read in increasingly large chunks.
+
+    Notes
+    -----
+    Each element is decoded with `json.JSONDecoder.raw_decode` once the
+    buffered text contains all of it, so only the text of the current
+    element (and the rest of the last chunk) is held in memory.
+
+    Raises
+    ------
+    ValueError
+        If the text is not a JSON array (`json.JSONDecodeError` if an element
+        is malformed)
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    # "start" (before '['), "first" (after '['), "value" (after ','), or
+    # "separator" (after an element)
+    state = "start"
+    while True:
+        pos = _JSON_WHITESPACE.match(buffer, pos).end()
+        if state == "value" and pos < len(buffer):
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # A number decoded from the buffer may be the prefix of one that
+            # continues in the next chunk (e.g. "1" of "1.25"), so an element
+            # is only complete once a delimiter follows it
+            if end is not None and (
+                    eof or buffer[end:end + 1] in _JSON_DELIMITERS
+            ):
+                yield element
+                pos = end
+                state = "separator"
+                continue
+        elif pos < len(buffer):
+            char = buffer[pos]
+            if state == "start" and char == "[":
+                state = "first"
+            elif state != "start" and char == "]":
+                return
+            elif state == "separator" and char == ",":
+                state = "value"
+            elif state == "first":
+                state = "value"
+                continue
+            else:
+                raise ValueError(
+                    f"Unexpected {char!r} in JSON array at offset {pos}"
+                )
+            pos += 1
+            continue
+        if eof:
+            raise ValueError("Unexpected end of JSON array")
+        buffer = buffer[pos:]
+        pos = 0
+        chunk = fp.read(max(chunk_size, len(buffer)))
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_unrolled_pgt(input_lgt, file_in=True):
+    """
+    Unroll an EAGLE LGT with `dlg unroll`, yielding the PGT drops as they are
+    read from its output.
+
+    Unlike `unroll_logical_graph`, the output is never held in memory as a
+    whole: each drop is parsed from the pipe (see `iter_json_array`) and can
+    be discarded once it is used, e.g. by `daliuge_to_nx`.
+
+    Parameters
+    ----------
+    input_lgt : str or dict
+        Path to an LGT file, or the LGT dictionary if `file_in` is False
+    file_in : bool
+        True if `input_lgt` is a path
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If `dlg unroll` fails
+    """
+    if file_in:
+        cmd_list = ['dlg', 'unroll', '-L', f'{input_lgt}']
+    else:
+        cmd_list = ['dlg', 'unroll', '-fv', '-L', '/dev/stdin']
+
+    LOGGER.info("Translating EAGLE graph (streamed)...")
+    with tempfile.TemporaryFile() as stderr, subprocess.Popen(
+            cmd_list,
+            stdin=subprocess.DEVNULL if file_in else subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            text=True,
+    ) as process:
+        writer = None
+        if not file_in:
+            # Written from a thread, as `dlg` may fill the stdout pipe before
+            # it has read all of the LGT
+            writer = threading.Thread(
+                target=_write_and_close, args=(process.stdin, input_lgt),
+                daemon=True
+            )
+            writer.start()
+        try:
+            yield from iter_json_array(process.stdout)
+        except GeneratorExit:
+            # The drops are no longer needed
+            process.kill()
+            _finish_unroll(process, writer)
+            raise
+        except ValueError:
+            # Report the translator's error rather than the truncated output
+            if _finish_unroll(process, writer) == 0:
+                raise
+        else:
+            _finish_unroll(process, writer)
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise subprocess.CalledProcessError(
+                process.returncode, cmd_list,
+                stderr=stderr.read().decode(errors="replace")
+            )
+
+
+def _finish_unroll(process, writer):
+    """
+    Wait for a streamed `dlg unroll`, returning its exit code.
+    """
+    process.stdout.close()
+    if writer is not None:
+        writer.join()
+    return process.wait()
+
+
+def _write_and_close(stream, lgt):
+    try:
+        json.dump(lgt, stream)
+        stream.close()
+    except BrokenPipeError:  # `dlg` exited early; reported by its return code
+        pass
+
+
 def generate_graphic_from_networkx_graph(nx_graph, output_path):
     """
     Given an networkx graph, produce a Graphviz 'dot'
@@ -156,7 +408,21 @@ def generate_graphic_from_networkx_graph(nx_graph, output_path):
     # cmd_list = ['dot', 'unroll', '-fv', '-L', ]
 
 
-def eagle_to_nx(eagle_graph, workflow, file_in=True, cached_workflow=None):
+def unroll_to_pgt(eagle_graph, file_in=True, in_process=True):
+    """
+    Unroll an EAGLE LGT into the list of PGT drops, in-process if the
+    DALiuGE translator is installed and `in_process` is True, otherwise with
+    `dlg unroll`.
+    """
+    if in_process and _load_dlg_translator() is not None:
+        return unroll_logical_graph_in_process(eagle_graph, file_in=file_in)
+    return list(iter_unrolled_pgt(eagle_graph, file_in=file_in))
+
+
+def eagle_to_nx(
+        eagle_graph, workflow, file_in=True, cached_workflow=None,
+        in_process=True, edge_oids=True, stream=False
+):
     """
     Produce a JSON-compatible dictionary of a topsim graph
 
@@ -170,6 +436,18 @@ def eagle_to_nx(eagle_graph, workflow, file_in=True, cached_workflow=None):
         Necessary for when we concatenate the workflows together.
     file_in : bool
         True if passing a file; False if passing in a string represetnation
+    cached_workflow : list, optional
+        Previously unrolled PGT to use instead of translating `eagle_graph`
+    in_process : bool
+        If True, call the DALiuGE translator directly when it is installed;
+        otherwise (or as a fallback) run `dlg unroll` in a subprocess.
+    edge_oids : bool
+        Store DALiuGE oids on the edges (see `daliuge_to_nx`).
+    stream : bool
+        Convert the drops as they are read from `dlg unroll` (see
+        `iter_unrolled_pgt`) rather than unrolling the whole PGT first, so
+        the PGT is never held in memory. The translator always runs in a
+        subprocess, and no PGT is returned.
 
     Notes
     -----
@@ -182,7 +460,8 @@ def eagle_to_nx(eagle_graph, workflow, file_in=True, cached_workflow=None):
     -------
     unrolled_nx : :py:object:`networkx.DiGraph`
     task_dict : dictc
-    cached_graph : dict
+    cached_graph : list
+        The unrolled PGT, or None if `stream` is True
 
     """
 
@@ -192,17 +471,21 @@ def eagle_to_nx(eagle_graph, workflow, file_in=True, cached_workflow=None):
             raise FileExistsError(f'{eagle_graph} does not exist')
 
     LOGGER.info(f"Preparing {workflow} for LGT->PGT Translation")
-    if cached_workflow is None:
-        daliuge_json = unroll_logical_graph(eagle_graph, file_in=file_in)
+    if cached_workflow is not None:
+        LOGGER.info(f"Using cached translation for workflow")
+        jdict = drops = cached_workflow
+    elif stream:
+        jdict = None
+        drops = iter_unrolled_pgt(eagle_graph, file_in=file_in)
+    else:
+        jdict = drops = unroll_to_pgt(
+            eagle_graph, file_in=file_in, in_process=in_process
+        )
         LOGGER.info("Finished translating graph")
-        jdict = json.loads(daliuge_json)
         # with open(f"unrolled_{file_in}.json", 'w') as fp:
         #     json.dump(jdict, fp, indent=2)
-    else:
-        LOGGER.info(f"Using cached translation for workflow")
-        jdict = cached_workflow
 
-    unrolled_nx, task_dict = daliuge_to_nx(jdict, workflow)
+    unrolled_nx, task_dict = daliuge_to_nx(drops, workflow, edge_oids)
 
     # Convering DALiuGE nodes to readable nodes
     LOGGER.info(f"Graph converted to TopSim-compliant data")
@@ -210,7 +493,7 @@ def eagle_to_nx(eagle_graph, workflow, file_in=True, cached_workflow=None):
     return unrolled_nx, task_dict, jdict
 
 
-def daliuge_to_nx(dlg_json_dict, workflow):
+def daliuge_to_nx(dlg_json_dict, workflow, edge_oids=True):
     """
 
     Take a daliuge json file and read it into a NetworkX
@@ -223,6 +506,10 @@ def daliuge_to_nx(dlg_json_dict, workflow):
     workflow : str
         What type of workflow (i.e. DPrepA, DPrepB, ICAL) to append to
         the names of components
+    edge_oids : bool
+        Store the DALiuGE oids of the producer, consumer and data drop of
+        each edge as its "u", "v" and "data_drop_oid" attributes. These are
+        only used for debugging, and take most of the memory of the edges.
 
     Returns
     -------
@@ -235,74 +522,104 @@ def daliuge_to_nx(dlg_json_dict, workflow):
     Adapted from code in SHADOW library.
     https://github.com/myxie/shadow
 
+    The PGT is read in a single pass. Each drop oid is mapped to a dense
+    index when it is first referenced, and edges are stored as arrays of
+    these indices, as a data drop may refer to applications that appear
+    later in the PGT. Node names are built once per node, after the pass.
 
     """
     LOGGER.info("Converting DALiuGE to networkx...")
-    unrolled_nx = nx.DiGraph()
-    labels = {}
-    node_list = []
-    edge_list = []
+    # oid -> dense index, in the order oids are first referenced
+    index = {}
+    # (index, task name, instance number) of each application, in PGT order
+    applications = []
+    edge_u = array.array('q')
+    edge_v = array.array('q')
+    # Per edge, index into `data_oids`
+    edge_data = array.array('q')
+    data_oids = []
+    # Index of the producer of each data drop
+    producers = array.array('q')
     # store task names and counts
     task_names = {}
 
     for element in dlg_json_dict:
-        if 'categoryType' in element:
-            if element['categoryType'] == 'Application' or element['categoryType'] == 'Control':
-                oid = element['oid']
-                label = element['name']
-                if label in task_names:
-                    task_names[label]['node'] += 1
-                else:
-                    task_names[label] = {'node': 1}
-                labels[oid] = f"{label}_{task_names[label]['node'] - 1}"
-                name = f"{workflow}_{labels[oid]}"
-                node = (name, {'comp': 0})
-                node_list.append(node)
+        if not isinstance(element, dict):
+            continue
+        category = element.get('categoryType')
+        if category == 'Application' or category == 'Control':
+            label = element['name']
+            counts = task_names.setdefault(label, {'node': 0})
+            applications.append((
+                index.setdefault(element['oid'], len(index)),
+                label,
+                counts['node']
+            ))
+            counts['node'] += 1
+        elif (category == 'Data' and element.get('producers')
+              and 'consumers' in element):
+            element_producers = [
+                index.setdefault(
+                    next(iter(u)) if isinstance(u, dict) else u, len(index)
+                )
+                for u in element['producers']
+            ]
+            consumers = [
+                index.setdefault(
+                    next(iter(v)) if isinstance(v, dict) else v, len(index)
+                )
+                for v in element['consumers']
+            ]
+            producers.extend(element_producers)
+            for u in element_producers:
+                edge_u.extend([u] * len(consumers))
+                edge_v.extend(consumers)
+            if edge_oids:
+                edge_data.extend(
+                    [len(data_oids)] * (len(element_producers) * len(consumers))
+                )
+                data_oids.append(element['oid'])
+
+    node_names = [None] * len(index)
+    node_labels = [None] * len(index)
+    for i, label, n in applications:
+        node_names[i] = f"{workflow}_{label}_{n}"
+        node_labels[i] = label
+    oids = list(index)
+    if None in node_labels:
+        # Edges can only be between applications
+        raise KeyError(oids[node_labels.index(None)])
+
+    for u in producers:
+        counts = task_names[node_labels[u]]
+        counts['out_edge'] = counts.get('out_edge', 0) + 1
 
-    for element in dlg_json_dict:
-        if 'categoryType' in element:
-            if (element['categoryType'] == 'Data') and (
-                    'producers' in element and 'consumers' in element
-            ):
-                for uentry in element['producers']:
-                    try:
-                        uentry.keys()
-                    except AttributeError:
-                        u = uentry
-                    else:
-                        u = list(uentry.keys())[0]
-                    component, num = labels[u].split('_')
-                    if 'out_edge' in task_names[component]:
-                        task_names[component]['out_edge'] += 1
-                    else:
-                        task_names[component]['out_edge'] = 1
-                    for ventry in element['consumers']:
-                        try:
-                            ventry.keys()
-                        except AttributeError:
-                            v = ventry
-                        else:
-                            v = list(ventry.keys())[0]
-                        edge_list.append(
-                            (
-                                f'{workflow}_{labels[u]}',
-                                f'{workflow}_{labels[v]}',
-                                {
-                                    "transfer_data": 0,
-                                    'u': u,
-                                    'v': v,
-                                    'data_drop_oid': element['oid']
-                                }
-                            )
-                        )
-    unrolled_nx.add_nodes_from(node_list)
-    unrolled_nx.add_edges_from(edge_list)
+    unrolled_nx = nx.DiGraph()
+    unrolled_nx.add_nodes_from(
+        (node_names[i], {'comp': 0}) for i, _, _ in applications
+    )
+    if edge_oids:
+        unrolled_nx.add_edges_from(
+            (node_names[u], node_names[v], {
+                "transfer_data": 0,
+                'u': oids[u],
+                'v': oids[v],
+                'data_drop_oid': data_oids[d]
+            })
+            for u, v, d in zip(edge_u, edge_v, edge_data)
+        )
+    else:
+        unrolled_nx.add_edges_from(
+            ((node_names[u], node_names[v]) for u, v in zip(edge_u, edge_v)),
+            transfer_data=0
+        )
 
     return unrolled_nx, task_names
 
 
 def concatenate_workflows(
-        unrolled_graphs: dict = None, workflows: list = None
+        unrolled_graphs: dict = None, workflows: list = None, in_place=False,
+        handoff="chain", handoff_data=None, barrier_attributes=None
 ):
     """
     For a list of workflows and unrolled graphs, generate a concatenated
@@ -313,26 +630,120 @@ def concatenate_workflows(
     If one looks into how the SDP parametric model works, it takes into account
     all pipelines when generating a schedule for a particular observation.
 
+    How each workflow is linked to the next depends on `handoff`:
+
+    - "chain": the last node in the topological order of the previous
+      workflow to the first node of the next, with no data. Both are found
+      with one traversal of each graph (see `_first_and_last_nodes`). When
+      a workflow has several sinks, the others do not hold up the next
+      workflow.
+    - "barrier": every sink of the previous workflow to a
+      "<workflow>_Handoff_0" node, and that node to every source of the
+      next workflow, with no data. The next workflow starts only once all of
+      the previous workflow has finished.
+    - "fan": every sink of the previous workflow to every source of the
+      next, sharing the workflow's `handoff_data` equally between these
+      edges.
+
     Parameters
     ----------
     unrolled_graphs
     workflows
+    in_place : bool
+        Add the other graphs to the first graph in `unrolled_graphs` and
+        return it, rather than copying every graph into a new one.
+        :py:obj:`CompactGraph` inputs are always combined into a new
+        `CompactGraph` (see `CompactGraph.compose`).
+    handoff : str
+        One of `HANDOFF_MODES`
+    handoff_data : dict, optional
+        Workflow -> data (bytes) it reads from the previous workflow; used by
+        the "fan" mode.
+    barrier_attributes : dict, optional
+        Attributes of the barrier nodes, which default to no compute or data.
 
     Returns
     -------
 
     """
-    # final_graph = nx.DiGraph()
-    wfs = [w for w in workflows]
-    start = wfs[0]
-    # start_graph = unrolled_graphs[start]
-    curr_parent = list(nx.topological_sort(unrolled_graphs[start]))[-1]
-    wfs.remove(start)
-    final_graph = nx.compose_all(list(unrolled_graphs.values()))
-    for w in wfs:
-        curr_child = list(nx.topological_sort(unrolled_graphs[w]))[0]
-        final_graph.add_edge(curr_parent, curr_child, transfer_data=0)
-        curr_parent = list(nx.topological_sort(unrolled_graphs[w]))[-1]
+    if handoff not in HANDOFF_MODES:
+        raise ValueError(f"Unsupported handoff '{handoff}'")
+    handoff_data = handoff_data or {}
+    # Found before the graphs are merged, which may change the first graph
+    if handoff == "chain":
+        endpoints = [
+            _first_and_last_nodes(unrolled_graphs[w]) for w in workflows
+        ]
+        endpoints = [([first], [last]) for first, last in endpoints]
+    else:
+        endpoints = [
+            _sources_and_sinks(unrolled_graphs[w]) for w in workflows
+        ]
+    nodes = []
+    edges = []
+    for w, (_, parents), (children, _) in zip(
+            workflows[1:], endpoints, endpoints[1:]
+    ):
+        if handoff == "barrier":
+            barrier = f"{w}_{BARRIER_COMPONENT}_0"
+            nodes.append(
+                (barrier,
+                 dict(barrier_attributes or {"comp": 0, "task_data": 0}))
+            )
+            edges.extend(
+                (parent, barrier, {"transfer_data": 0}) for parent in parents
+            )
+            edges.extend(
+                (barrier, child, {"transfer_data": 0}) for child in children
+            )
+        else:
+            transfer_data = 0
+            if handoff == "fan":
+                transfer_data = (
+                    handoff_data.get(w, 0) / (len(parents) * len(children))
+                )
+            edges.extend(
+                (parent, child, {"transfer_data": transfer_data})
+                for parent in parents for child in children
+            )
+
+    graphs = list(unrolled_graphs.values())
+    if isinstance(graphs[0], CompactGraph):
+        return CompactGraph.compose(graphs, nodes, edges)
+    if in_place:
+        final_graph = graphs[0]
+        graphs = graphs[1:]
+    else:
+        final_graph = graphs[0].__class__()
+    for graph in graphs:
+        final_graph.graph.update(graph.graph)
+        final_graph.add_nodes_from(graph.nodes(data=True))
+        final_graph.add_edges_from(graph.edges(data=True))
+    final_graph.add_nodes_from(nodes)
+    final_graph.add_edges_from(edges)
 
     return final_graph
 
+
+def _sources_and_sinks(graph):
+    """
+    The nodes of `graph` without predecessors, and those without successors.
+    """
+    sources = [node for node, degree in graph.in_degree() if degree == 0]
+    sinks = [node for node, degree in graph.out_degree() if degree == 0]
+    return sources, sinks
+
+
+def _first_and_last_nodes(graph):
+    """
+    The first and last nodes of `nx.topological_sort(graph)`, without
+    building the order.
+
+    `nx.topological_sort` lists the topological generations in turn, so
+    these are the first node of the first generation and the last node of
+    the last generation.
+    """
+    generations = nx.topological_generations(graph)
+    first = next(generations)
+    last = collections.deque(generations, maxlen=1)
+    return first[0], (last[0] if last else first)[-1]
@@ -27,7 +27,11 @@ information
         - Multiple-pipelines per HPSO
 """
 
-import datetime
+import copy
+import dataclasses
+import functools
+import hashlib
+import itertools
 import json
 import logging
 import math
@@ -35,14 +39,33 @@ import os
 import random
 import sys
 
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 import networkx as nx
 
-from typing import List, Dict
+from typing import List, Dict, NamedTuple
 from pathlib import Path
 
 import skaworkflows.workflow.eagle_daliuge_translation as edt
 
+from skaworkflows.workflow.compact_graph import CompactGraph
+from skaworkflows.workflow.pgt_cache import PGTCache, default_cache_dir
+from skaworkflows.workflow.scatter_template import (
+    ScatterTemplate, TEMPLATE_COPIES
+)
+from skaworkflows.workflow.scheduler import (
+    DemandTree, pack_epochs, pack_observations
+)
+from skaworkflows.workflow.sizing import SizingIndex
+from skaworkflows.workflow.workflow_io import (
+    COLUMNAR_SUFFIX,
+    COMPRESSION_SUFFIX,
+    write_workflow,
+    write_workflow_columns,
+)
+
 from skaworkflows.common import (
     SI,
     create_workflow_header,
@@ -51,11 +74,16 @@ BASIC_PROTOTYPE_GRAPH,
     SCATTER_GRAPH,
     PULSAR_GRAPH,
     BYTES_PER_VIS,
-    Telescope
+    Telescope,
+    atomic_write,
 )
 
 LOGGER = logging.getLogger(__name__)
 
+# Bump when a change to the costing code alters the workflows it produces, so
+# that existing workflows are no longer matched by `workflow_fingerprint`.
+COST_MODEL_VERSION = 1
+
 
 def process_hpso_from_spec(hpsos: dict):
     """
@@ -129,11 +157,88 @@ def create_observation_from_hpso(
     return obslist
 
 
+@dataclasses.dataclass(frozen=True, slots=True, eq=False)
+class ObservationSpec:
+    """
+    The immutable parameters of an observation.
+
+    Specs compare by value, and hash to a stable digest of their parameters,
+    so the same observation hashes the same in every process and run.
+    See :py:obj:`Observation` for a description of the parameters.
+    """
+    name: str
+    hpso: str
+    workflows: tuple
+    demand: int
+    duration: int
+    channels: int
+    workflow_parallelism: int
+    baseline: float
+    telescope: str
+    digest: str = dataclasses.field(init=False, repr=False)
+
+    def __post_init__(self):
+        workflows = self.workflows
+        if isinstance(workflows, str):
+            workflows = (workflows,)
+        object.__setattr__(self, "workflows", tuple(workflows))
+        parameters = [
+            self.name, self.hpso, self.workflows, self.demand, self.duration,
+            self.channels, self.workflow_parallelism, float(self.baseline),
+            self.telescope,
+        ]
+        object.__setattr__(self, "digest", hashlib.blake2b(
+            json.dumps(parameters, default=_json_scalar).encode(),
+            digest_size=16
+        ).hexdigest())
+
+    def __eq__(self, other):
+        if not isinstance(other, ObservationSpec):
+            return NotImplemented
+        return self.digest == other.digest
+
+    def __hash__(self):
+        return int(self.digest[:16], 16)
+
+
+def _json_scalar(value):
+    """
+    JSON representation of NumPy scalar parameters.
+    """
+    try:
+        return value.item()
+    except AttributeError:
+        raise TypeError(f"{value!r} is not JSON serializable") from None
+
+
+@dataclasses.dataclass(slots=True)
+class ObservationState:
+    """
+    The scheduling state of an observation in a plan.
+    """
+    start: int = 0
+    planned: bool = False
+    workflow_path: str = None
+    ingest_compute_demand: int = None
+    ingest_flop_rate: float = None
+    ingest_data_rate: float = None
+
+
+_STATE_FIELDS = frozenset(f.name for f in dataclasses.fields(ObservationState))
+
+
 class Observation:
     """
     Helper-class to store information for when generating observation schedule
+
+    The parameters of the observation are an immutable
+    :py:obj:`ObservationSpec`, which may be shared between plans, and its
+    start time and ingest demands are an :py:obj:`ObservationState` belonging
+    to this observation. Both are available as attributes of the observation.
     """
 
+    __slots__ = ("spec", "state")
+
     def __init__(
             self,
             name,
@@ -154,7 +259,7 @@ class Observation:
         hpso : str
             The high-priority science project the observation is associated with
         duration : int
-            The duration of the observation in minutes
+            The duration of the observation in seconds
         workflows : list()
             List of paths to imaging pipelines for process the observation data
         channels : int
@@ -166,48 +271,68 @@ class Observation:
         baseline: float
             The length of the baseline used in observation.
         """
-        self.name = name
-        self.telescope = telescope
-        self.hpso = hpso
-        self.demand = demand
-        self.start = 0
-        self.duration = duration
-        self.workflows = workflows
-        self.channels = channels
-        self.workflow_parallelism = workflow_parallelism
-        self.baseline = baseline
-        self.workflow_path = None
-        self.planned = False
-        self.ingest_compute_demand = None
-        self.ingest_flop_rate = None
-        self.ingest_data_rate = None
+        self.spec = ObservationSpec(
+            name, hpso, workflows, demand, duration, channels,
+            workflow_parallelism, baseline, telescope
+        )
+        self.state = ObservationState()
 
-    def __hash__(self):
+    @classmethod
+    def from_spec(cls, spec, state=None):
+        """
+        Create an observation of `spec`, with a new state unless one is given.
         """
-        Construct a hash of observation parameters to determine if one is
-        equivalent to another
+        observation = cls.__new__(cls)
+        observation.spec = spec
+        observation.state = state if state is not None else ObservationState()
+        return observation
 
-        If an observation has the same:
-        * HPSO
-        * Demand
-        * Duration
-        * Baseline
+    def replace(self, **parameters):
+        """
+        A copy of this observation with different parameters.
+        """
+        return Observation.from_spec(
+            dataclasses.replace(self.spec, **parameters),
+            copy.copy(self.state)
+        )
 
-        It is the same workflow
+    def __getattr__(self, attr):
+        if attr in _STATE_FIELDS:
+            return getattr(self.state, attr)
+        if attr.startswith("__") or attr in Observation.__slots__:
+            raise AttributeError(attr)
+        return getattr(self.spec, attr)
+
+    def __setattr__(self, attr, value):
+        if attr in _STATE_FIELDS:
+            setattr(self.state, attr, value)
+        elif attr in Observation.__slots__:
+            object.__setattr__(self, attr, value)
+        else:
+            raise AttributeError(
+                f"Observation parameter '{attr}' is immutable; "
+                f"use Observation.replace()"
+            )
 
-        Returns
-        -------
+    def __copy__(self):
+        # Plans copy observations to schedule them, so the state is not shared
+        return Observation.from_spec(self.spec, copy.copy(self.state))
 
+    def __hash__(self):
         """
-        return hash(
-            self.name + (str(self.demand + self.workflow_parallelism + int(self.baseline)))
-        )
+        Hash of the observation parameters, which is stable between runs.
+
+        If an observation has the same parameters it is the same workflow
+        """
+        return hash(self.spec)
 
     def __repr__(self):
-        return self.name
+        return str(self.spec.name)
 
     def __eq__(self, other):
-        return self.__hash__() == other.__hash__()
+        if not isinstance(other, Observation):
+            return NotImplemented
+        return self.spec == other.spec
 
     def add_start_time(self, start):
         self.start = start
@@ -232,7 +357,7 @@ class Observation:
         }
 
 
-def create_observation_plan(hpsos, max_telescope_usage):
+def create_observation_plan(hpsos, max_telescope_usage, scheduler="legacy"):
     """
     Given a sequence of HPSOs that are present in the system sizing
     dictionary, generate a plan. of observations from which we can create
@@ -249,6 +374,14 @@ def create_observation_plan(hpsos, max_telescope_usage):
         time. For some simulations, it may be necessary to only 'simulate' a
         smaller demand on the telescope.
 
+    scheduler : str
+        "legacy" (default) re-sorts and rescans the unplanned observations on
+        every pass. "tree" finds the observations that fit in each slot with
+        a :py:obj:`~skaworkflows.workflow.scheduler.DemandTree`, placing each
+        in O(log n); a slot lasts until its longest observation finishes,
+        and observations that can never fit raise `ValueError`. "tree" will
+        become the default in the next release.
+
     Notes
     -----
     Observation scheduling is normally a challenging process and quite
@@ -278,6 +411,10 @@ def create_observation_plan(hpsos, max_telescope_usage):
         and so promote these as the range of compute required for real-time
         execution).
     """
+    if scheduler == "tree":
+        return _create_observation_plan_tree(hpsos, max_telescope_usage)
+    if scheduler != "legacy":
+        raise ValueError(f"Unsupported scheduler '{scheduler}'")
 
     plan = []
 
@@ -343,8 +480,107 @@ def create_observation_plan(hpsos, max_telescope_usage):
     return plan
 
 
+def _create_observation_plan_tree(hpsos, max_telescope_usage):
+    """
+    `create_observation_plan` without rescanning the unplanned observations.
+
+    The unplanned observations are always considered in the same order
+    (sorted on baseline and duration), so we sort them once and keep their
+    demands in a :py:obj:`DemandTree`. The largest observation is then the
+    last one remaining in the tree, and filling a slot is a sequence of
+    first-fit queries for the remaining capacity.
+
+    Notes
+    -----
+    This follows the same policy as the original loop, including the
+    `loop_count` heuristic for when to place the largest observation. The
+    one difference is that a slot always lasts until its longest observation
+    finishes; previously, a shorter "largest" observation placed after
+    another could end the slot early.
+    """
+    observations = sorted(hpsos, key=lambda obs: (obs.baseline, obs.duration))
+    tree = DemandTree([o.demand for o in observations])
+    plan = []
+
+    current_tel_usage = 0
+    loop_count = 0
+    start = 0
+    finish = -1
+
+    def place(i):
+        nonlocal current_tel_usage, loop_count, finish
+        observation = observations[i]
+        observation.add_start_time(start)
+        observation.planned = True
+        plan.append(observation)
+        tree.remove(i)
+        current_tel_usage += observation.demand
+        loop_count += 1
+        finish = max(finish, start + observation.duration)
+
+    while tree:
+        if len(tree) > 1 and loop_count % len(tree) == 0:
+            largest = tree.last()
+            if (finish == -1 or current_tel_usage + observations[largest].demand
+                    <= max_telescope_usage):
+                place(largest)
+            else:
+                loop_count += 1
+            continue
+
+        # Fill the rest of the slot, smallest first
+        i = tree.first_fit(max_telescope_usage - current_tel_usage)
+        while i != -1:
+            place(i)
+            i = tree.first_fit(max_telescope_usage - current_tel_usage, i + 1)
+        if finish == -1:
+            # The original loop would never terminate here
+            remaining = [o.name for o in observations if not o.planned]
+            raise ValueError(
+                f"Observations {remaining} do not fit within a telescope "
+                f"usage of {max_telescope_usage}"
+            )
+        start = finish
+        finish = -1
+        current_tel_usage = 0
+
+    LOGGER.debug(f"{plan=}")
+    return plan
+
+
 def create_basic_plan(hpsos, max_telescope_usage, with_concurrent=False,
-                      existing_plan=None):
+                      existing_plan=None, packing="epoch"):
+    """
+    Plan the observations in a random order.
+
+    Parameters
+    ----------
+    hpsos : list
+        List of :py:obj:`Observation`
+    max_telescope_usage : int
+        Maximum telescope demand at any time
+    with_concurrent : bool
+        If False, observations run one after the other. Otherwise they run
+        concurrently, as far as `max_telescope_usage` allows, according to
+        `packing`.
+    existing_plan : list, optional
+        Observations to re-plan instead of `hpsos`
+    packing : str
+        How concurrent observations are packed:
+        - "epoch": the observations that fit are started together, and the
+          next set starts when the longest of them has finished.
+        - "event": demand is released as each observation finishes and
+          immediately backfilled with the next observations that fit (see
+          `scheduler.pack_observations`).
+
+    Returns
+    -------
+    plan : list
+        Planned observations, in the order they were placed. See
+        `scheduler.plan_utilisation` to evaluate a plan.
+    """
+    if packing not in ("epoch", "event"):
+        raise ValueError(f"Unsupported packing '{packing}'")
     plan = []
 
     current_tel_usage = 0
@@ -357,6 +593,16 @@ def create_basic_plan(hpsos, max_telescope_usage, with_concurrent=False,
     else:
         observations = [o for o in hpsos]
     random.shuffle(observations)
+    if with_concurrent and packing == "event":
+        for observation in observations:
+            if observation.demand > max_telescope_usage:
+                LOGGER.warning("Observation demand exceeds telescope; review config.")
+                sys.exit(1)
+        for start, i in pack_observations(observations, max_telescope_usage):
+            observations[i].add_start_time(start)
+            observations[i].planned = True
+            plan.append(observations[i])
+        return plan
     while observations:
         if with_concurrent:
             for observation in observations:
@@ -399,51 +645,183 @@ def create_basic_plan(hpsos, max_telescope_usage, with_concurrent=False,
 # def reset_observation_plan_times(observation_plan: list, with_concurrent=False):
 
 
-import copy
+
+
+class PlanPermutation(NamedTuple):
+    """
+    An observation plan, stored as indices into a shared table of
+    observations rather than as copies of them.
+
+    Attributes
+    ----------
+    order : numpy.ndarray
+        Position in the observation table of each planned observation
+    start : numpy.ndarray
+        Start time of each planned observation
+    """
+    order: np.ndarray
+    start: np.ndarray
+
+    def observations(self, table):
+        """
+        Copies of the planned observations, with their start times set.
+
+        Parameters
+        ----------
+        table : sequence
+            The :py:obj:`Observation` table `order` indexes into
+
+        Returns
+        -------
+        plan : list
+        """
+        plan = []
+        for i, start in zip(self.order.tolist(), self.start.tolist()):
+            observation = copy.copy(table[i])
+            observation.add_start_time(start)
+            observation.planned = True
+            plan.append(observation)
+        return plan
+
+
+def insertion_orders(observation_plan, stride=1):
+    """
+    Orders of `observation_plan` with its largest observation moved to
+    different positions.
+
+    The first order is the plan itself; the largest observation (by demand,
+    then channels) is then inserted every `stride` positions after the first
+    of the other observations.
+
+    Parameters
+    ----------
+    observation_plan : list
+    stride : int
+
+    Yields
+    ------
+    numpy.ndarray
+        Indices into `observation_plan`
+    """
+    n = len(observation_plan)
+    yield np.arange(n)
+    if n < 2:
+        return
+    largest = max(
+        reversed(range(n)),
+        key=lambda i: (observation_plan[i].demand, observation_plan[i].channels)
+    )
+    rest = np.delete(np.arange(n), largest)
+    for i in range(stride, n, stride):
+        yield np.insert(rest, i, largest)
+
+
+def plan_permutations(observation_plan, max_telescope_usage, orders=None,
+                      with_concurrent=False, packing="epoch"):
+    """
+    Lazily plan the observations in each of `orders`, skipping duplicates.
+
+    Each plan is a :py:obj:`PlanPermutation` over the same observation
+    table, so exploring many permutations does not copy any observations.
+    Two orders give the same plan if they start the same observations at the
+    same times; observations that compare equal are interchangeable.
+
+    Parameters
+    ----------
+    observation_plan : list
+        The :py:obj:`Observation` table
+    max_telescope_usage : int
+    orders : iterable, optional
+        Sequences of indices into `observation_plan`. Defaults to
+        `insertion_orders(observation_plan)`.
+    with_concurrent : bool
+        As for `create_basic_plan`
+    packing : str
+        As for `create_basic_plan`
+
+    Yields
+    ------
+    :py:obj:`PlanPermutation`
+    """
+    if packing not in ("epoch", "event"):
+        raise ValueError(f"Unsupported packing '{packing}'")
+    table = tuple(observation_plan)
+    if orders is None:
+        orders = insertion_orders(table)
+    durations = np.array([o.duration for o in table])
+    classes = {}
+    canonical = np.array(
+        [classes.setdefault(o, len(classes)) for o in table], dtype=np.intp
+    )
+    seen = set()
+    for order in orders:
+        order = np.asarray(order, dtype=np.intp)
+        if not with_concurrent:
+            start = np.zeros(len(order), dtype=durations.dtype)
+            np.cumsum(durations[order][:-1], out=start[1:])
+        else:
+            pack = pack_observations if packing == "event" else pack_epochs
+            start = np.empty(len(order), dtype=durations.dtype)
+            for t, i in pack([table[i] for i in order], max_telescope_usage):
+                start[i] = t
+        by_start = np.lexsort((canonical[order], start))
+        key = (start[by_start].tobytes()
+               + canonical[order][by_start].tobytes())
+        if key in seen:
+            continue
+        seen.add(key)
+        yield PlanPermutation(order, start)
 
 
 def alternate_plan_composition(observation_plan: list, max_telescope_usage,
-                               with_concurrent=False):
+                               with_concurrent=False, shuffle=True, seed=None):
     """
-    Pick the largest ¨n" observations, where n is passed as a parameter
-    create two lists, one without the observation, and one with only the observation
-    iterate through the list, inserting the observation at each index throughout the
-    plan.
+    Plan `observation_plan` with its largest observation inserted at every
+    third position throughout the plan.
 
     Parameters
     ----------
-    observation_plan
+    observation_plan : list
+    max_telescope_usage : int
+    with_concurrent : bool
+    shuffle : bool
+        Shuffle each order before planning it, as `create_basic_plan` does,
+        so the alternates are random plans rather than the insertion orders.
+        This is how alternates have always been produced; pass False to plan
+        the insertion orders as given.
+    seed : int, optional
+        Seed for the shuffles; by default the `random` module is used.
 
     Returns
     -------
-
+    list
+        `observation_plan` itself, followed by the distinct alternate plans,
+        each a list of planned observations. Use `plan_permutations` to
+        explore many plans without materialising them.
     """
-    # TODO use the shuffle function
-    lol = []
-    lol.append(copy.deepcopy(observation_plan))
-    largest = sorted(observation_plan, key=lambda x: (x.demand, x.channels))[-1]
-    observation_plan = [o for o in observation_plan if o != largest]
-    for i in range(1, len(observation_plan) + 1):
-        new_plan = copy.deepcopy(observation_plan)
-        large_copy = copy.deepcopy(largest)
-        new_plan.insert(i, large_copy)
-        # reset plan
-        for o in new_plan:
-            o.planned = False
-            o.start = 0
-        new_plan = create_basic_plan(
-            hpsos=None,
-            max_telescope_usage=max_telescope_usage,
-            with_concurrent=with_concurrent,
-            existing_plan=new_plan)
-        if new_plan not in lol and i%3 == 0:
-            lol.append(new_plan)
-
-    with open("/tmp/plans.txt", "w") as fp:
-        for l in lol:
-            fp.write(f"{str(l)}\n")
-
-    return lol
+    table = tuple(observation_plan)
+    orders = insertion_orders(table, stride=3)
+    if shuffle:
+        rng = random if seed is None else random.Random(seed)
+        orders = itertools.chain(
+            [next(orders)], (_shuffled(order, rng) for order in orders)
+        )
+    permutations = plan_permutations(
+        table, max_telescope_usage, orders=orders,
+        with_concurrent=with_concurrent
+    )
+    # The first order is the plan itself, which is returned as given
+    next(permutations)
+    plans = [[copy.copy(o) for o in table]]
+    plans.extend(permutation.observations(table) for permutation in permutations)
+    LOGGER.debug("Alternate plans: %s", plans)
+    return plans
+
+
+def _shuffled(order, rng):
+    order = order.tolist()
+    rng.shuffle(order)
+    return order
 
 
 def create_buffer_config(itemised_spec):
@@ -518,7 +896,7 @@ def assign_observation_ingest_demands(
         List of `Observation` objects
     cluster : `hpconfic.spec`
         This should ideally be an hpconfig spec object
-    system_sizing : pandas.DataFrame
+    system_sizing : pandas.DataFrame or :py:obj:`SizingIndex`
 
     maximum_telescope
 
@@ -527,10 +905,11 @@ def assign_observation_ingest_demands(
 
     """
 
+    system_sizing = SizingIndex.create(system_sizing)
     for o in observation_plan:
         (
             o.ingest_compute_demand,
-            o.ingest_flops_rate,
+            o.ingest_flop_rate,
             o.ingest_data_rate,
         ) = calc_ingest_demand(o, system_sizing, cluster)
         LOGGER.debug(f"{o.ingest_compute_demand=},{o.ingest_data_rate=}")
@@ -547,6 +926,14 @@ def generate_instrument_config(
         system_sizing,
         cluster,
         base_graph_paths,
+        pgt_cache=None,
+        workers=1,
+        compact_workflows=False,
+        workflow_compression=None,
+        workflow_file_format="json",
+        previous_config=None,
+        workflow_store=None,
+        workflow_handoff="chain",
         **kwargs,
 ) -> dict:
     """
@@ -574,6 +961,28 @@ def generate_instrument_config(
     system_sizing
     cluster
     base_graph_paths
+    pgt_cache : :py:obj:`PGTCache`, optional
+        Cache of unrolled graphs; defaults to one stored in `config_dir_path`
+    workers : int
+        Number of processes used to generate the observation workflows
+    compact_workflows : bool
+        Write workflow JSON without indentation
+    workflow_compression : str, optional
+        "gzip" or "zstd" to compress workflow files
+    workflow_file_format : str
+        "json" or "npz" (binary columnar) workflow files
+    previous_config : dict, optional
+        An instrument config previously generated in `config_dir_path`.
+        Pipelines whose workflow fingerprint is unchanged (and whose
+        workflow file still exists) keep their workflow, and only the
+        remaining observations are regenerated. The config is updated in
+        place and returned.
+    workflow_store : :py:obj:`WorkflowStore`, optional
+        Store of workflows shared between configs (see
+        `generate_plan_workflows`)
+    workflow_handoff : str
+        How the workflows of an observation are linked (see
+        `generate_workflow_from_observation`)
     data
     data_distribution: str
         Describes where data is allocated on the workflow.
@@ -589,6 +998,10 @@ def generate_instrument_config(
     pipeline_dict = {}
     telescope_observations = []
     max_ingest_resources = -1
+    component_sizing = SizingIndex.create(component_sizing)
+    system_sizing = SizingIndex.create(system_sizing)
+    if pgt_cache is None:
+        pgt_cache = PGTCache(default_cache_dir(config_dir_path))
     observation_plan = assign_observation_ingest_demands(
         observation_plan=observation_plan,
         cluster=cluster,
@@ -597,48 +1010,56 @@ def generate_instrument_config(
     LOGGER.debug(f"{observation_plan=}")
 
     for o in observation_plan:
-        use_existing_file = False
         if not o.planned:
             raise RuntimeError(
                 "Please ensure you run 'create_observation_plan' "
                 "prior to generating instrument config."
             )
-        # create workflow
-        if o.ingest_compute_demand > max_ingest_resources:
-            max_ingest_resources = o.ingest_compute_demand
-        # cfg_dir_path = Path(config_dir)
-        wf_file_name = Path(_create_workflow_path_name(o))
-
-        wf_file_path = config_dir_path / "workflows" / wf_file_name
-        if not wf_file_path.exists():
-            wf_file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        possible_file_name = _find_existing_workflow(config_dir_path / "workflows",
-                                                     o)
-        if possible_file_name:
-            use_existing_file = True
-            wf_file_path = config_dir_path / "workflows" / possible_file_name
-
-        if not os.path.exists(wf_file_path) or not use_existing_file:
-            wf_file_path = generate_workflow_from_observation(
-                o,
-                maximum_telescope,
-                config_dir_path,
-                component_sizing,
-                system_sizing,
-                wf_file_name,
-                base_graph_paths,
-            )
-        else:
-            wf_file_path = wf_file_path
         if not o.ingest_data_rate:
             raise RuntimeError(
                 "Please ensure you run 'assign_observation_ingest_demands' "
                 "prior to generating instrument config."
             )
+        if o.ingest_compute_demand > max_ingest_resources:
+            max_ingest_resources = o.ingest_compute_demand
 
+    fingerprints = {
+        o.name: workflow_fingerprint(
+            o, base_graph_paths, component_sizing, system_sizing,
+            workflow_handoff
+        )
+        for o in observation_plan
+    }
+    workflow_paths = {}
+    if previous_config is not None:
+        workflow_paths = _reusable_workflows(
+            previous_config, fingerprints, config_dir_path
+        )
+        LOGGER.info(
+            "Re-using %d of %d workflows", len(workflow_paths),
+            len(observation_plan)
+        )
+    workflow_paths.update(generate_plan_workflows(
+        [o for o in observation_plan if o.name not in workflow_paths],
+        maximum_telescope,
+        config_dir_path,
+        component_sizing,
+        system_sizing,
+        base_graph_paths,
+        pgt_cache=pgt_cache,
+        workers=workers,
+        compact_workflows=compact_workflows,
+        workflow_compression=workflow_compression,
+        workflow_file_format=workflow_file_format,
+        fingerprints=fingerprints,
+        workflow_store=workflow_store,
+        workflow_handoff=workflow_handoff,
+    ))
+
+    for o in observation_plan:
         pipeline_dict[o.name] = {
-            "workflow": wf_file_path.relative_to(config_dir_path).as_posix(),
+            "workflow": workflow_paths[o.name],
+            "fingerprint": fingerprints[o.name],
             "ingest_demand": o.ingest_compute_demand,
             "duration": o.duration,
             "channels": o.channels,
@@ -660,55 +1081,321 @@ def generate_instrument_config(
             "observations": telescope_observations,
         }
     }
+    if previous_config is not None:
+        previous_config.setdefault("telescope", {}).update(
+            telescope_dict["telescope"]
+        )
+        return previous_config
     return telescope_dict
 
 
-def _find_existing_workflow(dirname, observation):
+def _reusable_workflows(previous_config, fingerprints, config_dir_path):
     """
-    "parameters": {
-        "max_arrays": 512,
-        "channels": 512,
-        "arrays": 256,
-        "baseline": 65000.0,
-        "duration": 18000
-    },
+    Workflows in `previous_config` that can be kept, i.e. those of pipelines
+    whose fingerprint matches `fingerprints` and whose file exists.
+    """
+    config_dir_path = Path(config_dir_path)
+    pipelines = previous_config.get("telescope", {}).get("pipelines", {})
+    reusable = {}
+    for name, pipeline in pipelines.items():
+        if (
+            name in fingerprints
+            and pipeline.get("fingerprint") == fingerprints[name]
+            and (config_dir_path / pipeline["workflow"]).exists()
+        ):
+            reusable[name] = pipeline["workflow"]
+    return reusable
+
+
+@functools.lru_cache(maxsize=None)
+def _graph_digest(graph_path) -> str:
+    return hashlib.blake2b(
+        Path(graph_path).read_bytes(), digest_size=16
+    ).hexdigest()
+
+
+def workflow_fingerprint(
+        observation, base_graph_paths, component_sizing, system_sizing,
+        handoff="chain"
+) -> str:
+    """
+    Hash of everything that determines the workflow generated for
+    `observation`.
+
+    This covers the workflow header parameters, the content of the base
+    graph used for each of its workflows, the sizing data used to cost it,
+    and `COST_MODEL_VERSION`. Two observations with the same fingerprint
+    produce the same workflow, so a workflow file can be re-used while its
+    fingerprint is unchanged.
 
     Parameters
     ----------
+    observation : :py:obj:`Observation`
+    base_graph_paths : dict
+        Workflow -> base graph type (see `_match_graph_options`)
+    component_sizing : pd.DataFrame or :py:obj:`SizingIndex`
+    system_sizing : pd.DataFrame or :py:obj:`SizingIndex`
+    handoff : str
+        How the workflows are concatenated (see
+        `eagle_daliuge_translation.concatenate_workflows`); only part of the
+        fingerprint if it is not the default "chain".
 
     Returns
     -------
+    str
+        Hex digest
+    """
+    graphs = {}
+    for workflow in observation.workflows:
+        graph_type = base_graph_paths[workflow]
+        graphs[workflow] = [
+            graph_type, _graph_digest(str(_match_graph_options(graph_type)))
+        ]
+    fingerprint = {
+        "parameters": _create_workflow_parameters(observation),
+        "graphs": graphs,
+        "component_sizing": SizingIndex.create(component_sizing).digest,
+        "system_sizing": SizingIndex.create(system_sizing).digest,
+        "cost_model": COST_MODEL_VERSION,
+    }
+    if handoff != "chain":
+        fingerprint["handoff"] = handoff
+    return hashlib.blake2b(
+        json.dumps(fingerprint, sort_keys=True).encode(), digest_size=16
+    ).hexdigest()
+
 
+def generate_plan_workflows(
+        observation_plan: List[Observation],
+        maximum_telescope,
+        config_dir_path,
+        component_sizing,
+        system_sizing,
+        base_graph_paths,
+        pgt_cache=None,
+        workers=1,
+        compact_workflows=False,
+        workflow_compression=None,
+        workflow_file_format="json",
+        fingerprints=None,
+        workflow_store=None,
+        workflow_handoff="chain",
+) -> dict:
     """
-    pathname = ""
-    header = {"parameters": {}}
-    header["parameters"]["workflow_parallelism"] = observation.workflow_parallelism
-    header["parameters"]["channels"] = observation.channels
-    header["parameters"]["arrays"] = observation.demand
-    header["parameters"]["baseline"] = observation.baseline
-    header["parameters"]["duration"] = observation.duration
-    header["parameters"]["workflows"] = observation.workflows
-    header["parameters"]["hpso"] = observation.hpso
-    # TODO Fix this so it is based on telescope
-    header["parameters"]["max_arrays"] = Telescope(observation.telescope).max_stations
+    Generate (or find existing) workflow files for every observation in the
+    plan.
+
+    Parameters
+    ----------
+    observation_plan : list
+        List of planned `Observation` objects
+    maximum_telescope : int
+    config_dir_path : pathlib.Path
+    component_sizing : :py:obj:`SizingIndex`
+    system_sizing : :py:obj:`SizingIndex`
+    base_graph_paths : dict
+    pgt_cache : :py:obj:`PGTCache`, optional
+    workers : int
+        Number of processes used to generate workflows. With more than one
+        worker, the plan is split into slices that are generated in a
+        process pool.
+    compact_workflows : bool
+    workflow_compression : str, optional
+    workflow_file_format : str
+        See `generate_workflow_from_observation`
+    fingerprints : dict, optional
+        Observation name -> `workflow_fingerprint`, computed if not given.
+        Workflow files are named by their fingerprint, so an observation
+        re-uses the existing file with its name rather than regenerating it.
+    workflow_store : :py:obj:`WorkflowStore`, optional
+        Store shared with other configs. Workflows already in the store are
+        linked into the config rather than generated, and new workflows are
+        added to it.
+    workflow_handoff : str
+        See `generate_workflow_from_observation`
+
+    Notes
+    -----
+    Observations with the same fingerprint are always placed in the
+    same slice, so that the first generates the workflow file and the rest
+    re-use it (as they would when running sequentially).
+
+    Returns
+    -------
+    workflow_paths : dict
+        Observation name -> workflow path, relative to `config_dir_path`, in
+        plan order.
+    """
+    config_dir_path = Path(config_dir_path)
+    if pgt_cache is None:
+        pgt_cache = PGTCache(default_cache_dir(config_dir_path))
+    (config_dir_path / "workflows").mkdir(parents=True, exist_ok=True)
+    if fingerprints is None:
+        fingerprints = {
+            o.name: workflow_fingerprint(
+                o, base_graph_paths, component_sizing, system_sizing,
+                workflow_handoff
+            )
+            for o in observation_plan
+        }
+    fingerprints = {o.name: fingerprints[o.name] for o in observation_plan}
+
+    workflow_format = {
+        "compact": compact_workflows,
+        "compression": workflow_compression,
+        "file_format": workflow_file_format,
+        "handoff": workflow_handoff,
+    }
+    slices = _partition_plan(observation_plan, workers, fingerprints)
+    if len(slices) <= 1:
+        results = [
+            _generate_workflow_slice(
+                observation_plan, maximum_telescope, config_dir_path,
+                component_sizing, system_sizing, base_graph_paths, pgt_cache,
+                workflow_format, fingerprints, workflow_store
+            )
+        ]
+    else:
+        LOGGER.info("Generating workflows with %d workers", len(slices))
+        with ProcessPoolExecutor(max_workers=len(slices)) as executor:
+            futures = [
+                executor.submit(
+                    _generate_workflow_slice, plan_slice, maximum_telescope,
+                    config_dir_path, component_sizing, system_sizing,
+                    base_graph_paths, pgt_cache, workflow_format,
+                    {o.name: fingerprints[o.name] for o in plan_slice},
+                    workflow_store
+                )
+                for plan_slice in slices
+            ]
+            results = [f.result() for f in futures]
+
+    paths = {}
+    for result in results:
+        paths.update(result)
+    return {o.name: paths[o.name] for o in observation_plan}
 
-    # TODO consider caching this information
-    for wf in os.listdir(dirname):
-        if ".csv" not in wf:
-            with open(dirname / wf) as fp:
-                wf_dict = json.load(fp)
-                if header["parameters"] == wf_dict["header"]["parameters"]:
-                    pathname = wf
-                    break
 
-    return pathname
+def _partition_plan(observation_plan, workers, fingerprints):
+    """
+    Split the plan into at most `workers` slices, keeping observations with
+    identical workflow fingerprints together.
+    """
+    groups = {}
+    for o in observation_plan:
+        groups.setdefault(fingerprints[o.name], []).append(o)
+    num_slices = max(1, min(workers, len(groups)))
+    slices = [[] for _ in range(num_slices)]
+    for i, group in enumerate(groups.values()):
+        slices[i % num_slices].extend(group)
+    return slices
+
+
+def _generate_workflow_slice(
+        observations,
+        maximum_telescope,
+        config_dir_path,
+        component_sizing,
+        system_sizing,
+        base_graph_paths,
+        pgt_cache,
+        workflow_format=None,
+        fingerprints=None,
+        workflow_store=None,
+):
+    """
+    Produce the workflow for each observation in `observations`.
+
+    This is the unit of work for each process when generating a plan in
+    parallel, so it only relies on picklable arguments.
+
+    Returns
+    -------
+    dict
+        Observation name -> workflow path relative to `config_dir_path`
+    """
+    paths = {}
+    fingerprints = fingerprints or {}
+    workflow_format = workflow_format or {}
+    for o in observations:
+        fingerprint = fingerprints.get(o.name)
+        if fingerprint is None:
+            fingerprint = workflow_fingerprint(
+                o, base_graph_paths, component_sizing, system_sizing,
+                workflow_format.get("handoff", "chain")
+            )
+        # Workflow files are named by their fingerprint, so an existing file
+        # is the workflow this observation would generate.
+        wf_file_name = _create_workflow_path_name(o, fingerprint)
+        wf_file_path = config_dir_path / "workflows" / (
+            wf_file_name + _workflow_file_suffix(
+                workflow_format.get("file_format", "json"),
+                workflow_format.get("compression")
+            )
+        )
+        # The workflow and its stats table
+        stored_files = [wf_file_path.name, f"{wf_file_name}.csv"]
+        if not wf_file_path.exists() and workflow_store is not None:
+            workflow_store.link(stored_files, wf_file_path.parent)
+        if not wf_file_path.exists():
+            wf_file_path = generate_workflow_from_observation(
+                o,
+                maximum_telescope,
+                config_dir_path,
+                component_sizing,
+                system_sizing,
+                wf_file_name,
+                base_graph_paths,
+                pgt_cache=pgt_cache,
+                fingerprint=fingerprint,
+                **workflow_format,
+            )
+            if workflow_store is not None:
+                workflow_store.add(
+                    wf_file_path.parent / name for name in stored_files
+                )
+        paths[o.name] = wf_file_path.relative_to(config_dir_path).as_posix()
+    return paths
+
+
+def _create_workflow_parameters(observation):
+    """
+    The "parameters" entry of the workflow header for `observation`.
+    """
+    return {
+        "max_arrays": Telescope(observation.telescope).max_stations,
+        "channels": observation.channels,
+        "arrays": observation.demand,
+        "baseline": observation.baseline,
+        "duration": observation.duration,
+        "workflow_parallelism": observation.workflow_parallelism,
+        "workflows": list(observation.workflows),
+        "hpso": observation.hpso,
+    }
 
 
 def _create_workflow_path_name(
-        observation
+        observation, fingerprint=None
 ):
-    str_date = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    return f"{hash(observation)}_{str_date}"
+    """
+    Workflow file name (without suffix) for `observation`.
+
+    Names are content-addressed, so the same inputs give the same name in
+    every run and on every machine. This is the `workflow_fingerprint` if
+    given, otherwise the digest of the observation parameters.
+    """
+    if fingerprint is not None:
+        return fingerprint
+    return observation.spec.digest
+
+
+def _workflow_file_suffix(file_format="json", compression=None):
+    """
+    Suffix that `generate_workflow_from_observation` adds to workflow files.
+    """
+    if file_format == "npz":
+        return COLUMNAR_SUFFIX
+    return COMPRESSION_SUFFIX[compression]
 
 
 def create_single_observation_for_instrument(observation, workflow_path):
@@ -750,6 +1437,15 @@ def generate_workflow_from_observation(
         workflow_path_name,
         base_graph_paths,
         concat=True,
+        pgt_cache=None,
+        compact=False,
+        compression=None,
+        file_format="json",
+        fingerprint=None,
+        scatter_template=True,
+        stream_pgt=False,
+        handoff="chain",
+        compact_graph=False,
 ):
     """
     Given a pipeline and observation specification, generate a workflow file
@@ -762,7 +1458,7 @@ def generate_workflow_from_observation(
         Observation descriptor object
     telescope_max: int
         The maximum number of arrays used on the telescope
-    component_sizing : pd.DataFrame
+    component_sizing : pd.DataFrame or :py:obj:`SizingIndex`
         Data frame that stores information of system sizing. See
         common.SIZING for a dictionary mapping saved column names
         to human readable names.
@@ -773,6 +1469,43 @@ def generate_workflow_from_observation(
     should be generated by a previous function.
     concat : True
         True if we want to pipeline the workflows together into one 'SuperDAG'
+    pgt_cache : :py:obj:`PGTCache`, optional
+        Cache of unrolled graphs, keyed on the LGT after its parallelism is
+        updated. Defaults to a cache stored in `config_dir`.
+    compact : bool
+        Write the workflow JSON without indentation.
+    compression : str, optional
+        "gzip" or "zstd" to compress the workflow file; the matching suffix
+        (see `workflow_io.COMPRESSION_SUFFIX`) is added to its name.
+    file_format : str
+        "json" (node-link JSON) or "npz" for the binary columnar format
+        (see `workflow_io.write_workflow_columns`), which is written with a
+        `.npz` suffix and cannot be compressed.
+    fingerprint : str, optional
+        `workflow_fingerprint` of the observation, stored in the header;
+        computed if not given.
+    scatter_template : bool
+        Expand the frequency scatter of each graph from a template learnt at
+        a small parallelism (see `scatter_template.ScatterTemplate`) rather
+        than unrolling it at `workflow_parallelism`. The graph is the same;
+        graphs that cannot be expanded this way are unrolled.
+    stream_pgt : bool
+        Convert graphs that are unrolled (and not already in `pgt_cache`) as
+        their drops are read from `dlg unroll`, without holding or caching
+        the PGT (see `eagle_daliuge_translation.iter_unrolled_pgt`).
+    handoff : str
+        How each workflow is linked to the next (see
+        `eagle_daliuge_translation.concatenate_workflows`): "chain" (the
+        default), "barrier", or "fan", whose edges carry the visibilities
+        each workflow reads (see `pipeline_handoff_data`). Barrier nodes cost
+        the same as the logical components of the graphs.
+    compact_graph : bool
+        Hold each costed workflow as a :py:obj:`CompactGraph`, and
+        concatenate and write these, rather than the networkx graphs. The
+        workflow file is the same. Each workflow is still built and costed
+        as a networkx graph, so this only reduces the memory held between
+        workflows and during concatenation, not the peak for a single
+        workflow.
     data : bool
         Flag for writing data costs to edges. Default to True as it makes
         more sense from a workflow perspective. False if we want it 0 for
@@ -784,6 +1517,10 @@ def generate_workflow_from_observation(
 
     """
 
+    if file_format not in ("json", "npz"):
+        raise ValueError(f"Unsupported workflow file format '{file_format}'")
+    if file_format == "npz" and compression:
+        raise ValueError("Columnar workflows cannot be compressed")
     workflow_dir = f"{config_dir}/workflows"
     if not os.path.exists(config_dir):
         raise FileNotFoundError(f"{config_dir} does not exist")
@@ -791,30 +1528,38 @@ def generate_workflow_from_observation(
         os.mkdir(f"{config_dir}/workflows")
 
     telescope_frac = observation.demand / telescope_max
+    component_sizing = SizingIndex.create(component_sizing)
+    system_sizing = SizingIndex.create(system_sizing)
+    if pgt_cache is None:
+        pgt_cache = PGTCache(default_cache_dir(config_dir))
 
     channels = observation.workflow_parallelism
     # Unroll the graph
     final_graphs = {}
-    cached_base_graph = {}
     workflow_stats = {}
     for workflow in observation.workflows:
         base_graph_type = base_graph_paths[workflow]
         base_graph = _match_graph_options(base_graph_type)
         LOGGER.info("Using Base Graph: %s", base_graph)
-        if base_graph not in cached_base_graph:
-            cached_base_graph[base_graph] = None
         LOGGER.debug(f"Using {base_graph} as base workflow.")
-        channel_lgt = edt.update_graph_parallelism(
-            base_graph, channels, observation.demand
-        )
-        intermed_graph, task_dict, cached_base_graph[base_graph] = (
-            edt.eagle_to_nx(
-                channel_lgt,
-                workflow,
-                file_in=False,
-                cached_workflow=cached_base_graph[base_graph]
+        template = None
+        if scatter_template:
+            template = get_scatter_template(
+                base_graph, observation.demand, pgt_cache
             )
-        )
+        if template is not None:
+            intermed_graph, task_dict = edt.daliuge_to_nx(
+                template.expand(channels), workflow
+            )
+        else:
+            channel_lgt = edt.update_graph_parallelism(
+                base_graph, channels, observation.demand
+            )
+            if stream_pgt and pgt_cache.key(channel_lgt) not in pgt_cache:
+                pgt = edt.iter_unrolled_pgt(channel_lgt, file_in=False)
+            else:
+                pgt = get_unrolled_pgt(channel_lgt, pgt_cache)
+            intermed_graph, task_dict = edt.daliuge_to_nx(pgt, workflow)
 
         final_path = f"{workflow_dir}/" + f"{workflow_path_name}"
         if base_graph_type == "pulsar":
@@ -831,20 +1576,93 @@ def generate_workflow_from_observation(
                 component_sizing,
             )
             final_graphs[workflow] = intermed_graph
+        if compact_graph:
+            final_graphs[workflow] = CompactGraph.from_networkx(
+                final_graphs[workflow]
+            )
+            del intermed_graph
         workflow_stats[workflow] = task_dict
 
     write_workflow_stats_to_csv(workflow_stats, final_path)
-    final_workflow = edt.concatenate_workflows(final_graphs, observation.workflows)
-    final_json = produce_final_workflow_structure(
-        final_workflow, observation, time=False
+    handoff_data = None
+    if handoff == "fan":
+        handoff_data = {
+            w: pipeline_handoff_data(observation, w, component_sizing)
+            for w in observation.workflows[1:]
+        }
+    final_workflow = edt.concatenate_workflows(
+        final_graphs, observation.workflows, in_place=True, handoff=handoff,
+        handoff_data=handoff_data,
+        barrier_attributes={"comp": observation.duration, "task_data": 0},
     )
-
-    with open(final_path, "w") as fp:
-        json.dump(final_json, fp, indent=2)
+    header = _create_final_workflow_header(observation, time=False)
+    if fingerprint is None:
+        fingerprint = workflow_fingerprint(
+            observation, base_graph_paths, component_sizing, system_sizing,
+            handoff
+        )
+    header["fingerprint"] = fingerprint
+    final_path += _workflow_file_suffix(file_format, compression)
+
+    # Write to a temporary file outside of the workflow directory first, so
+    # that other processes searching for existing workflows never read a
+    # partially written file.
+    with atomic_write(final_path, dir=config_dir) as tmp_path:
+        if file_format == "npz":
+            write_workflow_columns(tmp_path, header, final_workflow)
+        else:
+            write_workflow(
+                tmp_path,
+                header,
+                final_workflow,
+                indent=None if compact else 2,
+                compression=compression,
+            )
 
     return Path(final_path)
 
 
+def get_unrolled_pgt(lgt, pgt_cache):
+    """
+    The PGT of `lgt`, from `pgt_cache` or unrolled and added to it.
+    """
+    pgt_key = pgt_cache.key(lgt)
+    pgt = pgt_cache.get(pgt_key)
+    if pgt is None:
+        pgt = edt.unroll_to_pgt(lgt, file_in=False)
+        pgt_cache.put(pgt_key, pgt)
+    return pgt
+
+
+# (template PGT keys) -> ScatterTemplate, or None if it cannot be expanded
+_SCATTER_TEMPLATES = {}
+
+
+def get_scatter_template(base_graph, telescope_demand, pgt_cache):
+    """
+    The :py:obj:`ScatterTemplate` of `base_graph`, or None if its PGT cannot
+    be expanded from a template.
+
+    The template is learnt from the PGTs unrolled at `TEMPLATE_COPIES`,
+    which are stored in `pgt_cache`, and is kept for the rest of the process.
+    """
+    lgts = [
+        edt.update_graph_parallelism(base_graph, copies, telescope_demand)
+        for copies in TEMPLATE_COPIES
+    ]
+    key = tuple(pgt_cache.key(lgt) for lgt in lgts)
+    if key not in _SCATTER_TEMPLATES:
+        pgts = [get_unrolled_pgt(lgt, pgt_cache) for lgt in lgts]
+        try:
+            _SCATTER_TEMPLATES[key] = ScatterTemplate.from_pgts(
+                pgts[0], TEMPLATE_COPIES[0], pgts[1], TEMPLATE_COPIES[1]
+            )
+        except ValueError as e:
+            LOGGER.info("Unrolling %s in full: %s", base_graph, e)
+            _SCATTER_TEMPLATES[key] = None
+    return _SCATTER_TEMPLATES[key]
+
+
 def _match_graph_options(graph_type: str):
     """
     Given the path
@@ -881,6 +1699,7 @@ def generate_cost_per_product(
         workflow,
         component_sizing,
         final_path=None,
+        batched=True,
 ):
     """
     Produce a cost value per node within the workflow graph for the given
@@ -905,9 +1724,14 @@ def generate_cost_per_product(
     observation : :py:object:`hpso_to_observation.Observation`
         the HPSO we are generating.
 
-    component_sizing : pd.DataFrame
-        Pandas dataframe containing the components
+    component_sizing : pd.DataFrame or :py:obj:`SizingIndex`
+        Pandas dataframe containing the components, or an index built from
+        it.
 
+    batched : bool, default=True
+        Compute the node and edge costs for all tasks of a component at once
+        with NumPy (see `_assign_costs_batched`). False uses the original
+        per-node loop, which produces the same values.
 
     Returns
     -------
@@ -946,6 +1770,7 @@ def generate_cost_per_product(
         "Phase Rotation",
     ]
 
+    component_sizing = SizingIndex.create(component_sizing)
     for component in task_dict:
         if component in ignore_components:
             task_dict[component]["total_compute"] = 0
@@ -969,6 +1794,12 @@ def generate_cost_per_product(
                     total_data / task_dict[component]["node"]
             )
 
+    if batched:
+        _assign_costs_batched(
+            nx_graph, task_dict, observation, set(ignore_components)
+        )
+        return nx_graph, task_dict
+
     for node in nx_graph.nodes:
         workflow, component, index = node.split("_")
         if component in ignore_components:
@@ -1013,6 +1844,71 @@ def generate_cost_per_product(
     return nx_graph, task_dict
 
 
+def _assign_costs_batched(nx_graph, task_dict, observation, ignore_components):
+    """
+    Assign "comp" and "task_data" to every node, and "transfer_data" to every
+    edge, of `nx_graph`.
+
+    Tasks of the same component all receive the same cost, so we compute the
+    cost once per component and broadcast it to nodes (and to edges by their
+    consumer) with NumPy, rather than re-evaluating it for every node and
+    every predecessor. Values (and their types) match the per-node loop in
+    `generate_cost_per_product`.
+    """
+    nodes = list(nx_graph.nodes)
+    if not nodes:
+        return
+    node_components = []
+    for node in nodes:
+        _, component, _ = node.split("_")
+        node_components.append(component)
+    components, inverse = np.unique(node_components, return_inverse=True)
+
+    ignored = np.array([c in ignore_components for c in components])
+    fraction_compute = np.array(
+        [0.0 if i else task_dict[c]["fraction_compute_cost"]
+         for c, i in zip(components, ignored)], dtype=float
+    )
+    fraction_data = np.array(
+        [0.0 if i else task_dict[c]["fraction_data_cost"]
+         for c, i in zip(components, ignored)], dtype=float
+    )
+    compute = observation.duration * fraction_compute * SI.peta
+    data_cost = observation.duration * fraction_data * SI.mega * BYTES_PER_VIS
+
+    node_ignored = ignored[inverse]
+    node_compute = compute[inverse]
+    node_data = data_cost[inverse]
+
+    comp = node_compute.tolist()
+    for i in np.flatnonzero(node_ignored | ~(node_compute > 0)):
+        comp[i] = observation.duration
+    nx.set_node_attributes(nx_graph, dict(zip(nodes, comp)), "comp")
+
+    task_data = node_data.tolist()
+    for i in np.flatnonzero(~(node_data > 0)):
+        task_data[i] = 0
+    costed = np.flatnonzero(~node_ignored)
+    nx.set_node_attributes(
+        nx_graph, {nodes[i]: task_data[i] for i in costed}, "task_data"
+    )
+
+    edges = list(nx_graph.edges)
+    if not edges:
+        return
+    position = {node: i for i, node in enumerate(nodes)}
+    consumers = np.fromiter(
+        (position[v] for _, v in edges), dtype=np.intp, count=len(edges)
+    )
+    in_degree = np.fromiter(
+        (d for _, d in nx_graph.in_degree(nodes)), dtype=float, count=len(nodes)
+    )
+    transfer = (node_data[consumers] / in_degree[consumers]).tolist()
+    for i in np.flatnonzero(node_ignored[consumers]):
+        transfer[i] = 0
+    nx.set_edge_attributes(nx_graph, dict(zip(edges, transfer)), "transfer_data")
+
+
 def generate_cost_per_total_workflow(
         nx_graph,
         observation,
@@ -1056,7 +1952,7 @@ def identify_component_cost(
         The Observation object to which this component is associated
     workflow : str
     component : str
-    component_sizing : :py:obj:`pd.DataFrame`
+    component_sizing : :py:obj:`pd.DataFrame` or :py:obj:`SizingIndex`
 
     Notes
     ------
@@ -1077,6 +1973,7 @@ def identify_component_cost(
     """
 
     # TODO Consider grouping and iterating over dictionary instead
+    component_sizing = SizingIndex.create(component_sizing)
     total_cost = 0
     total_data = 0
     if component == "UpdateLSM":
@@ -1151,45 +2048,76 @@ def retrieve_component_cost(observation, workflow, component, component_sizing):
     observation
     workflow : Path
     component : str
-    component_sizing : :py:obj:`pd.DataFrame`
+    component_sizing : :py:obj:`pd.DataFrame` or :py:obj:`SizingIndex`
     Returns
     -------
 
     """
+    component_sizing = SizingIndex.create(component_sizing)
     # Santiy check for components:
-    if workflow not in component_sizing["Pipeline"].values:
+    if not component_sizing.has_pipeline(workflow):
         LOGGER.warning(
             "Workflow string %s not present in DataFrame. Double check spelling in "
             "Observation.", workflow)
         return
 
-    hpso_sizing = component_sizing[component_sizing["hpso"] == observation.hpso]
     # Find closest baseline to the one that is specified
-    baseline = min(list(hpso_sizing["Baseline"]),
-                   key=lambda x: abs(x - observation.baseline))
-
-    obs_frame = component_sizing[
-        (component_sizing["hpso"] == observation.hpso)
-        & (component_sizing["Baseline"] == baseline)
-        & (component_sizing["Channels"] == observation.channels)
-        & (component_sizing["Antenna stations"] == observation.demand)
-        ]
+    baseline = component_sizing.nearest_baseline(
+        observation.hpso, observation.baseline
+    )
+    compute_row = component_sizing.row(
+        observation.hpso, baseline, observation.channels, observation.demand,
+        pipeline=workflow
+    )
+    data_row = component_sizing.row(
+        observation.hpso, baseline, observation.channels, observation.demand,
+        pipeline=f"{workflow}_data"
+    )
 
-    if obs_frame.empty:
+    if compute_row is None or data_row is None:
         raise ValueError(
             f"Data does not contain the union of "
             f"{observation.hpso} and {observation.baseline};"
             f"please review for errors in user input. "
         )
 
-    if workflow not in component_sizing["Pipeline"].values:
-        raise RuntimeError(f"HPSO does not require {workflow} - check HPSO config.")
+    compute = component_sizing.value(compute_row, component)
+    data = component_sizing.value(data_row, component)
 
-    compute = float(obs_frame[obs_frame["Pipeline"] == workflow][component].iloc[0])
+    return compute, data
 
-    data = float(obs_frame[obs_frame["Pipeline"] == f"{workflow}_data"][component].iloc[0])
 
-    return compute, data
+def pipeline_handoff_data(observation, workflow, component_sizing) -> float:
+    """
+    Data (bytes) that `workflow` reads from the buffer over the
+    observation, from its "Visibility read rate" (TB/s) in the component
+    sizing.
+
+    Used as the data handed to `workflow` by the workflow before it when
+    workflows are concatenated with the "fan" handoff. Workflows that are
+    not in the component sizing read no data.
+    """
+    component_sizing = SizingIndex.create(component_sizing)
+    if not component_sizing.has_pipeline(workflow):
+        return 0
+    baseline = component_sizing.nearest_baseline(
+        observation.hpso, observation.baseline
+    )
+    row = component_sizing.row(
+        observation.hpso, baseline, observation.channels, observation.demand,
+        pipeline=workflow
+    )
+    if row is None:
+        raise ValueError(
+            f"Data does not contain the union of "
+            f"{observation.hpso} and {observation.baseline};"
+            f"please review for errors in user input. "
+        )
+    return (
+        observation.duration
+        * component_sizing.value(row, "Visibility read rate")
+        * SI.tera
+    )
 
 
 def retrieve_workflow_cost(observation, workflow, system_sizing):
@@ -1200,27 +2128,30 @@ def retrieve_workflow_cost(observation, workflow, system_sizing):
     ----------
     observation : Observation
     workflow : str
-    system_sizing : pd.Dataframe
+    system_sizing : pd.Dataframe or :py:obj:`SizingIndex`
 
     Returns
     -------
 
     """
-    if observation.hpso not in system_sizing["HPSO"].values:
+    system_sizing = SizingIndex.create(system_sizing)
+    if not system_sizing.has_hpso(observation.hpso):
         raise RuntimeError(f"HPSO: {observation.hpso} not present")
 
-    hpso_sizing = system_sizing[system_sizing["HPSO"] == observation.hpso]
     # Find closest baseline to the one that is specified
-    baseline = min(list(hpso_sizing["Baseline"]),
-                   key=lambda x: abs(x - observation.baseline))
-
-    obs_frame = system_sizing[
-        (system_sizing["HPSO"] == observation.hpso)
-        & (system_sizing["Baseline"] == baseline)
-        & (system_sizing["Channels"] == observation.channels)
-        & (system_sizing["Stations"] == observation.demand)
-        ]
-    flops = float(obs_frame[workflow].iloc[0])
+    baseline = system_sizing.nearest_baseline(
+        observation.hpso, observation.baseline
+    )
+    row = system_sizing.row(
+        observation.hpso, baseline, observation.channels, observation.demand
+    )
+    if row is None:
+        raise ValueError(
+            f"Data does not contain the union of "
+            f"{observation.hpso} and {observation.baseline};"
+            f"please review for errors in user input. "
+        )
+    flops = system_sizing.value(row, workflow)
 
     return flops
 
@@ -1232,7 +2163,7 @@ def produce_final_workflow_structure(nx_final, observation, time=False):
 
     Parameters
     ----------
-    nx_final : :py:obj:`networkx.DiGraph`
+    nx_final : :py:obj:`networkx.DiGraph` or :py:obj:`CompactGraph`
 
     time: bool, default=False
         The unit in which computation 'cost'. Historically, task DAG
@@ -1243,6 +2174,19 @@ def produce_final_workflow_structure(nx_final, observation, time=False):
 
     """
 
+    header = _create_final_workflow_header(observation, time)
+    if isinstance(nx_final, CompactGraph):
+        graph = nx_final.to_node_link()
+    else:
+        graph = nx.readwrite.node_link_data(nx_final, edges="links")
+    jgraph = {"header": header, "graph": graph}
+    return jgraph
+
+
+def _create_final_workflow_header(observation, time=False):
+    """
+    Workflow file header, recording the parameters of `observation`.
+    """
     header = create_workflow_header(observation.telescope)
     header["time"] = time
     header["parameters"]["workflow_parallelism"] = observation.workflow_parallelism
@@ -1250,10 +2194,9 @@ def produce_final_workflow_structure(nx_final, observation, time=False):
     header["parameters"]["arrays"] = observation.demand
     header["parameters"]["baseline"] = observation.baseline
     header["parameters"]["duration"] = observation.duration
-    header["parameters"]["workflows"] = observation.workflows
+    header["parameters"]["workflows"] = list(observation.workflows)
     header["parameters"]["hpso"] = observation.hpso
-    jgraph = {"header": header, "graph": nx.readwrite.node_link_data(nx_final, edges="links")}
-    return jgraph
+    return header
 
 
 def write_workflow_stats_to_csv(
@@ -1303,12 +2246,13 @@ def write_workflow_stats_to_csv(
     df.to_csv(workflow_data_path, index=False)
 
 
-def calc_ingest_demand(observation: Observation, system_sizing: pd.DataFrame, cluster: dict):
+def calc_ingest_demand(observation: Observation, system_sizing, cluster: dict):
     """
     Get the average compute over teh CPUs in the cluster and determine the
     number of resources necessary for the current ingest_flops
 
     """
+    system_sizing = SizingIndex.create(system_sizing)
     ingest_flops = (
             retrieve_workflow_cost(
                 observation, "Ingest [Pflop/s]", system_sizing
@@ -1334,6 +2278,7 @@ def calc_pulsar_demand(observation, system_sizing):
     """
 
     pulsar_workflows = ["RCAL [Pflop/s]", "FastImg [Pflop/s]"]
+    system_sizing = SizingIndex.create(system_sizing)
 
     pulsar_flops =0
     for pw in pulsar_workflows:
@@ -0,0 +1,182 @@
+# Copyright (C) 2026 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Persistent cache of unrolled Physical Graph Templates (PGTs).
+
+Unrolling is the most expensive part of workflow generation, and the same
+(graph, parallelism) pair is unrolled for many observations and across
+repeated calls to `config_generator.create_config`. PGTs are stored on disk
+as gzipped, compact JSON, named after a hash of the LGT that was unrolled.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+from importlib import metadata
+from pathlib import Path
+
+import pylru
+
+from skaworkflows.common import atomic_write
+
+LOGGER = logging.getLogger(__name__)
+
+# Directory, relative to the config output directory, used by default
+PGT_CACHE_DIR = ".pgt_cache"
+# Overrides the default location if set (e.g. to share a cache between
+# output directories)
+PGT_CACHE_ENV = "SKAWORKFLOWS_PGT_CACHE"
+
+DEFAULT_MAX_SIZE = 512 * 2 ** 20  # bytes
+DEFAULT_MEMORY_ENTRIES = 8
+
+SUFFIX = ".json.gz"
+
+
+def translator_version():
+    """
+    Version of the DALiuGE translator, used as part of the cache key so that
+    an upgrade invalidates previously unrolled graphs.
+    """
+    try:
+        return metadata.version("daliuge-translator")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def default_cache_dir(config_dir):
+    """
+    Location of the PGT cache for a given config directory.
+    """
+    if os.environ.get(PGT_CACHE_ENV):
+        return Path(os.environ[PGT_CACHE_ENV])
+    return Path(config_dir) / PGT_CACHE_DIR
+
+
+class PGTCache:
+    """
+    Size-bounded, least-recently-used on-disk cache of unrolled PGTs.
+
+    Parameters
+    ----------
+    cache_dir : pathlib.Path
+        Directory in which the PGTs are stored; created if it does not exist.
+    max_size : int
+        Maximum number of bytes stored on disk before the least recently used
+        entries are removed.
+    memory_entries : int
+        Number of PGTs to also keep in memory, so that workflows which share
+        a base graph within the one process do not re-read the file.
+
+    Notes
+    -----
+    Keys are derived from the LGT *after* `update_graph_parallelism`, so the
+    `num_of_copies`/`num_of_inputs` values are part of the key along with the
+    rest of the graph content. Use `key` to compute the key once and then
+    `get`/`put` with it.
+
+    Entries are written to a temporary file and renamed into place, so
+    several processes can share a cache directory.
+    """
+
+    def __init__(
+            self,
+            cache_dir,
+            max_size=DEFAULT_MAX_SIZE,
+            memory_entries=DEFAULT_MEMORY_ENTRIES
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.version = translator_version()
+        self._memory = pylru.lrucache(memory_entries)
+
+    def __getstate__(self):
+        # Only the on-disk cache is shared with worker processes
+        state = self.__dict__.copy()
+        state["_memory"] = self._memory.size()
+        return state
+
+    def __setstate__(self, state):
+        state["_memory"] = pylru.lrucache(state["_memory"])
+        self.__dict__.update(state)
+
+    def key(self, lgt: dict) -> str:
+        """
+        Content hash of `lgt` and the translator version.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(self.version.encode())
+        digest.update(
+            json.dumps(lgt, sort_keys=True, separators=(",", ":")).encode()
+        )
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{SUFFIX}"
+
+    def __contains__(self, key):
+        return key in self._memory or self.path(key).exists()
+
+    def get(self, key: str):
+        """
+        Return the PGT stored under `key`, or None on a cache miss.
+        """
+        if key in self._memory:
+            return self._memory[key]
+        path = self.path(key)
+        try:
+            with gzip.open(path, "rt") as fp:
+                pgt = json.load(fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError):
+            LOGGER.warning("Ignoring unreadable PGT cache entry %s", path)
+            return None
+        # Mark as recently used for eviction
+        os.utime(path)
+        self._memory[key] = pgt
+        LOGGER.info("Using cached PGT %s", key)
+        return pgt
+
+    def put(self, key: str, pgt: list):
+        """
+        Store `pgt` under `key`, evicting old entries if the cache is full.
+        """
+        self._memory[key] = pgt
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.path(key)) as tmp:
+            with gzip.open(tmp, "wt") as fp:
+                json.dump(pgt, fp, separators=(",", ":"))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for path in self.cache_dir.glob(f"*{SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # Removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            LOGGER.debug("Evicting %s from PGT cache", path.name)
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,359 @@
+# Copyright (C) 2026 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Expand the `FrequencySplit` scatter of a PGT without unrolling it.
+
+Almost all of an unrolled workflow is the per-channel subgraph inside the
+scatter that `update_graph_parallelism` sets the copies of, repeated once per
+copy. Unrolling is super-linear in the number of copies, so rather than
+unrolling at the workflow parallelism we unroll the LGT at two small
+parallelisms, learn which drops are copied and how they refer to each other,
+and then write out the drops for any number of copies directly.
+
+The expanded PGT only has the drop fields that `daliuge_to_nx` reads, and
+lists the drops in the same order as the DALiuGE translator, so converting it
+gives the same graph as converting the unrolled PGT.
+"""
+
+# Parallelisms the template is learnt from and checked against
+TEMPLATE_COPIES = (2, 3)
+
+# Drop fields used by `daliuge_to_nx`
+DROP_FIELDS = ("oid", "name", "categoryType")
+LINK_FIELDS = ("producers", "consumers")
+
+
+def _drops(pgt):
+    """
+    The drops in a PGT (i.e. without the reproducibility entry).
+    """
+    return [d for d in pgt if isinstance(d, dict) and "oid" in d]
+
+
+def _iid(drop):
+    return tuple(int(i) for i in str(drop["iid"]).split("-"))
+
+
+def _unique_links(entries):
+    """
+    `entries` without repeated references to the same drop.
+
+    The translator repeats the consumers of loop edges once per scatter copy;
+    the repeats give the same edges, so they are dropped.
+    """
+    seen = set()
+    unique = []
+    for entry in entries:
+        oid = next(iter(entry)) if isinstance(entry, dict) else entry
+        if oid not in seen:
+            seen.add(oid)
+            unique.append(entry)
+    return unique
+
+
+def project_pgt(pgt) -> list:
+    """
+    The drops of `pgt`, with only the fields used by `daliuge_to_nx`, and
+    without repeated producers or consumers.
+
+    This is the form of the PGT produced by `ScatterTemplate.expand`.
+    """
+    projected = []
+    for drop in _drops(pgt):
+        entry = {field: drop[field] for field in DROP_FIELDS if field in drop}
+        for field in LINK_FIELDS:
+            if field in drop:
+                entry[field] = _unique_links(drop[field])
+        projected.append(entry)
+    return projected
+
+
+class _Ref:
+    """
+    Reference from a copied drop to a drop in the same copy.
+    """
+    __slots__ = ("head", "tail", "port")
+
+    def __init__(self, head, tail, port):
+        self.head = head
+        self.tail = tail
+        self.port = port
+
+    def key(self):
+        return self.head, self.tail, self.port
+
+
+class _Copies:
+    """
+    References from a drop outside the scatter to drops in every copy: the
+    `refs` in copy 0, then in copy 1, and so on.
+    """
+    __slots__ = ("refs",)
+
+    def __init__(self, refs):
+        self.refs = refs
+
+
+class ScatterTemplate:
+    """
+    The drops of a PGT, with those inside the scatter stored once and
+    written out for any number of copies by `expand`.
+
+    Use `from_pgts` to learn a template from two unrolled PGTs.
+    """
+
+    def __init__(self, blocks):
+        # List of (copied, drops): the drops of each LGT node, in PGT order.
+        # Copied drops are (head, tail, fixed fields, links) patterns for the
+        # first copy, where the oid of copy `c` is f"{head}{c}{tail}". Other
+        # drops are stored as in `project_pgt`, except that references to
+        # every copy of the scatter (e.g. the producers of a gather) are
+        # stored once as `_Copies`.
+        self._blocks = blocks
+
+    @classmethod
+    def from_pgts(cls, pgt, copies, check_pgt, check_copies):
+        """
+        Learn the template from `pgt`, unrolled with `copies` copies, and
+        check it reproduces `check_pgt`, unrolled with `check_copies`.
+
+        Raises
+        ------
+        ValueError
+            If the PGT cannot be expanded, e.g. a drop refers to drops in
+            other copies.
+        """
+        drops = _drops(pgt)
+        check_drops = _drops(check_pgt)
+        axes = _scatter_axes(drops, copies, check_drops, check_copies)
+        by_oid = {d["oid"]: d for d in drops}
+
+        blocks = []
+        for drop in drops:
+            key = drop["lg_key"]
+            if not blocks or blocks[-1][0] != key:
+                blocks.append((key, []))
+            blocks[-1][1].append(drop)
+
+        template_blocks = []
+        for key, block in blocks:
+            axis = axes[key]
+            if axis is None:
+                patterns = project_pgt(block)
+                for entry in patterns:
+                    for field in LINK_FIELDS:
+                        if field in entry:
+                            entry[field] = _boundary_links(
+                                entry[field], by_oid, axes, copies
+                            )
+                template_blocks.append((False, patterns))
+                continue
+            iids = [_iid(d) for d in block]
+            if any(iid[:axis] != iids[0][:axis] for iid in iids):
+                # Copies would not be contiguous in the PGT
+                raise ValueError(f"Scatter of {key} is not the outer loop")
+            first = [d for d, iid in zip(block, iids) if iid[axis] == 0]
+            if len(first) * copies != len(block):
+                raise ValueError(f"Copies of {key} differ")
+            patterns = []
+            for d in first:
+                head, tail = _split_oid(d, axis)
+                fixed = {f: d[f] for f in DROP_FIELDS[1:] if f in d}
+                links = {
+                    field: [
+                        _link_pattern(entry, by_oid, axes, axis)
+                        for entry in _unique_links(d[field])
+                    ]
+                    for field in LINK_FIELDS if field in d
+                }
+                patterns.append((head, tail, fixed, links))
+            template_blocks.append((True, patterns))
+
+        template = cls(template_blocks)
+        if template.expand(check_copies) != project_pgt(check_drops):
+            raise ValueError("Expanded PGT does not match the unrolled PGT")
+        return template
+
+    def expand(self, copies) -> list:
+        """
+        The PGT drops for `copies` copies of the scatter, in the order the
+        DALiuGE translator lists them.
+        """
+        pgt = []
+        for copied, drops in self._blocks:
+            if not copied:
+                for drop in drops:
+                    entry = dict(drop)
+                    for field in LINK_FIELDS:
+                        if field in entry:
+                            entry[field] = _expand_links(entry[field], copies)
+                    pgt.append(entry)
+                continue
+            for c in range(copies):
+                c = str(c)
+                for head, tail, fixed, links in drops:
+                    entry = {"oid": f"{head}{c}{tail}"}
+                    entry.update(fixed)
+                    for field, entries in links.items():
+                        entry[field] = [_resolve(e, c) for e in entries]
+                    pgt.append(entry)
+        return pgt
+
+
+def _scatter_axes(drops, copies, check_drops, check_copies):
+    """
+    For each LGT node, the position in the drop iid of the scatter copy, or
+    None if the node is not inside the scatter.
+    """
+    def ranges(pgt):
+        maxima = {}
+        for d in pgt:
+            iid = _iid(d)
+            current = maxima.setdefault(d["lg_key"], list(iid))
+            if len(current) != len(iid):
+                raise ValueError(f"Inconsistent iids for {d['lg_key']}")
+            maxima[d["lg_key"]] = [max(a, b) for a, b in zip(current, iid)]
+        return maxima
+
+    maxima, check_maxima = ranges(drops), ranges(check_drops)
+    if maxima.keys() != check_maxima.keys():
+        raise ValueError("Unrolled PGTs have different LGT nodes")
+    axes = {}
+    for key, maximum in maxima.items():
+        check_maximum = check_maxima[key]
+        if len(maximum) != len(check_maximum):
+            raise ValueError(f"Inconsistent iids for {key}")
+        changed = [
+            i for i, (a, b) in enumerate(zip(maximum, check_maximum)) if a != b
+        ]
+        if not changed:
+            axes[key] = None
+        elif (
+                len(changed) == 1
+                and maximum[changed[0]] == copies - 1
+                and check_maximum[changed[0]] == check_copies - 1
+        ):
+            axes[key] = changed[0]
+        else:
+            raise ValueError(f"Cannot find the scatter copies of {key}")
+    return axes
+
+
+def _split_oid(drop, axis):
+    """
+    Split the oid of `drop` around its copy number.
+    """
+    iid = str(drop["iid"]).split("-")
+    oid = drop["oid"]
+    iid_str = "-".join(iid)
+    if not oid.endswith(iid_str):
+        raise ValueError(f"Unexpected oid {oid}")
+    head = oid[:len(oid) - len(iid_str)] + "".join(f"{i}-" for i in iid[:axis])
+    tail = "".join(f"-{i}" for i in iid[axis + 1:])
+    return head, tail
+
+
+def _scatter_ref(entry, by_oid, axes):
+    """
+    The scatter axis and copy of the drop a producer/consumer `entry` refers
+    to, and a `_Ref` to it, or None if the drop is outside the scatter.
+    """
+    if isinstance(entry, dict):
+        (oid, port), = entry.items()
+    else:
+        oid, port = entry, None
+    target = by_oid.get(oid)
+    if target is None or axes[target["lg_key"]] is None:
+        return None
+    axis = axes[target["lg_key"]]
+    head, tail = _split_oid(target, axis)
+    return axis, _iid(target)[axis], _Ref(head, tail, port)
+
+
+def _link_pattern(entry, by_oid, axes, axis):
+    """
+    Pattern for a producer/consumer `entry` of a copied drop in copy 0.
+    """
+    ref = _scatter_ref(entry, by_oid, axes)
+    if ref is None:
+        # Outside the scatter: the same drop for every copy
+        return entry
+    target_axis, copy, pattern = ref
+    if target_axis != axis or copy != 0:
+        raise ValueError(f"{entry} is referenced from another copy")
+    return pattern
+
+
+def _boundary_links(entries, by_oid, axes, copies):
+    """
+    Patterns for the producers/consumers `entries` of a drop outside the
+    scatter, where each run of references to the scatter lists the same
+    drops in every copy, in copy order.
+    """
+    refs = [_scatter_ref(entry, by_oid, axes) for entry in entries]
+    patterns = []
+    i = 0
+    while i < len(entries):
+        if refs[i] is None:
+            patterns.append(entries[i])
+            i += 1
+            continue
+        group = []
+        while i < len(entries) and refs[i] is not None and refs[i][1] == 0:
+            group.append(refs[i][2])
+            i += 1
+        if not group:
+            raise ValueError(f"{entries[i]} is referenced out of copy order")
+        for copy in range(1, copies):
+            for ref in group:
+                if (
+                        i >= len(entries)
+                        or refs[i] is None
+                        or refs[i][1] != copy
+                        or refs[i][2].key() != ref.key()
+                ):
+                    raise ValueError(
+                        "Drop does not reference every copy of the scatter"
+                    )
+                i += 1
+        patterns.append(_Copies(group))
+    return patterns
+
+
+def _expand_links(patterns, copies):
+    """
+    The producers/consumers of a drop outside the scatter, from the
+    `_boundary_links` patterns.
+    """
+    entries = []
+    for pattern in patterns:
+        if isinstance(pattern, _Copies):
+            entries.extend(
+                _resolve(ref, str(c))
+                for c in range(copies) for ref in pattern.refs
+            )
+        else:
+            entries.append(_resolve(pattern, None))
+    return entries
+
+
+def _resolve(pattern, copy):
+    if isinstance(pattern, _Ref):
+        oid = f"{pattern.head}{copy}{pattern.tail}"
+        return oid if pattern.port is None else {oid: pattern.port}
+    if isinstance(pattern, dict):
+        return dict(pattern)
+    return pattern
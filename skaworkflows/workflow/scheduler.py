@@ -0,0 +1,251 @@
+# Copyright (C) 2026 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Data structures used to build observation plans.
+
+The planners in `hpso_to_observation` repeatedly ask "which is the first
+unplanned observation (in plan order) that still fits on the telescope?".
+`DemandTree` answers this in O(log n), so a plan of n observations is built in
+O(n log n) rather than rescanning the unplanned observations for every slot.
+
+`pack_epochs` and `pack_observations` use it to pack concurrent observations,
+and `plan_utilisation` summarises how well a plan uses the telescope.
+"""
+
+import heapq
+import math
+
+
+class DemandTree:
+    """
+    Minimum segment tree over the demands of a fixed sequence of
+    observations.
+
+    Observations are identified by their position in the sequence, and are
+    removed once they have been planned.
+
+    Parameters
+    ----------
+    demands : list
+        Telescope demand of each observation, in plan order
+    """
+
+    def __init__(self, demands):
+        self._n = len(demands)
+        self._size = 1
+        while self._size < max(self._n, 1):
+            self._size *= 2
+        self._tree = [math.inf] * (2 * self._size)
+        self._tree[self._size:self._size + self._n] = demands
+        for node in range(self._size - 1, 0, -1):
+            self._tree[node] = min(self._tree[2 * node],
+                                   self._tree[2 * node + 1])
+        self._remaining = self._n
+
+    def __len__(self):
+        return self._remaining
+
+    def remove(self, i):
+        """
+        Remove the observation at position `i`.
+        """
+        node = self._size + i
+        if self._tree[node] == math.inf:
+            raise KeyError(i)
+        self._tree[node] = math.inf
+        node //= 2
+        while node:
+            self._tree[node] = min(self._tree[2 * node],
+                                   self._tree[2 * node + 1])
+            node //= 2
+        self._remaining -= 1
+
+    def first_fit(self, capacity, start=0):
+        """
+        Position of the first remaining observation at or after `start` with
+        a demand no greater than `capacity`, or -1 if there is none.
+        """
+        if start >= self._n:
+            return -1
+        return self._first_fit(1, 0, self._size, start, capacity)
+
+    def _first_fit(self, node, lo, hi, start, capacity):
+        if hi <= start or self._tree[node] > capacity:
+            return -1
+        if node >= self._size:
+            return lo
+        mid = (lo + hi) // 2
+        found = self._first_fit(2 * node, lo, mid, start, capacity)
+        if found == -1:
+            found = self._first_fit(2 * node + 1, mid, hi, start, capacity)
+        return found
+
+    def last(self):
+        """
+        Position of the last remaining observation, or -1 if there is none.
+        """
+        if not self._remaining:
+            return -1
+        node = 1
+        while node < self._size:
+            node = 2 * node + 1
+            if self._tree[node] == math.inf:
+                node -= 1
+        return node - self._size
+
+
+def pack_epochs(observations, max_telescope_usage):
+    """
+    First-fit packing of `observations` onto the telescope in epochs.
+
+    The observations (in the given order) that fit are started together, and
+    the next epoch starts once the longest of them has finished.
+
+    Parameters
+    ----------
+    observations : list
+        Objects with `demand` and `duration` attributes, in priority order.
+    max_telescope_usage : int
+
+    Returns
+    -------
+    list
+        (start, position) pairs, in the order the observations are started,
+        where `position` is the index into `observations`.
+    """
+    tree = DemandTree([o.demand for o in observations])
+    now = 0
+    started = []
+    while tree:
+        usage = 0
+        finish = now
+        i = tree.first_fit(max_telescope_usage)
+        if i == -1:
+            raise ValueError(
+                f"Observation demand exceeds {max_telescope_usage}"
+            )
+        while i != -1:
+            tree.remove(i)
+            usage += observations[i].demand
+            finish = max(finish, now + observations[i].duration)
+            started.append((now, i))
+            i = tree.first_fit(max_telescope_usage - usage, i + 1)
+        now = finish
+    return started
+
+
+def pack_observations(observations, max_telescope_usage):
+    """
+    Event-driven first-fit packing of `observations` onto the telescope.
+
+    Whenever capacity is available, the first observations (in the given
+    order) that fit are started. Time then advances to the next time an
+    observation finishes, its demand is released, and the freed capacity is
+    backfilled straight away.
+
+    Parameters
+    ----------
+    observations : list
+        Objects with `demand` and `duration` attributes, in priority order.
+        Each demand must be no greater than `max_telescope_usage`.
+    max_telescope_usage : int
+
+    Returns
+    -------
+    list
+        (start, position) pairs, in the order the observations are started,
+        where `position` is the index into `observations`.
+
+    Notes
+    -----
+    Each observation is started once and finishes once, and every first-fit
+    query either starts an observation or ends the search at that time, so
+    packing n observations is O(n log n).
+    """
+    tree = DemandTree([o.demand for o in observations])
+    running = []  # Heap of (finish, position)
+    usage = 0
+    now = 0
+    started = []
+    while tree:
+        i = tree.first_fit(max_telescope_usage - usage)
+        while i != -1:
+            tree.remove(i)
+            usage += observations[i].demand
+            heapq.heappush(running, (now + observations[i].duration, i))
+            started.append((now, i))
+            i = tree.first_fit(max_telescope_usage - usage, i + 1)
+        if not tree:
+            break
+        if not running:
+            raise ValueError(
+                f"Observation demand exceeds {max_telescope_usage}"
+            )
+        now, i = heapq.heappop(running)
+        usage -= observations[i].demand
+        while running and running[0][0] == now:
+            usage -= observations[heapq.heappop(running)[1]].demand
+    return started
+
+
+def plan_utilisation(plan, max_telescope_usage) -> dict:
+    """
+    Summarise how a plan uses the telescope.
+
+    Parameters
+    ----------
+    plan : list
+        Planned observations, with `start`, `duration` and `demand`
+    max_telescope_usage : int
+        The capacity the plan was made for
+
+    Returns
+    -------
+    dict
+        - "observations": number of observations
+        - "makespan": time from the first start to the last finish
+        - "peak_demand": largest demand in use at any time
+        - "mean_demand": demand in use, averaged over the makespan
+        - "utilisation": fraction of the capacity used over the makespan
+        - "observations_per_hour": throughput, for durations in seconds
+    """
+    stats = {
+        "observations": len(plan),
+        "makespan": 0,
+        "peak_demand": 0,
+        "mean_demand": 0.0,
+        "utilisation": 0.0,
+        "observations_per_hour": 0.0,
+    }
+    if not plan:
+        return stats
+    # Observations that finish at the same time another starts do not overlap
+    events = sorted(
+        [(o.start, o.demand) for o in plan]
+        + [(o.start + o.duration, -o.demand) for o in plan]
+    )
+    demand = 0
+    for _, change in events:
+        demand += change
+        stats["peak_demand"] = max(stats["peak_demand"], demand)
+    makespan = events[-1][0] - events[0][0]
+    stats["makespan"] = makespan
+    if makespan:
+        demand_time = sum(o.demand * o.duration for o in plan)
+        stats["mean_demand"] = demand_time / makespan
+        stats["utilisation"] = demand_time / (max_telescope_usage * makespan)
+        stats["observations_per_hour"] = len(plan) * 3600 / makespan
+    return stats
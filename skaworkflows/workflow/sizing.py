@@ -0,0 +1,215 @@
+# Copyright (C) 2026 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Indexed lookups over the pandas system sizing data.
+
+The component and total sizing CSVs produced by
+`skaworkflows.datagen.pandas_system_sizing` are queried for every component of
+every workflow we generate. Filtering the DataFrame with boolean masks each
+time re-scans the whole table, so instead we build the index once and use
+dictionary lookups (and a bisect over the sorted baselines) from then on.
+"""
+
+import bisect
+import collections
+import hashlib
+import logging
+
+import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+# Column names used by the two flavours of pandas system sizing.
+COMPONENT_COLUMNS = {
+    "hpso": "hpso",
+    "stations": "Antenna stations",
+    "pipeline": "Pipeline",
+}
+TOTAL_COLUMNS = {
+    "hpso": "HPSO",
+    "stations": "Stations",
+    "pipeline": None,
+}
+
+# Indexes built by `SizingIndex.create` for the most recent DataFrames
+INDEX_CACHE_SIZE = 8
+_INDEX_CACHE = collections.OrderedDict()
+
+
+class SizingIndex:
+    """
+    Pre-computed index over a system sizing DataFrame.
+
+    Rows are keyed on (hpso, pipeline, baseline, channels, stations); for the
+    total sizing, which has one row per HPSO configuration, `pipeline` is
+    always None.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Component or total system sizing data
+    hpso : str
+        Name of the column storing the HPSO
+    stations : str
+        Name of the column storing the number of stations/antennas
+    pipeline : str, optional
+        Name of the column storing the pipeline (component sizing only)
+
+    Notes
+    -----
+    Numeric columns are copied into a single float64 array, so a lookup is a
+    dictionary access followed by an array index. The original DataFrame is
+    kept on `frame` for callers that still need it.
+    """
+
+    def __init__(self, frame: pd.DataFrame, hpso, stations, pipeline=None):
+        self.frame = frame
+        self.hpso_column = hpso
+        self.stations_column = stations
+        self.pipeline_column = pipeline
+
+        numeric = frame.select_dtypes("number")
+        self.columns = {c: i for i, c in enumerate(numeric.columns)}
+        self.values = numeric.to_numpy(dtype=float)
+
+        hpsos = frame[hpso].tolist()
+        pipelines = (
+            frame[pipeline].tolist() if pipeline else [None] * len(frame)
+        )
+        keys = zip(
+            hpsos,
+            pipelines,
+            frame["Baseline"].astype(float).tolist(),
+            frame["Channels"].astype(float).tolist(),
+            frame[stations].astype(float).tolist(),
+        )
+        self._rows = {}
+        baselines = {}
+        for row, key in enumerate(keys):
+            # Keep the first occurrence, which is what `.iloc[0]` used to
+            # return from the filtered DataFrame.
+            self._rows.setdefault(key, row)
+            baselines.setdefault(key[0], {}).setdefault(key[2], row)
+        self._baselines = {h: sorted(b) for h, b in baselines.items()}
+        # First row of each baseline, to break ties in frame order
+        self._baseline_rows = baselines
+        self.hpsos = set(hpsos)
+        self.pipelines = set(pipelines) - {None}
+        self._digest = None
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame):
+        """
+        Build the index, inferring the sizing layout from the columns present
+        in `frame`.
+        """
+        if COMPONENT_COLUMNS["pipeline"] in frame.columns:
+            return cls(frame, **COMPONENT_COLUMNS)
+        return cls(frame, **TOTAL_COLUMNS)
+
+    @classmethod
+    def create(cls, sizing):
+        """
+        Return `sizing` as a SizingIndex, building one if passed a DataFrame.
+
+        The indexes of the last `INDEX_CACHE_SIZE` DataFrames are kept, so
+        that passing the same DataFrame again does not rebuild the index;
+        DataFrames must not be modified once they have been indexed.
+        """
+        if isinstance(sizing, cls):
+            return sizing
+        # The cached index holds the frame, so its id is not reused
+        index = _INDEX_CACHE.get(id(sizing))
+        if index is not None and index.frame is sizing:
+            _INDEX_CACHE.move_to_end(id(sizing))
+            return index
+        index = cls.from_frame(sizing)
+        _INDEX_CACHE[id(sizing)] = index
+        if len(_INDEX_CACHE) > INDEX_CACHE_SIZE:
+            _INDEX_CACHE.popitem(last=False)
+        return index
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def digest(self) -> str:
+        """
+        Hash of the sizing data, so that workflows costed with it can be
+        identified (see `hpso_to_observation.workflow_fingerprint`).
+        """
+        if self._digest is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update("\x00".join(map(str, self.frame.columns)).encode())
+            digest.update(
+                pd.util.hash_pandas_object(self.frame, index=False)
+                .to_numpy().tobytes()
+            )
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    def has_hpso(self, hpso) -> bool:
+        return hpso in self.hpsos
+
+    def has_pipeline(self, pipeline) -> bool:
+        return pipeline in self.pipelines
+
+    def nearest_baseline(self, hpso, baseline):
+        """
+        Find the baseline stored for `hpso` that is closest to `baseline`.
+
+        Ties are resolved in favour of the baseline that comes first in the
+        sizing data, as `min` over the baseline column would.
+
+        Raises
+        ------
+        ValueError
+            If there is no sizing data for `hpso`.
+        """
+        baselines = self._baselines.get(hpso)
+        if not baselines:
+            raise ValueError(f"No sizing data available for {hpso}")
+        pos = bisect.bisect_left(baselines, baseline)
+        if pos == 0:
+            return baselines[0]
+        if pos == len(baselines):
+            return baselines[-1]
+        lower, upper = baselines[pos - 1], baselines[pos]
+        if upper - baseline < baseline - lower:
+            return upper
+        if upper - baseline == baseline - lower:
+            rows = self._baseline_rows[hpso]
+            return min(lower, upper, key=rows.get)
+        return lower
+
+    def row(self, hpso, baseline, channels, stations, pipeline=None):
+        """
+        Row position for the exact key, or None if it is not present.
+        """
+        return self._rows.get(
+            (hpso, pipeline, float(baseline), float(channels), float(stations))
+        )
+
+    def value(self, row, column) -> float:
+        """
+        Value of numeric `column` at `row`.
+
+        Raises
+        ------
+        KeyError
+            If `column` is not a numeric column of the sizing data.
+        """
+        return float(self.values[row, self.columns[column]])
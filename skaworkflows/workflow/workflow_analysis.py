@@ -15,11 +15,17 @@
 
 
 import json
-import pandas as pd
 import networkx as nx
 
 from pathlib import Path
 
+from skaworkflows.common import load_sizing
+from skaworkflows.workflow.workflow_io import (
+    is_columnar,
+    load_workflow,
+    load_workflow_columns,
+)
+
 
 def generate_workflow_stats(wf_path):
     """
@@ -36,8 +42,7 @@ def generate_workflow_stats(wf_path):
         Dictionary of material printed to user
     """
 
-    with open(wf_path) as fp:
-        jgraph = json.load(fp)
+    jgraph = load_workflow(wf_path)
 
     graph = nx.readrwite.node_link_graph(jgraph['graph'], edges="links")
 
@@ -59,8 +64,13 @@ def calculate_total_flops(wf_path):
 
     """
 
-    with open(wf_path) as fp:
-        jgraph = json.load(fp)
+    if is_columnar(wf_path):
+        columns = load_workflow_columns(wf_path, ["comp", "comp_mask"])
+        if not columns["comp_mask"].all():
+            raise KeyError("comp")
+        return float(columns["comp"].sum())
+
+    jgraph = load_workflow(wf_path)
 
     total_flops = 0
     graph = nx.readwrite.node_link_graph(jgraph['graph'], edges="links")
@@ -84,7 +94,7 @@ def calculate_expected_flops(hpso, workflows, duration, sizing, baseline=65000):
 
     expected_flops = 0
 
-    df = pd.read_csv(sizing)
+    df = load_sizing(sizing)
 
     cols = ['HPSO', 'Baseline'] + [f"{w} [Pflop/s]" for w in workflows]
 
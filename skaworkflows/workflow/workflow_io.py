@@ -0,0 +1,379 @@
+# Copyright (C) 2026 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Reading and writing workflow files.
+
+Workflow files are JSON objects with a "header" and a node-link "graph".
+`write_workflow` streams this structure straight from the graph, one node or
+link at a time, rather than building the node-link dictionary first, and can
+write it without indentation and/or compressed. `open_workflow` and
+`load_workflow` detect the compression from the file contents, so they read
+any of these variants.
+
+Workflows can also be written in a binary, columnar format
+(`write_workflow_columns`): an uncompressed NumPy `.npz` bundle of node and
+edge arrays, with the header stored as JSON. `load_workflow_columns` memory
+maps just the columns that are requested, which is all most analysis needs.
+"""
+
+import gzip
+import io
+import json
+import math
+import re
+import struct
+import zipfile
+
+import numpy as np
+
+from skaworkflows.common import NpEncoder
+from skaworkflows.workflow.compact_graph import CompactGraph
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIX = {None: "", "gzip": ".gz", "zstd": ".zst"}
+COLUMNAR_SUFFIX = ".npz"
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZIP_MAGIC = b"PK\x03\x04"
+
+# Bytes read at a time when looking for the header of a workflow file
+HEADER_CHUNK = 2 ** 14
+MAX_HEADER_READ = 2 ** 20
+HEADER_KEY = re.compile(r'"header"\s*:\s*')
+
+# Fixed-size part of a zip local file header; the name and extra field
+# lengths are the last two fields.
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError(
+            "zstd compression requires the 'zstandard' package; install "
+            "skaworkflows[zstd]"
+        )
+
+
+def open_workflow(path, mode="r"):
+    """
+    Open a workflow file as text, (de)compressing it if necessary.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+    mode : str
+        "r" to read, in which case the compression is detected from the
+        file contents; otherwise one of "w", "w:gzip" or "w:zstd".
+
+    Returns
+    -------
+    Text file object
+    """
+    if mode == "r":
+        with open(path, "rb") as fp:
+            magic = fp.read(4)
+        if magic.startswith(GZIP_MAGIC):
+            return gzip.open(path, "rt")
+        if magic.startswith(ZSTD_MAGIC):
+            _require_zstandard()
+            return io.TextIOWrapper(
+                zstandard.ZstdDecompressor().stream_reader(open(path, "rb"),
+                                                           closefd=True)
+            )
+        return open(path)
+
+    compression = mode.partition(":")[2] or None
+    if compression not in COMPRESSION_SUFFIX:
+        raise ValueError(f"Unsupported workflow compression '{compression}'")
+    if compression == "gzip":
+        return gzip.open(path, "wt")
+    if compression == "zstd":
+        _require_zstandard()
+        return io.TextIOWrapper(
+            zstandard.ZstdCompressor().stream_writer(open(path, "wb"),
+                                                     closefd=True)
+        )
+    return open(path, "w")
+
+
+def is_columnar(path) -> bool:
+    """
+    True if `path` is a columnar (`.npz`) workflow file.
+    """
+    with open(path, "rb") as fp:
+        return fp.read(4) == ZIP_MAGIC
+
+
+def load_workflow(path) -> dict:
+    """
+    Load a workflow file as a dictionary with "header" and node-link "graph".
+
+    JSON files may be compressed; columnar files are converted to node-link
+    form (without the DALiuGE oids, which they do not store).
+    """
+    if is_columnar(path):
+        columns = load_workflow_columns(path, mmap=False)
+        header = columns.pop("header")
+        return {
+            "header": header,
+            "graph": CompactGraph.from_arrays(columns).to_node_link(),
+        }
+    with open_workflow(path) as fp:
+        return json.load(fp)
+
+
+def read_workflow_header(path) -> dict:
+    """
+    Read the "header" of a workflow file without loading the graph.
+
+    Workflows written by `write_workflow` store the header first (and may be
+    compressed), so we decode it from the start of the file and only fall
+    back to loading the complete file if it cannot be found there.
+    """
+    if is_columnar(path):
+        return load_workflow_columns(path, columns=[])["header"]
+    decoder = json.JSONDecoder()
+    with open_workflow(path) as fp:
+        text = ""
+        while len(text) < MAX_HEADER_READ:
+            chunk = fp.read(HEADER_CHUNK)
+            text += chunk
+            match = HEADER_KEY.search(text)
+            if match:
+                try:
+                    header, _ = decoder.raw_decode(text, match.end())
+                    return header
+                except json.JSONDecodeError:
+                    pass
+            if not chunk:
+                break
+    return load_workflow(path)["header"]
+
+
+def write_workflow_columns(path, header, graph):
+    """
+    Write a workflow in the columnar format.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Output file; written as-is, without adding a `.npz` suffix.
+    header : dict
+        Workflow header
+    graph : :py:obj:`networkx.DiGraph` or :py:obj:`CompactGraph`
+
+    Notes
+    -----
+    Node columns (`node_prefix`, `node_index`, `comp`, `task_data`) are
+    indexed by node ID; `prefixes` holds the interned "{workflow}_{component}"
+    names, split into `prefix_workflow` and `prefix_component`. Edge columns
+    (`edge_source`, `edge_target`, `transfer_data`) are sorted by source.
+    Each numeric attribute has a `<name>_mask` column marking which
+    nodes/edges have it, and a `<name>_int` column marking the values that
+    are integers. The members are stored uncompressed so that they can
+    be memory mapped.
+    """
+    if not isinstance(graph, CompactGraph):
+        graph = CompactGraph.from_networkx(graph)
+    arrays = graph.to_arrays()
+    arrays["header"] = np.array(json.dumps(header, cls=NpEncoder))
+    with open(path, "wb") as fp:
+        np.savez(fp, **arrays)
+
+
+def _memmap_member(path, zf, info):
+    """
+    Memory map the array stored (uncompressed) in zip member `info`.
+    """
+    with open(path, "rb") as fp:
+        fp.seek(info.header_offset)
+        fields = _ZIP_LOCAL_HEADER.unpack(fp.read(_ZIP_LOCAL_HEADER.size))
+        fp.seek(fields[-2] + fields[-1], io.SEEK_CUR)
+        version = np.lib.format.read_magic(fp)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(fp)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(fp)
+        offset = fp.tell()
+    if dtype.hasobject or math.prod(shape) == 0:
+        with zf.open(info) as member:
+            return np.lib.format.read_array(member)
+    return np.memmap(
+        path, dtype=dtype, mode="r", offset=offset, shape=shape,
+        order="F" if fortran else "C"
+    )
+
+
+def load_workflow_columns(path, columns=None, mmap=True) -> dict:
+    """
+    Read columns from a columnar workflow file.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+    columns : list, optional
+        Names of the columns to read (see `write_workflow_columns`); all
+        columns by default. The header is always returned, as a dict under
+        "header".
+    mmap : bool
+        Memory map the columns rather than reading them into memory.
+
+    Returns
+    -------
+    dict
+        Column name -> array
+    """
+    result = {}
+    with zipfile.ZipFile(path) as zf:
+        members = {
+            info.filename[:-len(".npy")]: info for info in zf.infolist()
+        }
+        names = list(members) if columns is None else list(columns)
+        if "header" not in names:
+            names.append("header")
+        for name in names:
+            if name not in members:
+                raise KeyError(f"Column '{name}' not in workflow {path}")
+            info = members[name]
+            if name == "header":
+                with zf.open(info) as member:
+                    result[name] = json.loads(
+                        str(np.lib.format.read_array(member)[()])
+                    )
+            elif mmap and info.compress_type == zipfile.ZIP_STORED:
+                result[name] = _memmap_member(path, zf, info)
+            else:
+                with zf.open(info) as member:
+                    result[name] = np.lib.format.read_array(member)
+    return result
+
+
+def _node_link_nodes(graph):
+    for node, attrs in graph.nodes(data=True):
+        yield {**attrs, "id": node}
+
+
+def _node_link_links(graph):
+    for u, v, attrs in graph.edges(data=True):
+        yield {**attrs, "source": u, "target": v}
+
+
+class _JSONStream:
+    """
+    Write JSON incrementally, formatted as `json.dump` would format the
+    complete object with the same `indent`.
+    """
+
+    def __init__(self, fp, indent=None):
+        self.fp = fp
+        self.indent = indent
+        if indent is None:
+            self.separators = (",", ":")
+        else:
+            self.separators = (",", ": ")
+
+    def _newline(self, level):
+        if self.indent is None:
+            return ""
+        return "\n" + " " * (self.indent * level)
+
+    def value(self, obj, level):
+        """
+        Write a complete value, nested at `level`.
+        """
+        text = json.dumps(
+            obj, indent=self.indent, separators=self.separators, cls=NpEncoder
+        )
+        if self.indent is not None:
+            text = text.replace("\n", self._newline(level))
+        self.fp.write(text)
+
+    def array(self, items, level):
+        """
+        Write an array from an iterable, one element at a time.
+        """
+        empty = True
+        for item in items:
+            self.fp.write(("[" if empty else self.separators[0])
+                          + self._newline(level + 1))
+            self.value(item, level + 1)
+            empty = False
+        self.fp.write("[]" if empty else self._newline(level) + "]")
+
+    def object(self, items, level):
+        """
+        Write an object from (key, value) pairs. Values that are `callable`
+        are called with the stream and their nesting level to write
+        themselves.
+        """
+        empty = True
+        for key, value in items:
+            self.fp.write(("{" if empty else self.separators[0])
+                          + self._newline(level + 1))
+            self.fp.write(json.dumps(key) + self.separators[1])
+            if callable(value):
+                value(self, level + 1)
+            else:
+                self.value(value, level + 1)
+            empty = False
+        self.fp.write("{}" if empty else self._newline(level) + "}")
+
+
+def write_workflow(path, header, graph, indent=2, compression=None):
+    """
+    Stream a workflow file for `graph` to `path`.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Output file. The suffix is not changed; use `COMPRESSION_SUFFIX` to
+        name compressed files.
+    header : dict
+        Workflow header (see `common.create_workflow_header`)
+    graph : :py:obj:`networkx.DiGraph` or :py:obj:`CompactGraph`
+    indent : int or None
+        Indentation, as for `json.dump`. None writes compact JSON without
+        any whitespace.
+    compression : str, optional
+        None, "gzip" or "zstd" (requires the `zstandard` package).
+
+    Notes
+    -----
+    With `indent` set, the output is identical to
+    `json.dump(produce_final_workflow_structure(...), fp, indent=indent)`.
+    """
+    mode = "w" if compression is None else f"w:{compression}"
+    with open_workflow(path, mode) as fp:
+        stream = _JSONStream(fp, indent)
+        graph_items = [
+            ("directed", True),
+            ("multigraph", False),
+            ("graph", getattr(graph, "graph", {})),
+            ("nodes", lambda s, lvl: s.array(_node_link_nodes(graph), lvl)),
+            ("links", lambda s, lvl: s.array(_node_link_links(graph), lvl)),
+        ]
+        stream.object(
+            [
+                ("header", header),
+                ("graph", lambda s, lvl: s.object(graph_items, lvl)),
+            ],
+            0,
+        )
@@ -0,0 +1,216 @@
+# Copyright (C) 2026 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Content-addressed store of workflow files, shared between config directories.
+
+Workflow files are named by their fingerprint (see
+`hpso_to_observation.workflow_fingerprint`), so a file with a given name
+always holds the same workflow. Configs that share a store link their
+`workflows/<name>` entries to the one copy in the store rather than writing
+the workflow again. Configs still refer to their workflows by the relative
+path `workflows/<name>`, so they are read exactly as before.
+"""
+
+import logging
+import os
+import shutil
+import time
+import uuid
+
+from pathlib import Path
+
+LOGGER = logging.getLogger(__name__)
+
+# Directory used by `sweep.run_sweep`, relative to its output directory
+WORKFLOW_STORE_DIR = ".workflow_store"
+# If set, `config_generator.create_config` uses the store in this directory
+WORKFLOW_STORE_ENV = "SKAWORKFLOWS_WORKFLOW_STORE"
+
+# Ways of linking a config to the store, in order of preference
+LINK_METHODS = ("hardlink", "symlink", "copy")
+
+
+def default_workflow_store():
+    """
+    The store named by `WORKFLOW_STORE_ENV`, or None if it is not set.
+    """
+    if os.environ.get(WORKFLOW_STORE_ENV):
+        return WorkflowStore(os.environ[WORKFLOW_STORE_ENV])
+    return None
+
+
+class WorkflowStore:
+    """
+    Directory of workflow files, linked into the config directories that use
+    them.
+
+    Parameters
+    ----------
+    store_dir : pathlib.Path
+        Directory in which the workflows are stored; created if it does not
+        exist.
+    link : str
+        How config directories are linked to the store: "hardlink",
+        "symlink" or "copy", or "auto" (the default) for the first of these
+        that the file system allows. Hard links need the store and the
+        configs on the same file system.
+
+    Notes
+    -----
+    Entries are written to a temporary file and renamed into place, so
+    several processes can share a store.
+    """
+
+    def __init__(self, store_dir, link="auto"):
+        if link != "auto" and link not in LINK_METHODS:
+            raise ValueError(f"Unsupported link method '{link}'")
+        self.store_dir = Path(store_dir)
+        self.link_method = link
+
+    @property
+    def _methods(self):
+        if self.link_method == "auto":
+            return LINK_METHODS
+        return (self.link_method,)
+
+    def path(self, name: str) -> Path:
+        return self.store_dir / name
+
+    def __contains__(self, name):
+        return self.path(name).exists()
+
+    def add(self, paths):
+        """
+        Store the files at `paths` under their names, and link each file to
+        its stored copy.
+
+        A file already in the store is not stored again; the file at `path`
+        is replaced with a link to the existing copy instead.
+        """
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        for path in map(Path, paths):
+            stored = self.path(path.name)
+            if not stored.exists():
+                # The store always holds the data itself, never a symlink
+                _replace_with_link(path, stored, ("hardlink", "copy"))
+                LOGGER.debug("Added %s to workflow store", path.name)
+            if not _same_file(path, stored) and self.link_method != "copy":
+                _replace_with_link(stored, path, self._methods)
+
+    def link(self, names, directory) -> bool:
+        """
+        Link the stored files `names` into `directory`.
+
+        Returns
+        -------
+        bool
+            False, and nothing is linked, unless all of `names` are stored.
+        """
+        if not all(name in self for name in names):
+            return False
+        for name in names:
+            method = _replace_with_link(
+                self.path(name), Path(directory) / name, self._methods
+            )
+            LOGGER.debug("Linked %s from workflow store (%s)", name, method)
+        return True
+
+    def collect_garbage(self, config_dirs=(), min_age=0) -> list:
+        """
+        Remove stored workflows that no config directory uses.
+
+        A stored file is in use if it is hard linked elsewhere, or if a
+        symlink in the `workflows` directory of one of `config_dirs` points
+        to it. Configs that were linked with symlinks must therefore be
+        passed in `config_dirs`; copied files never refer to the store.
+
+        Parameters
+        ----------
+        config_dirs : iterable
+            Config directories (containing `workflows/`) to keep workflows for
+        min_age : float
+            Only remove files stored at least this many seconds ago, so that
+            workflows being generated concurrently are not removed.
+
+        Returns
+        -------
+        list
+            Names of the removed files
+        """
+        if not self.store_dir.exists():
+            return []
+        store_dir = self.store_dir.resolve()
+        symlinked = set()
+        for config_dir in config_dirs:
+            workflow_dir = Path(config_dir) / "workflows"
+            if not workflow_dir.is_dir():
+                continue
+            for entry in workflow_dir.iterdir():
+                if entry.is_symlink():
+                    target = entry.resolve()
+                    if target.parent == store_dir:
+                        symlinked.add(target.name)
+
+        removed = []
+        now = time.time()
+        for path in self.store_dir.iterdir():
+            if path.name.startswith(".") or path.name in symlinked:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # Removed by another process
+                continue
+            if stat.st_nlink > 1 or now - stat.st_mtime < min_age:
+                continue
+            path.unlink(missing_ok=True)
+            removed.append(path.name)
+        LOGGER.info("Removed %d unused workflows from store", len(removed))
+        return removed
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except FileNotFoundError:
+        return False
+
+
+def _replace_with_link(source: Path, target: Path, methods) -> str:
+    """
+    Atomically replace `target` with a link to `source`, using the first of
+    `methods` that succeeds.
+
+    Returns
+    -------
+    str
+        The method used
+    """
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    error = None
+    for method in methods:
+        try:
+            if method == "hardlink":
+                os.link(source, tmp)
+            elif method == "symlink":
+                os.symlink(Path(source).resolve(), tmp)
+            else:
+                shutil.copyfile(source, tmp)
+            os.replace(tmp, target)
+            return method
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            error = e
+    raise error
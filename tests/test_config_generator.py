@@ -13,13 +13,25 @@ import shutil
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import json
+import os
+import stat
+import tempfile
 import unittest
 
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
 from skaworkflows.config_generator import create_config
 import filecmp
 from pathlib import Path
 
-from skaworkflows import config_generator
+from skaworkflows import common, config_generator, sweep
+import skaworkflows.workflow.hpso_to_observation as hto
+from skaworkflows.workflow.scatter_template import TEMPLATE_COPIES
+from skaworkflows.workflow.workflow_io import read_workflow_header
 
 HPSO_PARAMETERS = {
     "nodes": 256,
@@ -69,3 +81,195 @@ class TestConfigGeneration(unittest.TestCase):
 
     def tearDown(self):
         shutil.rmtree('tmp')
+
+
+class TestSizingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tmpdir.name) / "cache"
+        common._SIZING_FRAMES.clear()
+
+    def tearDown(self):
+        common._SIZING_FRAMES.clear()
+        self.tmpdir.cleanup()
+
+    def test_parity_with_read_csv(self):
+        for path in [common.LOW_COMPONENT_SIZING, common.LOW_TOTAL_SIZING]:
+            expected = pd.read_csv(path)
+            pd.testing.assert_frame_equal(
+                expected, common.load_sizing(path, self.cache_dir)
+            )
+            # Load again from the columnar cache rather than memory
+            common._SIZING_FRAMES.clear()
+            pd.testing.assert_frame_equal(
+                expected, common.load_sizing(path, self.cache_dir)
+            )
+
+    def test_shared_frames_are_not_modified(self):
+        frame = common.load_sizing(common.LOW_TOTAL_SIZING, self.cache_dir)
+        frame["Baseline"] = 0
+        self.assertNotEqual(
+            0,
+            common.load_sizing(
+                common.LOW_TOTAL_SIZING, self.cache_dir
+            )["Baseline"].iloc[0],
+        )
+
+    def test_copied_without_copy_on_write(self):
+        """
+        Without copy-on-write, in-place edits must not fail on the read-only
+        memory maps or reach the shared frame
+        """
+        common.load_sizing(common.LOW_TOTAL_SIZING, self.cache_dir)
+        common._SIZING_FRAMES.clear()
+        with mock.patch.object(common, "_copy_on_write", return_value=False):
+            frame = common.load_sizing(common.LOW_TOTAL_SIZING, self.cache_dir)
+        (_, shared), = common._SIZING_FRAMES.values()
+        for column in frame.columns:
+            self.assertFalse(np.shares_memory(
+                frame[column].to_numpy(), shared[column].to_numpy()
+            ))
+
+    def test_invalidated_when_csv_changes(self):
+        path = Path(self.tmpdir.name) / "sizing.csv"
+        pd.DataFrame({"HPSO": ["hpso01"], "Baseline": [65000.0]}).to_csv(
+            path, index=False
+        )
+        common.load_sizing(path, self.cache_dir)
+        pd.DataFrame({"HPSO": ["hpso02a"], "Baseline": [65000.0]}).to_csv(
+            path, index=False
+        )
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        common._SIZING_FRAMES.clear()
+        self.assertEqual(
+            "hpso02a",
+            common.load_sizing(path, self.cache_dir)["HPSO"].iloc[0]
+        )
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.tmpdir.name)
+        self.parameters = {
+            "nodes": 256,
+            "infrastructure": "parametric",
+            "telescope": "low",
+            "hpsos": [
+                {
+                    "count": 1,
+                    "hpso": "hpso01",
+                    "demand": 512,
+                    "duration": 60,
+                    "workflows": ["DPrepA"],
+                    "channels": 16384,
+                    "workflow_parallelism": 4,
+                    "baseline": 65000.0,
+                    "telescope": "low"
+                },
+            ]
+        }
+        # 4 grid points, but only 2 unique sets of parameters
+        self.grid = {"nodes": [128, 256], "demand": [256, 256]}
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_expand_grid(self):
+        points = sweep.expand_grid(self.parameters, self.grid)
+        self.assertEqual(4, len(points))
+        point, parameters = points[0]
+        self.assertDictEqual({"nodes": 128, "demand": 256}, point)
+        self.assertEqual(128, parameters["nodes"])
+        self.assertEqual(256, parameters["hpsos"][0]["demand"])
+        # The base parameters are unchanged
+        self.assertEqual(512, self.parameters["hpsos"][0]["demand"])
+        with self.assertRaises(ValueError):
+            sweep.expand_grid(self.parameters, {"count": [1, 2]})
+
+    def test_run_sweep(self):
+        # Templates learnt by earlier tests would be inherited by the workers
+        hto._SCATTER_TEMPLATES.clear()
+        manifest_path = sweep.run_sweep(
+            self.parameters, self.grid, self.output_dir,
+            {"DPrepA": "prototype"}, workers=2
+        )
+        with open(manifest_path) as fp:
+            manifest = json.load(fp)
+        self.assertEqual(4, len(manifest["points"]))
+        self.assertEqual(2, len(manifest["configs"]))
+        for entry in manifest["points"]:
+            configs = manifest["configs"][entry["key"]]
+            self.assertEqual(1, len(configs))
+            with open(self.output_dir / configs[0]) as fp:
+                config = json.load(fp)
+            self.assertEqual(
+                entry["point"]["nodes"],
+                sum(m["count"] for m in config["cluster"]["system"]["resources"].values()),
+            )
+        # Both points share the one graph, expanded from the template PGTs
+        self.assertEqual(
+            len(TEMPLATE_COPIES),
+            len(list((self.output_dir / ".pgt_cache").glob("*.json.gz")))
+        )
+        # ... and the one workflow file, linked from the workflow store
+        workflows = set()
+        for configs in manifest["configs"].values():
+            with open(self.output_dir / configs[0]) as fp:
+                pipeline = json.load(fp)["instrument"]["telescope"][
+                    "pipelines"]["hpso01_0"]
+            workflow = self.output_dir / configs[0]
+            workflow = workflow.parent / pipeline["workflow"]
+            self.assertTrue(os.path.samefile(
+                self.output_dir / ".workflow_store" / workflow.name, workflow
+            ))
+            workflows.add(workflow.name)
+        self.assertEqual(1, len(workflows))
+        # Files are written atomically with the usual permissions
+        written = [manifest_path, self.output_dir / ".workflow_store" / workflow.name]
+        written += list((self.output_dir / ".pgt_cache").glob("*.json.gz"))
+        written += [
+            self.output_dir / c for configs in manifest["configs"].values()
+            for c in configs
+        ]
+        for path in written:
+            self.assertEqual(
+                common.default_mode(), stat.S_IMODE(os.stat(path).st_mode)
+            )
+
+    def test_incremental_config(self):
+        """
+        An incremental config keeps its name, and re-running it only
+        regenerates the workflows of changed observations.
+        """
+        base_graph_paths = {"DPrepA": "prototype"}
+        first = create_config(
+            self.parameters, self.output_dir, base_graph_paths,
+            incremental=True
+        )
+        with open(first[0]) as fp:
+            workflow = json.load(fp)["instrument"]["telescope"]["pipelines"][
+                "hpso01_0"]["workflow"]
+        mtime = (self.output_dir / workflow).stat().st_mtime_ns
+
+        second = create_config(
+            self.parameters, self.output_dir, base_graph_paths,
+            incremental=True
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(mtime, (self.output_dir / workflow).stat().st_mtime_ns)
+
+        self.parameters["hpsos"][0]["duration"] = 120
+        third = create_config(
+            self.parameters, self.output_dir, base_graph_paths,
+            incremental=True
+        )
+        with open(third[0]) as fp:
+            pipeline = json.load(fp)["instrument"]["telescope"]["pipelines"][
+                "hpso01_0"]
+        header = read_workflow_header(self.output_dir / pipeline["workflow"])
+        self.assertEqual(120, header["parameters"]["duration"])
+        self.assertEqual(pipeline["fingerprint"], header["fingerprint"])
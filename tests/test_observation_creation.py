@@ -15,12 +15,17 @@ import copy
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import os
 import pytest
+import random
+import subprocess
+import sys
 import unittest
 from pathlib import Path
 
 import skaworkflows.workflow.hpso_to_observation as hto
 from skaworkflows.workflow.hpso_to_observation import Observation
+from skaworkflows.workflow.scheduler import plan_utilisation
 
 
 @unittest.skip("Legacy test cases")
@@ -66,6 +71,49 @@ SMALL_OBS_LIST = [
 ]
 
 
+class TestObservation(unittest.TestCase):
+
+    def testStableHash(self):
+        """
+        The hash of an observation does not depend on the process it is
+        created in.
+        """
+        code = (
+            "from skaworkflows.workflow.hpso_to_observation import Observation;"
+            "print(hash(Observation('A', 'hpso01', ['ICAL'], 64, 18000, "
+            "16384, 64, 65000, 'low')))"
+        )
+        hashes = {
+            subprocess.run(
+                [sys.executable, "-c", code], check=True, capture_output=True,
+                text=True, env={**os.environ, "PYTHONHASHSEED": seed}
+            ).stdout.strip()
+            for seed in ("1", "2")
+        }
+        self.assertEqual({str(hash(SMALL_OBS_LIST[0]))}, hashes)
+
+    def testParameters(self):
+        observation = copy.deepcopy(SMALL_OBS_LIST[0])
+        self.assertEqual(observation, copy.deepcopy(observation))
+        self.assertNotEqual(observation, observation.replace(duration=60))
+        self.assertNotEqual(
+            hash(observation), hash(observation.replace(duration=60))
+        )
+        self.assertTupleEqual(('ICAL',), observation.workflows)
+        with self.assertRaises(AttributeError):
+            observation.demand = 512
+
+    def testStateIsNotShared(self):
+        observation = copy.deepcopy(SMALL_OBS_LIST[0])
+        planned = copy.copy(observation)
+        planned.add_start_time(60)
+        planned.planned = True
+        self.assertIs(observation.spec, planned.spec)
+        self.assertEqual(0, observation.start)
+        self.assertFalse(observation.planned)
+        self.assertEqual(60, planned.start)
+
+
 class TestObservationPlan(unittest.TestCase):
 
     def setUp(self):
@@ -96,10 +144,123 @@ class TestObservationPlan(unittest.TestCase):
         plan_obs = [o.start for o in plan if o.name != 'B']
         self.assertEqual(1, len(set(plan_obs)))
 
+    def testEventPacking(self):
+        """
+        Event packing backfills the capacity released by short observations,
+        so the long observation no longer holds up the rest of the plan.
+        """
+        observations = [
+            Observation('long', 'hpso01', 'ICAL', 256, 100, 16384, 64,
+                        65000, "low"),
+            Observation('short_0', 'hpso01', 'ICAL', 256, 10, 16384, 64,
+                        65000, "low"),
+            Observation('short_1', 'hpso01', 'ICAL', 256, 10, 16384, 64,
+                        65000, "low"),
+        ]
+        for seed in range(6):
+            random.seed(seed)
+            epoch = hto.create_basic_plan(
+                copy.deepcopy(observations), max_telescope_usage=512,
+                with_concurrent=True
+            )
+            random.seed(seed)
+            event = hto.create_basic_plan(
+                copy.deepcopy(observations), max_telescope_usage=512,
+                with_concurrent=True, packing="event"
+            )
+            epoch_stats = plan_utilisation(epoch, 512)
+            event_stats = plan_utilisation(event, 512)
+            self.assertEqual(3, event_stats["observations"])
+            self.assertLessEqual(event_stats["peak_demand"], 512)
+            self.assertLessEqual(event_stats["makespan"], epoch_stats["makespan"])
+            self.assertTrue(all(o.planned for o in event))
+        with self.assertRaises(ValueError):
+            hto.create_basic_plan(observations, 512, packing="best")
+
+    def testPlanUtilisation(self):
+        plan = copy.deepcopy(SMALL_OBS_LIST)
+        for o, start in zip(plan, [0, 0, 18000, 18000]):
+            o.add_start_time(start)
+        stats = plan_utilisation(plan, 512)
+        self.assertEqual(36000, stats["makespan"])
+        self.assertEqual(320, stats["peak_demand"])
+        self.assertAlmostEqual(448 * 18000 / 36000, stats["mean_demand"])
+        self.assertAlmostEqual(448 * 18000 / (512 * 36000), stats["utilisation"])
+        self.assertAlmostEqual(0.4, stats["observations_per_hour"])
+
+    def testPlanUtilisationDurationInSeconds(self):
+        # Two half-hour (1800 s) observations run back to back fill one hour
+        plan = [
+            Observation('A', 'hpso01', 'ICAL', 64, 1800,
+                        16384, 64, 65000, "low"),
+            Observation('B', 'hpso01', 'ICAL', 64, 1800,
+                        16384, 64, 65000, "low"),
+        ]
+        for o, start in zip(plan, [0, 1800]):
+            o.add_start_time(start)
+        stats = plan_utilisation(plan, 64)
+        self.assertEqual(3600, stats["makespan"])
+        self.assertAlmostEqual(1.0, stats["utilisation"])
+        self.assertAlmostEqual(2.0, stats["observations_per_hour"])
+
     def testAlternatePlans(self):
         plan = hto.create_basic_plan(copy.deepcopy(SMALL_OBS_LIST),
                                      max_telescope_usage=256, with_concurrent=False)
-        alternates = hto.alternate_plan_composition(plan, 512)
-        print(alternates)
-        # self.assertListEqual(['A', 'C', 'D', 'B'], plan_obs)
+        alternates = hto.alternate_plan_composition(plan, 512, shuffle=False)
+        # 'B' is inserted at the end, unless it is already there
+        self.assertEqual(1 if plan[-1].name == 'B' else 2, len(alternates))
+        self.assertEqual('B', alternates[-1][-1].name)
+        for alternate in alternates:
+            self.assertCountEqual(plan, alternate)
+            self.assertListEqual(
+                [0, 18000, 36000, 54000], [o.start for o in alternate]
+            )
+        # The input plan is not modified
+        self.assertListEqual(
+            [0, 18000, 36000, 54000], [o.start for o in plan]
+        )
+
+    def testShuffledAlternatePlans(self):
+        """
+        By default the alternates are random plans, following the plan
+        itself
+        """
+        plan = hto.create_basic_plan(copy.deepcopy(SMALL_OBS_LIST),
+                                     max_telescope_usage=256, with_concurrent=False)
+        alternates = hto.alternate_plan_composition(plan, 512, seed=1)
+        self.assertListEqual(plan, alternates[0])
+        for alternate in alternates:
+            self.assertCountEqual(plan, alternate)
+            self.assertListEqual(
+                [0, 18000, 36000, 54000], [o.start for o in alternate]
+            )
+        self.assertListEqual(
+            alternates, hto.alternate_plan_composition(plan, 512, seed=1)
+        )
+
+    def testPlanPermutations(self):
+        table = copy.deepcopy(SMALL_OBS_LIST)
+        permutations = hto.plan_permutations(table, 256)
+        self.assertNotIsInstance(permutations, list)
+        # 'B' is moved back through the plan; moving it to where it already
+        # is gives the same plan
+        orders = [p.order.tolist() for p in permutations]
+        self.assertListEqual(
+            [[0, 1, 2, 3], [0, 2, 1, 3], [0, 2, 3, 1]], orders
+        )
+        # With concurrent observations every order packs 'A', 'C' and 'D'
+        # first, so they are all the same plan
+        permutations = list(hto.plan_permutations(
+            table, 256, with_concurrent=True
+        ))
+        self.assertEqual(1, len(permutations))
+        plan = permutations[0].observations(table)
+        self.assertListEqual(['A', 'B', 'C', 'D'], [o.name for o in plan])
+        self.assertListEqual([0, 18000, 0, 0], [o.start for o in plan])
+        self.assertTrue(all(o.start == 0 for o in table))
+        orders = ([3, 2, 1, 0], [0, 1, 2, 3])
+        permutations = list(hto.plan_permutations(
+            table, 256, orders, with_concurrent=True, packing="event"
+        ))
+        self.assertEqual(1, len(permutations))
 
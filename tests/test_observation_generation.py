@@ -12,15 +12,19 @@
 
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import copy
 import os
 import shutil
 import unittest
 import random
 
+from unittest import mock
+
 import pandas as pd
 
 from pathlib import Path
 
+import skaworkflows.workflow.hpso_to_observation as hto
 from skaworkflows.workflow.hpso_to_observation import (
     Observation,
     create_observation_from_hpso,
@@ -33,6 +37,9 @@ from skaworkflows.workflow.hpso_to_observation import (
     generate_instrument_config,
 )
 
+from skaworkflows.workflow.scheduler import DemandTree
+from skaworkflows.workflow.workflow_io import read_workflow_header
+
 from skaworkflows.common import SI
 
 from skaworkflows.hpconfig.specs.sdp import (
@@ -112,6 +119,55 @@ class TestObservationPlanGeneration(unittest.TestCase):
         self.assertEqual(150, plan[5].start)
 
 
+    def test_tree_scheduler_matches_legacy(self):
+        random.seed(1)
+        obslist = self.obslist1 + self.obslist2 + [
+            Observation(f"hpso04a_{i}", "hpso04a", ["dprepa"],
+                        random.choice([4, 8, 16, 32]),
+                        random.choice([30, 60, 90]), 256 * 128, 128,
+                        random.choice([4062.5, 65000.0]), 'low')
+            for i in range(4, 40)
+        ]
+        legacy = create_observation_plan(
+            copy.deepcopy(obslist), self.max_telescope_usage,
+            scheduler="legacy"
+        )
+        tree = create_observation_plan(
+            copy.deepcopy(obslist), self.max_telescope_usage, scheduler="tree"
+        )
+        self.assertListEqual(
+            [(o.name, o.start) for o in legacy],
+            [(o.name, o.start) for o in tree],
+        )
+
+    def test_tree_scheduler_rejects_oversized_observations(self):
+        with self.assertRaises(ValueError):
+            create_observation_plan(
+                [self.obs1, self.obs3], self.max_telescope_usage // 2,
+                scheduler="tree"
+            )
+
+
+class TestDemandTree(unittest.TestCase):
+
+    def test_first_fit_and_last(self):
+        tree = DemandTree([32, 16, 64, 8, 16])
+        self.assertEqual(5, len(tree))
+        self.assertEqual(1, tree.first_fit(16))
+        self.assertEqual(3, tree.first_fit(8))
+        self.assertEqual(3, tree.first_fit(16, start=2))
+        self.assertEqual(4, tree.first_fit(16, start=4))
+        self.assertEqual(-1, tree.first_fit(4))
+        self.assertEqual(4, tree.last())
+        tree.remove(4)
+        tree.remove(3)
+        self.assertEqual(2, tree.last())
+        self.assertEqual(-1, tree.first_fit(16, start=2))
+        self.assertEqual(3, len(tree))
+        with self.assertRaises(KeyError):
+            tree.remove(3)
+
+
 class TestObservationTopSimTranslation(unittest.TestCase):
     def setUp(self):
         self.obs1 = Observation(
@@ -236,6 +292,147 @@ class TestObservationTopSimTranslation(unittest.TestCase):
             final_instrument_config["telescope"]["observations"][0],
         )
 
+    def testObservationWorkflowDictParallel(self):
+        """
+        Generating workflows across a process pool should produce the same
+        instrument config, in plan order, as generating them sequentially.
+        """
+        base_graph_paths = {"DPrepA": "prototype"}
+        observation_plan = create_observation_from_hpso(
+            count=2, hpso="hpso01", demand=512, duration=60,
+            workflows=["DPrepA"], channels=256 * 128, workflow_parallelism=4,
+            baseline=65000.0, telescope='low', offset=0,
+        ) + create_observation_from_hpso(
+            count=2, hpso="hpso01", demand=512, duration=120,
+            workflows=["DPrepA"], channels=256 * 128, workflow_parallelism=4,
+            baseline=65000.0, telescope='low', offset=2,
+        )
+        observation_plan = create_observation_plan(observation_plan, 512)
+        sequential = generate_instrument_config(
+            "low", 512, observation_plan, self.config_dir_path,
+            self.component_sizing, self.system_sizing, self.cluster,
+            base_graph_paths,
+        )
+        shutil.rmtree(self.config_dir_path / "workflows")
+        parallel = generate_instrument_config(
+            "low", 512, observation_plan, self.config_dir_path,
+            self.component_sizing, self.system_sizing, self.cluster,
+            base_graph_paths, workers=2
+        )
+        self.assertListEqual(
+            list(sequential["telescope"]["pipelines"]),
+            list(parallel["telescope"]["pipelines"]),
+        )
+        self.assertListEqual(
+            sequential["telescope"]["observations"],
+            parallel["telescope"]["observations"],
+        )
+        # Observations with the same parameters share a workflow
+        pipelines = parallel["telescope"]["pipelines"]
+        self.assertEqual(
+            pipelines["hpso01_0"]["workflow"], pipelines["hpso01_1"]["workflow"]
+        )
+        self.assertNotEqual(
+            pipelines["hpso01_0"]["workflow"], pipelines["hpso01_2"]["workflow"]
+        )
+
+    def testIncrementalRegeneration(self):
+        """
+        Passing the previous config only regenerates the workflows of
+        observations whose fingerprint has changed.
+        """
+        base_graph_paths = {"DPrepA": "prototype"}
+
+        def plan(duration):
+            return create_observation_plan(
+                create_observation_from_hpso(
+                    count=1, hpso="hpso01", demand=512, duration=60,
+                    workflows=["DPrepA"], channels=256 * 128,
+                    workflow_parallelism=4, baseline=65000.0,
+                    telescope='low', offset=0,
+                ) + create_observation_from_hpso(
+                    count=1, hpso="hpso01", demand=512, duration=duration,
+                    workflows=["DPrepA"], channels=256 * 128,
+                    workflow_parallelism=4, baseline=65000.0,
+                    telescope='low', offset=1,
+                ),
+                512,
+            )
+
+        config = generate_instrument_config(
+            "low", 512, plan(120), self.config_dir_path,
+            self.component_sizing, self.system_sizing, self.cluster,
+            base_graph_paths,
+        )
+        pipelines = dict(config["telescope"]["pipelines"])
+        unchanged = self.config_dir_path / pipelines["hpso01_0"]["workflow"]
+        mtime = unchanged.stat().st_mtime_ns
+        self.assertEqual(
+            pipelines["hpso01_0"]["fingerprint"],
+            read_workflow_header(unchanged)["fingerprint"],
+        )
+
+        updated = generate_instrument_config(
+            "low", 512, plan(180), self.config_dir_path,
+            self.component_sizing, self.system_sizing, self.cluster,
+            base_graph_paths, previous_config=config,
+        )
+        self.assertIs(config, updated)
+        new_pipelines = updated["telescope"]["pipelines"]
+        self.assertEqual(pipelines["hpso01_0"], new_pipelines["hpso01_0"])
+        self.assertEqual(mtime, unchanged.stat().st_mtime_ns)
+        self.assertNotEqual(
+            pipelines["hpso01_1"]["fingerprint"],
+            new_pipelines["hpso01_1"]["fingerprint"],
+        )
+        regenerated = self.config_dir_path / new_pipelines["hpso01_1"]["workflow"]
+        self.assertEqual(
+            180, read_workflow_header(regenerated)["parameters"]["duration"]
+        )
+
+    def testContentAddressedWorkflowNames(self):
+        """
+        Workflow files are named by their fingerprint, so generating the same
+        plan again uses the existing files rather than regenerating them.
+        """
+        base_graph_paths = {"DPrepA": "prototype"}
+        observation_plan = create_observation_plan(
+            create_observation_from_hpso(
+                count=1, hpso="hpso01", demand=512, duration=60,
+                workflows=["DPrepA"], channels=256 * 128,
+                workflow_parallelism=4, baseline=65000.0, telescope='low',
+                offset=0,
+            ),
+            512,
+        )
+        config = generate_instrument_config(
+            "low", 512, copy.deepcopy(observation_plan), self.config_dir_path,
+            self.component_sizing, self.system_sizing, self.cluster,
+            base_graph_paths,
+        )
+        pipeline = config["telescope"]["pipelines"]["hpso01_0"]
+        self.assertEqual(
+            f"workflows/{pipeline['fingerprint']}", pipeline["workflow"]
+        )
+        with mock.patch.object(
+                hto, "generate_workflow_from_observation",
+                wraps=hto.generate_workflow_from_observation
+        ) as generate:
+            again = generate_instrument_config(
+                "low", 512, copy.deepcopy(observation_plan),
+                self.config_dir_path, self.component_sizing,
+                self.system_sizing, self.cluster, base_graph_paths,
+            )
+            generate.assert_not_called()
+            self.assertEqual(config, again)
+            generate_instrument_config(
+                "low", 512, copy.deepcopy(observation_plan),
+                self.config_dir_path, self.component_sizing,
+                self.system_sizing, self.cluster, base_graph_paths,
+                workflow_compression="gzip",
+            )
+            generate.assert_called_once()
+
     def test_buffer_config_sizing(self):
         """
         Call the generate_buffer_config, which is a wrapper for hpconfig
@@ -25,7 +25,9 @@ https://github.com/ska-telescope/sdp-par-model.
 
 import sys
 import os
+import tempfile
 import unittest
+import unittest.mock
 import pandas as pd
 
 from pathlib import Path
@@ -79,6 +81,44 @@ class TestSystemPandasOutputCompute(unittest.TestCase):
         self.assertAlmostEqual(15/3, len(total_sizing['SKA1_Low']),places=7)
         self.assertAlmostEqual(192/3, len(component_sizing['SKA1_Low']), places=7)
 
+    def test_compile_sizing_in_parallel(self):
+        """
+        Reports parsed across a process pool are combined in the order given
+        """
+        paths = [LONG_MID, SHORT, LONG_LOW]
+        sequential = pss.compile_sizing(paths)
+        parallel = pss.compile_sizing(paths, workers=2)
+        for expected, actual in zip(sequential, parallel):
+            self.assertListEqual(list(expected), list(actual))
+            for tel in expected:
+                pd.testing.assert_frame_equal(expected[tel], actual[tel])
+        total_sizing, component_sizing = pss.compile_sizing(
+            paths, component=False
+        )
+        self.assertEqual({}, component_sizing)
+        self.assertEqual(10, len(total_sizing['SKA1_Low']))
+
+    def test_compile_sizing_cache(self):
+        """
+        Only reports that are not in the cache are parsed, and the combined
+        tables match those compiled without a cache.
+        """
+        with tempfile.TemporaryDirectory() as cache_dir:
+            pss.compile_sizing([LONG_MID, SHORT], cache_dir=cache_dir)
+            paths = [LONG_MID, SHORT, LONG_LOW]
+            with unittest.mock.patch.object(
+                    pss, '_process_sizing_file',
+                    wraps=pss._process_sizing_file
+            ) as process:
+                cached = pss.compile_sizing(paths, cache_dir=cache_dir)
+            process.assert_called_once_with(LONG_LOW, True, True)
+            expected = pss.compile_sizing(paths)
+            for expected_sizing, cached_sizing in zip(expected, cached):
+                for tel in expected_sizing:
+                    pd.testing.assert_frame_equal(
+                        expected_sizing[tel], cached_sizing[tel]
+                    )
+
     def test_total_sizing_baselines(self):
         ret = pss.csv_to_pandas_total_compute(LONG_LOW)
         low = ret['SKA1_Low']
@@ -13,20 +13,34 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import copy
+import io
+import subprocess
 import unittest
 import shutil
 import random
 import json
 import os
 import logging
+import tempfile
 
 import networkx as nx
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from skaworkflows import __version__
 from skaworkflows.common import SI, BYTES_PER_VIS
 import skaworkflows.workflow.hpso_to_observation as hpo
 import skaworkflows.workflow.eagle_daliuge_translation as edt
+import skaworkflows.workflow.workflow_analysis as wa
+from skaworkflows.workflow.sizing import SizingIndex
+from skaworkflows.workflow.pgt_cache import PGTCache
+from skaworkflows.workflow.workflow_store import WorkflowStore
+from skaworkflows.workflow.scatter_template import (
+    ScatterTemplate, project_pgt
+)
+from skaworkflows.workflow.compact_graph import CompactGraph
+from skaworkflows.workflow import workflow_io
 
 logging.disable(logging.INFO)
 
@@ -91,6 +105,26 @@ class TestPipelineStructureTranslation(unittest.TestCase):
         # Get returned string and confirm it is the same as a previously
         # converted logical graph
 
+    def test_lgt_to_pgt_in_process(self):
+        """
+        Calling the translator directly should produce the same drops as
+        running `dlg unroll`.
+        """
+        lgt_dict = edt.update_graph_parallelism(LGT_PATH, 4)
+        pgt_list = edt.unroll_logical_graph_in_process(lgt_dict, file_in=False)
+        self.assertEqual(284, len(pgt_list))
+        subprocess_list = json.loads(
+            edt.unroll_logical_graph(lgt_dict, file_in=False)
+        )
+        self.assertListEqual(
+            [d.get('oid') for d in subprocess_list],
+            [d.get('oid') for d in pgt_list]
+        )
+        # The LGT we pass in is left untouched
+        self.assertDictEqual(
+            edt.update_graph_parallelism(LGT_PATH, 4), lgt_dict
+        )
+
     def test_daliuge_nx_conversion(self):
         """
         Once we unroll to a daliuge JSON file, we want to keep this as a NX
@@ -151,6 +185,97 @@ class TestPipelineStructureTranslation(unittest.TestCase):
         self.assertEqual(2, task_dict['Grid']['node'])
         self.assertEqual(4, task_dict['Subtract Image Component']['node'])
 
+    def test_daliuge_nx_without_edge_oids(self):
+        with open(PGT_PATH) as f:
+            jdict = json.load(f)
+        nx_graph, task_dict = edt.daliuge_to_nx(jdict, 'DPrepA')
+        lean_graph, lean_task_dict = edt.daliuge_to_nx(
+            jdict, 'DPrepA', edge_oids=False
+        )
+        self.assertListEqual(list(nx_graph.nodes), list(lean_graph.nodes))
+        self.assertListEqual(list(nx_graph.edges), list(lean_graph.edges))
+        for edge in lean_graph.edges:
+            self.assertDictEqual({"transfer_data": 0}, lean_graph.edges[edge])
+            self.assertEqual(
+                0, nx_graph.edges[edge]["transfer_data"]
+            )
+            self.assertIn("data_drop_oid", nx_graph.edges[edge])
+        self.assertDictEqual(task_dict, lean_task_dict)
+
+    def test_daliuge_nx_unknown_producer(self):
+        pgt = [
+            {"oid": "a", "name": "Flag", "categoryType": "Application"},
+            {"oid": "d", "name": "data", "categoryType": "Data",
+             "producers": ["a"], "consumers": ["b"]},
+        ]
+        # Edges must be between applications
+        with self.assertRaises(KeyError):
+            edt.daliuge_to_nx(pgt, 'DPrepA')
+        pgt.append({"oid": "b", "name": "FFT", "categoryType": "Application"})
+        nx_graph, task_dict = edt.daliuge_to_nx(pgt, 'DPrepA')
+        self.assertListEqual(
+            [('DPrepA_Flag_0', 'DPrepA_FFT_0')], list(nx_graph.edges)
+        )
+        self.assertDictEqual(
+            {'Flag': {'node': 1, 'out_edge': 1}, 'FFT': {'node': 1}}, task_dict
+        )
+
+    def test_iter_json_array(self):
+        with open(PGT_PATH) as f:
+            text = f.read()
+        # Chunks smaller than the drops, and split numbers
+        for chunk_size in (1, 7, 4096):
+            self.assertListEqual(
+                json.loads(text),
+                list(edt.iter_json_array(io.StringIO(text), chunk_size))
+            )
+            self.assertListEqual(
+                [12, -3.5e3, "a,]", [], {}, None],
+                list(edt.iter_json_array(
+                    io.StringIO('[12, -3.5e3, "a,]", [], {}, null]'),
+                    chunk_size
+                ))
+            )
+        # Numbers split across chunks must not be decoded from a prefix
+        rng = random.Random(0)
+        for _ in range(200):
+            elements = [
+                rng.choice([
+                    rng.randint(-10 ** 6, 10 ** 6),
+                    round(rng.uniform(-1e3, 1e3), rng.randint(0, 6)),
+                    rng.uniform(-1, 1) * 10 ** rng.randint(-20, 20),
+                    {"oid": str(rng.random()), "n": [1.25, -3e-7]},
+                    "1.5", True, None, [],
+                ])
+                for _ in range(rng.randint(0, 8))
+            ]
+            text = json.dumps(elements, indent=rng.choice([None, 1]))
+            for chunk_size in range(1, 7):
+                self.assertListEqual(
+                    elements,
+                    list(edt.iter_json_array(io.StringIO(text), chunk_size))
+                )
+        self.assertListEqual(
+            [123456, 1.25],
+            list(edt.iter_json_array(io.StringIO('[123456, 1.25]'), 1))
+        )
+        for text in ('', '[1,', '{"a": 1}', '[1 2]', '[1,]', '[1x]'):
+            with self.assertRaises(ValueError):
+                list(edt.iter_json_array(io.StringIO(text), 2))
+
+    def test_streamed_eagle_to_nx(self):
+        nx_graph, task_dict, pgt = edt.eagle_to_nx(
+            LGT_PATH, 'DPrepA', in_process=False
+        )
+        streamed_graph, streamed_task_dict, streamed_pgt = edt.eagle_to_nx(
+            LGT_PATH, 'DPrepA', stream=True
+        )
+        self.assertIsNone(streamed_pgt)
+        self.assertTrue(nx.utils.graphs_equal(nx_graph, streamed_graph))
+        self.assertDictEqual(task_dict, streamed_task_dict)
+        with self.assertRaises(subprocess.CalledProcessError):
+            list(edt.iter_unrolled_pgt({}, file_in=False))
+
     def test_json_to_nx(self):
         """
         We use the converted daliuge_to_nx and then add additional
@@ -193,6 +318,401 @@ class TestPipelineStructureTranslation(unittest.TestCase):
         self.assertFalse(os.path.exists(PGT_PATH_GENERATED))
 
 
+class TestPGTCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tmpdir.name) / 'pgt_cache'
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_key_depends_on_parallelism(self):
+        cache = PGTCache(self.cache_dir)
+        lgt_4 = edt.update_graph_parallelism(LGT_PATH, 4)
+        lgt_8 = edt.update_graph_parallelism(LGT_PATH, 8)
+        self.assertEqual(cache.key(lgt_4), cache.key(
+            edt.update_graph_parallelism(LGT_PATH, 4)))
+        self.assertNotEqual(cache.key(lgt_4), cache.key(lgt_8))
+
+    def test_put_and_get_persist(self):
+        lgt = edt.update_graph_parallelism(LGT_PATH, 4)
+        cache = PGTCache(self.cache_dir)
+        key = cache.key(lgt)
+        self.assertIsNone(cache.get(key))
+        pgt = edt.unroll_logical_graph_in_process(lgt, file_in=False)
+        cache.put(key, pgt)
+        # A new cache object has nothing in memory, so this reads the file
+        self.assertEqual(pgt, PGTCache(self.cache_dir).get(key))
+
+    def test_eviction(self):
+        cache = PGTCache(self.cache_dir, max_size=1, memory_entries=1)
+        cache.put('a', [{'oid': 'a'}])
+        cache.put('b', [{'oid': 'b'}])
+        self.assertFalse(cache.path('a').exists())
+
+
+class TestWorkflowStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+        self.configs = [self.root / 'config_a', self.root / 'config_b']
+        for config in self.configs:
+            (config / 'workflows').mkdir(parents=True)
+        self.workflow = self.configs[0] / 'workflows' / 'abc'
+        self.workflow.write_text('{"graph": {}}')
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_add_and_link(self):
+        for link in ('hardlink', 'symlink', 'copy'):
+            store = WorkflowStore(self.root / f'store_{link}', link=link)
+            store.add([self.workflow])
+            self.assertIn('abc', store)
+            workflow_dir = self.configs[1] / 'workflows'
+            self.assertFalse(store.link(['abc', 'abc.csv'], workflow_dir))
+            self.assertTrue(store.link(['abc'], workflow_dir))
+            linked = workflow_dir / 'abc'
+            self.assertEqual('{"graph": {}}', linked.read_text())
+            self.assertEqual(link == 'symlink', linked.is_symlink())
+            self.assertEqual(
+                link != 'copy', os.path.samefile(store.path('abc'), linked)
+            )
+            # The store holds the data, not a link to a config
+            self.assertFalse(store.path('abc').is_symlink())
+            linked.unlink()
+
+    def test_collect_garbage(self):
+        for link in ('hardlink', 'symlink'):
+            store = WorkflowStore(self.root / f'store_{link}', link=link)
+            store.add([self.workflow])
+            store.link(['abc'], self.configs[1] / 'workflows')
+            self.assertListEqual([], store.collect_garbage(self.configs))
+            self.assertListEqual(
+                [], store.collect_garbage(self.configs, min_age=3600)
+            )
+            for config in self.configs:
+                (config / 'workflows' / 'abc').unlink()
+            self.assertListEqual(['abc'], store.collect_garbage(self.configs))
+            self.assertNotIn('abc', store)
+            self.workflow.write_text('{"graph": {}}')
+
+
+class TestScatterTemplate(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.pgts = {
+            copies: edt.unroll_to_pgt(
+                edt.update_graph_parallelism(LGT_PATH, copies), file_in=False
+            )
+            for copies in (2, 3, 5)
+        }
+
+    def test_expand_matches_unrolled_pgt(self):
+        template = ScatterTemplate.from_pgts(
+            self.pgts[2], 2, self.pgts[3], 3
+        )
+        self.assertListEqual(project_pgt(self.pgts[5]), template.expand(5))
+        expanded, expanded_tasks = edt.daliuge_to_nx(
+            template.expand(5), 'test'
+        )
+        unrolled, unrolled_tasks = edt.daliuge_to_nx(self.pgts[5], 'test')
+        self.assertTrue(nx.utils.graphs_equal(unrolled, expanded))
+        self.assertDictEqual(unrolled_tasks, expanded_tasks)
+
+    def test_boundary_drops(self):
+        """
+        Drops outside the scatter that link to every copy (the gather and
+        scatter data drops of cont_img_mvp) are expanded for each copy
+        """
+        base_graph = hpo._match_graph_options('cont_img_mvp')
+        pgts = {
+            copies: edt.unroll_to_pgt(
+                edt.update_graph_parallelism(base_graph, copies, 512),
+                file_in=False,
+            )
+            for copies in (2, 3, 7)
+        }
+        template = ScatterTemplate.from_pgts(pgts[2], 2, pgts[3], 3)
+        self.assertListEqual(project_pgt(pgts[7]), template.expand(7))
+        expanded, expanded_tasks = edt.daliuge_to_nx(
+            template.expand(7), 'test'
+        )
+        unrolled, unrolled_tasks = edt.daliuge_to_nx(pgts[7], 'test')
+        self.assertTrue(nx.utils.graphs_equal(unrolled, expanded))
+        self.assertDictEqual(unrolled_tasks, expanded_tasks)
+
+    def test_mismatch_raises(self):
+        # The check PGT does not have the copies it is said to have
+        with self.assertRaises(ValueError):
+            ScatterTemplate.from_pgts(self.pgts[2], 2, self.pgts[5], 3)
+
+
+class TestCompactGraph(unittest.TestCase):
+
+    def setUp(self) -> None:
+        obs = hpo.Observation(
+            1, 'hpso01', ['DPrepA'], 512, 60, 512 * 128, 4, 65000.0, 'low'
+        )
+        channel_lgt = edt.update_graph_parallelism(LGT_PATH, 4)
+        nx_graph, task_dict, pgt = edt.eagle_to_nx(
+            channel_lgt, 'DPrepA', file_in=False
+        )
+        self.nx_graph, _ = hpo.generate_cost_per_product(
+            nx_graph, task_dict, obs, 'DPrepA',
+            pd.read_csv(COMPONENT_SYSTEM_SIZING)
+        )
+        self.graph = CompactGraph.from_networkx(self.nx_graph)
+
+    def test_networkx_round_trip(self):
+        nx_graph = self.graph.to_networkx()
+        self.assertListEqual(
+            list(self.nx_graph.nodes(data=True)), list(nx_graph.nodes(data=True))
+        )
+        self.assertListEqual(
+            list(self.nx_graph.edges(data=True)), list(nx_graph.edges(data=True))
+        )
+
+    def test_node_link_round_trip(self):
+        data = nx.node_link_data(self.nx_graph, edges="links")
+        self.assertDictEqual(data, self.graph.to_node_link())
+        graph = CompactGraph.from_node_link(json.loads(json.dumps(data)))
+        self.assertDictEqual(data, graph.to_node_link())
+
+    def test_graph_interface(self):
+        self.assertEqual(len(self.nx_graph), len(self.graph))
+        self.assertEqual(
+            self.nx_graph.number_of_edges(), self.graph.number_of_edges()
+        )
+        for node in ['DPrepA_Degrid_0', 'DPrepA_BeginMajorCycle_0']:
+            self.assertIn(node, self.graph)
+            self.assertEqual(self.nx_graph.nodes[node], self.graph.nodes[node])
+            self.assertSetEqual(
+                set(self.nx_graph.predecessors(node)),
+                set(self.graph.predecessors(node)),
+            )
+            self.assertListEqual(
+                list(self.nx_graph.successors(node)),
+                list(self.graph.successors(node)),
+            )
+            self.assertEqual(
+                self.nx_graph.in_degree(node), self.graph.in_degree(node)
+            )
+        self.assertEqual(
+            self.nx_graph['DPrepA_BeginMajorCycle_0']['DPrepA_Degrid_0'],
+            self.graph['DPrepA_BeginMajorCycle_0']['DPrepA_Degrid_0'],
+        )
+        self.assertNotIn('DPrepA_Degrid_1000', self.graph)
+        self.assertListEqual(
+            list(self.nx_graph.in_degree()), list(self.graph.in_degree())
+        )
+        self.assertListEqual(
+            list(self.nx_graph.out_degree()), list(self.graph.out_degree())
+        )
+
+    def test_attribute_types(self):
+        """
+        Integer costs (e.g. the observation duration) stay integers
+        """
+        self.assertTrue(
+            any(isinstance(a['comp'], int) for _, a in self.nx_graph.nodes(data=True))
+        )
+        for node, attrs in self.nx_graph.nodes(data=True):
+            for attr, value in attrs.items():
+                self.assertIs(type(value), type(self.graph.nodes[node][attr]))
+        columns = CompactGraph.from_arrays(self.graph.to_arrays())
+        self.assertListEqual(
+            list(self.nx_graph.nodes(data=True)),
+            [(n, dict(a)) for n, a in columns.nodes(data=True)],
+        )
+        self.assertEqual(
+            json.dumps(list(self.nx_graph.nodes(data=True))),
+            json.dumps([(n, dict(a)) for n, a in columns.nodes(data=True)]),
+        )
+
+    def test_graph_attributes(self):
+        self.nx_graph.graph['workflow'] = 'DPrepA'
+        data = nx.node_link_data(self.nx_graph, edges="links")
+        graph = CompactGraph.from_networkx(self.nx_graph)
+        self.assertDictEqual(data, graph.to_node_link())
+        self.assertDictEqual(
+            data, CompactGraph.from_node_link(data).to_node_link()
+        )
+        self.assertDictEqual(self.nx_graph.graph, graph.to_networkx().graph)
+
+    def test_attribute_updates(self):
+        """
+        Attributes changed through the views are written to the arrays
+        """
+        node = 'DPrepA_Degrid_0'
+        self.graph.nodes[node].update(comp=5)
+        self.graph.nodes[node]['task_data'] = 1.5
+        self.assertDictEqual(
+            {'comp': 5, 'task_data': 1.5}, dict(self.graph.nodes[node])
+        )
+        self.assertIs(int, type(self.graph.nodes[node]['comp']))
+        self.assertEqual(
+            1.5, self.graph.task_data[self.graph.node_id(node)]
+        )
+        edge = self.graph['DPrepA_BeginMajorCycle_0'][node]
+        edge['transfer_data'] = 2.0
+        self.assertEqual(
+            2.0,
+            self.graph.to_networkx().edges[
+                'DPrepA_BeginMajorCycle_0', node]['transfer_data'],
+        )
+        with self.assertRaises(ValueError):
+            self.graph.nodes[node]['colour'] = 'red'
+
+    def test_topological_sort(self):
+        self.assertListEqual(
+            list(nx.topological_sort(self.nx_graph)),
+            list(nx.topological_sort(self.graph)),
+        )
+
+    def test_concatenate_workflows(self):
+        obs = hpo.Observation(
+            1, 'hpso01', ['DPrepA', 'DPrepB'], 512, 60, 512 * 128, 4,
+            65000.0, 'low'
+        )
+        channel_lgt = edt.update_graph_parallelism(LGT_PATH, 4)
+        nx_graph, task_dict, _ = edt.eagle_to_nx(
+            channel_lgt, 'DPrepB', file_in=False
+        )
+        second, _ = hpo.generate_cost_per_product(
+            nx_graph, task_dict, obs, 'DPrepB',
+            pd.read_csv(COMPONENT_SYSTEM_SIZING)
+        )
+        workflows = ['DPrepA', 'DPrepB']
+        for handoff in edt.HANDOFF_MODES:
+            with self.subTest(handoff=handoff):
+                expected = edt.concatenate_workflows(
+                    {'DPrepA': self.nx_graph, 'DPrepB': second}, workflows,
+                    handoff=handoff, handoff_data={'DPrepB': 1000},
+                )
+                result = edt.concatenate_workflows(
+                    {'DPrepA': self.graph,
+                     'DPrepB': CompactGraph.from_networkx(second)},
+                    workflows, in_place=True, handoff=handoff,
+                    handoff_data={'DPrepB': 1000},
+                )
+                self.assertIsInstance(result, CompactGraph)
+                self.assertEqual(
+                    json.dumps(nx.node_link_data(expected, edges="links")),
+                    json.dumps(result.to_node_link()),
+                )
+
+
+class TestWorkflowWriter(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.obs = hpo.Observation(
+            1, 'hpso01', ['DPrepA'], 512, 60, 512 * 128, 4, 65000.0, 'low'
+        )
+        channel_lgt = edt.update_graph_parallelism(LGT_PATH, 4)
+        nx_graph, task_dict, pgt = edt.eagle_to_nx(
+            channel_lgt, 'DPrepA', file_in=False
+        )
+        self.graph, _ = hpo.generate_cost_per_product(
+            nx_graph, task_dict, self.obs, 'DPrepA',
+            pd.read_csv(COMPONENT_SYSTEM_SIZING)
+        )
+        self.final_json = hpo.produce_final_workflow_structure(
+            self.graph, self.obs
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / "workflow"
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_indented_output_matches_json_dump(self):
+        workflow_io.write_workflow(
+            self.path, self.final_json["header"], self.graph, indent=2
+        )
+        with open(self.path) as fp:
+            self.assertEqual(json.dumps(self.final_json, indent=2), fp.read())
+
+    def test_compact_gzip(self):
+        workflow_io.write_workflow(
+            self.path, self.final_json["header"], self.graph, indent=None,
+            compression="gzip"
+        )
+        with open(self.path, "rb") as fp:
+            self.assertEqual(workflow_io.GZIP_MAGIC, fp.read(2))
+        self.assertDictEqual(
+            self.final_json, workflow_io.load_workflow(self.path)
+        )
+
+    @unittest.skipIf(workflow_io.zstandard is None, "zstandard not installed")
+    def test_zstd(self):
+        workflow_io.write_workflow(
+            self.path, self.final_json["header"], self.graph,
+            compression="zstd"
+        )
+        self.assertDictEqual(
+            self.final_json, workflow_io.load_workflow(self.path)
+        )
+
+    def test_read_workflow_header(self):
+        header = self.final_json["header"]
+        for compression in (None, "gzip"):
+            workflow_io.write_workflow(
+                self.path, header, self.graph, compression=compression
+            )
+            self.assertDictEqual(
+                header, workflow_io.read_workflow_header(self.path)
+            )
+        workflow_io.write_workflow_columns(self.path, header, self.graph)
+        self.assertDictEqual(
+            header, workflow_io.read_workflow_header(self.path)
+        )
+
+    def test_compact_graph(self):
+        workflow_io.write_workflow(
+            self.path, self.final_json["header"],
+            CompactGraph.from_networkx(self.graph), indent=None
+        )
+        self.assertDictEqual(
+            self.final_json, workflow_io.load_workflow(self.path)
+        )
+
+
+    def test_columnar_round_trip(self):
+        workflow_io.write_workflow_columns(
+            self.path, self.final_json["header"], self.graph
+        )
+        self.assertTrue(workflow_io.is_columnar(self.path))
+        workflow = workflow_io.load_workflow(self.path)
+        self.assertDictEqual(self.final_json["header"], workflow["header"])
+        # The columnar format does not store the DALiuGE oids on edges
+        expected = copy.deepcopy(self.final_json["graph"])
+        for link in expected["links"]:
+            for attr in ["u", "v", "data_drop_oid"]:
+                link.pop(attr, None)
+        self.assertDictEqual(expected, workflow["graph"])
+
+    def test_columnar_mmap_and_analysis(self):
+        json_path = self.path.with_suffix(".json")
+        workflow_io.write_workflow(
+            json_path, self.final_json["header"], self.graph
+        )
+        workflow_io.write_workflow_columns(
+            self.path, self.final_json["header"], self.graph
+        )
+        columns = workflow_io.load_workflow_columns(self.path, ["comp"])
+        self.assertSetEqual({"comp", "header"}, set(columns))
+        self.assertIsInstance(columns["comp"], np.memmap)
+        self.assertAlmostEqual(
+            1,
+            wa.calculate_total_flops(json_path)
+            / wa.calculate_total_flops(self.path),
+            places=12,
+        )
+
+
 class TestWorkflowFromObservation(unittest.TestCase):
 
     def setUp(self) -> None:
@@ -250,6 +770,86 @@ class TestWorkflowFromObservation(unittest.TestCase):
             final_graphs['DPrepB'].nodes['DPrepB_Grid_0']['comp']
         )
 
+    def testConcatWorkflowsInPlace(self):
+        graphs = {
+            'DPrepA': nx.DiGraph([('A_0', 'A_1'), ('A_0', 'A_2')]),
+            'DPrepB': nx.DiGraph([('B_0', 'B_1')]),
+            'DPrepC': nx.DiGraph([('C_1', 'C_2'), ('C_0', 'C_2')]),
+        }
+        workflows = ['DPrepA', 'DPrepB', 'DPrepC']
+        final_graph = edt.concatenate_workflows(graphs, workflows)
+        self.assertEqual(3, len(graphs['DPrepA']))
+        # Last node of one workflow to the first node of the next
+        self.assertTrue(final_graph.has_edge('A_2', 'B_0'))
+        self.assertTrue(final_graph.has_edge('B_1', 'C_1'))
+        self.assertEqual(7, final_graph.number_of_edges())
+
+        in_place_graph = edt.concatenate_workflows(
+            graphs, workflows, in_place=True
+        )
+        self.assertIs(graphs['DPrepA'], in_place_graph)
+        self.assertListEqual(
+            list(final_graph.edges(data=True)),
+            list(in_place_graph.edges(data=True))
+        )
+
+    def testConcatWorkflowsHandoff(self):
+        graphs = {
+            'DPrepA': nx.DiGraph([('A_0', 'A_1'), ('A_0', 'A_2')]),
+            'DPrepB': nx.DiGraph([('B_0', 'B_2'), ('B_1', 'B_2')]),
+        }
+        workflows = ['DPrepA', 'DPrepB']
+        barrier_graph = edt.concatenate_workflows(
+            graphs, workflows, handoff='barrier'
+        )
+        barrier = 'DPrepB_Handoff_0'
+        self.assertDictEqual(
+            {'comp': 0, 'task_data': 0}, barrier_graph.nodes[barrier]
+        )
+        self.assertListEqual(
+            ['A_1', 'A_2'], list(barrier_graph.predecessors(barrier))
+        )
+        self.assertListEqual(
+            ['B_0', 'B_1'], list(barrier_graph.successors(barrier))
+        )
+
+        fan_graph = edt.concatenate_workflows(
+            graphs, workflows, handoff='fan', handoff_data={'DPrepB': 100}
+        )
+        self.assertEqual(8, fan_graph.number_of_edges())
+        for parent in ('A_1', 'A_2'):
+            for child in ('B_0', 'B_1'):
+                self.assertEqual(
+                    25, fan_graph.edges[parent, child]['transfer_data']
+                )
+        with self.assertRaises(ValueError):
+            edt.concatenate_workflows(graphs, workflows, handoff='mesh')
+
+    def testPipelineHandoffData(self):
+        sizing = SizingIndex.create(self.component_sizing)
+        observation = self.obs1.replace(channels=16384, baseline=4062.5)
+        row = sizing.row('hpso01', 4062.5, 16384, 512, pipeline='DPrepB')
+        self.assertAlmostEqual(
+            3600 * sizing.value(row, 'Visibility read rate') * SI.tera,
+            hpo.pipeline_handoff_data(observation, 'DPrepB', sizing)
+        )
+        self.assertEqual(
+            0, hpo.pipeline_handoff_data(observation, 'Unknown', sizing)
+        )
+        with self.assertRaises(ValueError):
+            hpo.pipeline_handoff_data(
+                observation.replace(channels=3), 'DPrepB', sizing
+            )
+        # The handoff changes the workflow, so it changes the fingerprint
+        fingerprints = {
+            handoff: hpo.workflow_fingerprint(
+                self.obs1, {'DPrepA': 'prototype', 'DPrepB': 'prototype'},
+                sizing, pd.read_csv(TOTAL_SYSTEM_SIZING), handoff
+            )
+            for handoff in edt.HANDOFF_MODES
+        }
+        self.assertEqual(len(edt.HANDOFF_MODES), len(set(fingerprints.values())))
+
     def testConcatWorkflowsCost(self):
         """
         Ensure that the cumulative cost of all nodes are equivalent to the
@@ -269,12 +869,10 @@ class TestWorkflowFromObservation(unittest.TestCase):
 
         """
         # 'ICAL + DPrepA + DPrepB + DPrepC + DPrepD'
-        self.obs1.demand = 512
-
         workflows = ['ICAL', 'DPrepA', 'DPrepB', 'DPrepC', 'DPrepD']
         final_graphs = {}
         base_graph = LGT_PATH
-        self.obs1.workflows = workflows
+        self.obs1 = self.obs1.replace(demand=512, workflows=workflows)
         for workflow in self.obs1.workflows:
             nx_graph, task_dict, cached_workflow_dict= edt.eagle_to_nx(
                 base_graph, workflow, file_in=True
@@ -341,6 +939,28 @@ class TestCostGenerationAndAssignment(unittest.TestCase):
         )
         self.assertAlmostEqual(0.0950936323565933, component_cost, places=5)
 
+    def test_generate_cost_per_product_batched_parity(self):
+        """
+        The batched cost assignment must produce exactly the same node and
+        edge attributes as the per-node loop.
+        """
+        wf = self.obs1.workflows[0]
+        channel_lgt = edt.update_graph_parallelism(LGT_PATH, 8)
+        nx_graph, task_dict, pgt = edt.eagle_to_nx(channel_lgt, wf, file_in=False)
+        loop_graph, loop_tasks = hpo.generate_cost_per_product(
+            nx_graph.copy(), copy.deepcopy(task_dict), self.obs1, wf,
+            self.component_system_sizing, batched=False
+        )
+        batch_graph, batch_tasks = hpo.generate_cost_per_product(
+            nx_graph.copy(), copy.deepcopy(task_dict), self.obs1, wf,
+            self.component_system_sizing, batched=True
+        )
+        self.assertDictEqual(loop_tasks, batch_tasks)
+        self.assertEqual(
+            json.dumps(nx.node_link_data(loop_graph, edges="links")),
+            json.dumps(nx.node_link_data(batch_graph, edges="links")),
+        )
+
     def test_generate_cost_per_product(self):
         """
         Based on the number of channels and the observation specs, we divide
@@ -462,6 +1082,106 @@ class TestCostGenerationAndAssignment(unittest.TestCase):
         )
 
 
+class TestSizingIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.component_sizing = pd.read_csv(COMPONENT_SYSTEM_SIZING)
+        self.system_sizing = pd.read_csv(TOTAL_SYSTEM_SIZING)
+        self.component_index = SizingIndex.create(self.component_sizing)
+        self.system_index = SizingIndex.create(self.system_sizing)
+
+    def test_nearest_baseline(self):
+        self.assertEqual(
+            65000.0, self.component_index.nearest_baseline('hpso01', 70000)
+        )
+        self.assertEqual(
+            4062.5, self.component_index.nearest_baseline('hpso01', 0)
+        )
+        self.assertEqual(
+            32500.0, self.system_index.nearest_baseline('hpso01', 35000.0)
+        )
+        self.assertRaises(
+            ValueError, self.component_index.nearest_baseline, 'hpso99', 0
+        )
+
+    def test_component_lookup_matches_dataframe(self):
+        """
+        The index should return the same values as filtering the DataFrame
+        """
+        df = self.component_sizing
+        frame = df[
+            (df['hpso'] == 'hpso01')
+            & (df['Baseline'] == 65000.0)
+            & (df['Channels'] == 512 * 128)
+            & (df['Antenna stations'] == 256)
+            & (df['Pipeline'] == 'DPrepA_data')
+            ]
+        row = self.component_index.row(
+            'hpso01', 65000.0, 512 * 128, 256, pipeline='DPrepA_data'
+        )
+        self.assertEqual(
+            float(frame['Degrid'].iloc[0]),
+            self.component_index.value(row, 'Degrid')
+        )
+        self.assertIsNone(
+            self.component_index.row('hpso01', 65000.0, 1, 256, 'DPrepA')
+        )
+
+    def test_total_lookup_matches_dataframe(self):
+        df = self.system_sizing
+        frame = df[
+            (df['HPSO'] == 'hpso01')
+            & (df['Baseline'] == 65000.0)
+            & (df['Channels'] == 512 * 128)
+            & (df['Stations'] == 512)
+            ]
+        row = self.system_index.row('hpso01', 65000.0, 512 * 128, 512)
+        self.assertEqual(
+            float(frame['Ingest [Pflop/s]'].iloc[0]),
+            self.system_index.value(row, 'Ingest [Pflop/s]')
+        )
+
+    def test_nearest_baseline_ties(self):
+        """
+        Halfway between two baselines, the one listed first in the sizing
+        data is used, as `min` over the baseline column does
+        """
+        for df, column, index in [
+            (self.component_sizing, 'hpso', self.component_index),
+            (self.system_sizing, 'HPSO', self.system_index),
+        ]:
+            for hpso, rows in df.groupby(column, sort=False):
+                listed = list(rows['Baseline'])
+                baselines = sorted(set(listed))
+                for lower, upper in zip(baselines, baselines[1:]):
+                    midpoint = (lower + upper) / 2
+                    self.assertEqual(
+                        min(listed, key=lambda x: abs(x - midpoint)),
+                        index.nearest_baseline(hpso, midpoint),
+                    )
+        # Listed longest first, so the longer baseline wins the tie
+        frame = pd.DataFrame({
+            'HPSO': ['hpso01', 'hpso01'], 'Baseline': [200.0, 100.0],
+            'Channels': [1, 1], 'Stations': [1, 1],
+        })
+        self.assertEqual(
+            200.0, SizingIndex.create(frame).nearest_baseline('hpso01', 150)
+        )
+
+    def test_create_is_idempotent(self):
+        self.assertIs(
+            self.component_index, SizingIndex.create(self.component_index)
+        )
+        # The index of a DataFrame is built once
+        self.assertIs(
+            self.component_index, SizingIndex.create(self.component_sizing)
+        )
+        self.assertIsNot(
+            self.component_index,
+            SizingIndex.create(self.component_sizing.copy()),
+        )
+
+
 class TestSKAMidCosts(unittest.TestCase):
 
     def setUp(self) -> None:
@@ -546,6 +1266,26 @@ class TestFileGenerationAndAssignment(unittest.TestCase):
         print(f"{workflow_path_name=}")
         self.assertTrue(workflow_path_name.exists())
 
+    def testCompactGraphWorkflowFile(self):
+        """
+        Holding the workflows as CompactGraphs writes the same file
+        """
+        os.mkdir(self.config_dir)
+        base_graph_paths = {"DPrepA": "prototype", "DPrepB": "prototype"}
+        for handoff in edt.HANDOFF_MODES:
+            with self.subTest(handoff=handoff):
+                paths = [
+                    hpo.generate_workflow_from_observation(
+                        self.obs1, self.telescope_max, self.config_dir,
+                        self.component_system_sizing,
+                        self.total_system_sizing, f"{handoff}_{compact}",
+                        base_graph_paths, handoff=handoff,
+                        compact_graph=compact,
+                    )
+                    for compact in (False, True)
+                ]
+                self.assertEqual(paths[0].read_bytes(), paths[1].read_bytes())
+
     def testWorkflowFileCorrectness(self):
         """
         Ensure that the following is correct:
@@ -584,7 +1324,11 @@ class TestFileGenerationAndAssignment(unittest.TestCase):
                 "workflows": ['DPrepA', 'DPrepB'],
                 "hpso": "hpso01",
             },
-            'time': False
+            'time': False,
+            'fingerprint': hpo.workflow_fingerprint(
+                self.obs1, base_graph_paths, self.component_system_sizing,
+                self.total_system_sizing
+            ),
         }
         with result.open() as fp:
             test_workflow = json.load(fp)